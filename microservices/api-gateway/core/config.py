@@ -9,6 +9,9 @@ class Settings(BaseSettings):
 
     REDIS_URL: str
 
+    # Time a request may take end to end, forwarded as X-Request-Deadline
+    REQUEST_DEADLINE_SECONDS: float = 60.0
+
     # Service URLs
     AUTH_SERVICE_URL: str = "http://auth-service:8000"
     USER_SERVICE_URL: str = "http://user-service:8000"
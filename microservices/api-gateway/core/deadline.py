@@ -0,0 +1,30 @@
+import time
+
+from fastapi import Request
+
+# Absolute deadline of the client request, in Unix epoch milliseconds. Assigned
+# here and forwarded to the services, which budget their calls against it.
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+def parse_deadline(value: str | None) -> float | None:
+    try:
+        return int(value) / 1000
+    except (TypeError, ValueError):
+        return None
+
+
+def assign_deadline(request: Request, budget_seconds: float) -> float:
+    """
+    The request's deadline: `budget_seconds` from now, or the client's own
+    X-Request-Deadline when it is earlier.
+    """
+    deadline = time.time() + budget_seconds
+    client_deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+    if client_deadline is not None:
+        deadline = min(deadline, client_deadline)
+    return deadline
+
+
+def format_deadline(deadline: float) -> str:
+    return str(int(deadline * 1000))
@@ -0,0 +1,7 @@
+from prometheus_client import Counter
+
+DEADLINE_EXCEEDED_TOTAL = Counter(
+    "ai_teacher_deadline_exceeded_total",
+    "Stages cancelled or skipped because of the request deadline (X-Request-Deadline)",
+    ["stage", "action"]
+)
@@ -1,9 +1,13 @@
+import asyncio
+import time
 import uuid
 from contextlib import asynccontextmanager
 
 import redis.asyncio as aioredis
 import httpx
 from core.config import settings
+from core.deadline import DEADLINE_HEADER, assign_deadline, format_deadline
+from core.metrics import DEADLINE_EXCEEDED_TOTAL
 from core.observability import instrument_app, setup_logging, setup_tracing
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -60,9 +64,17 @@ async def reverse_proxy(request: Request, url: str, user_data: dict = None):
     # Correlation ID
     request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
 
+    deadline = assign_deadline(request, settings.REQUEST_DEADLINE_SECONDS)
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        DEADLINE_EXCEEDED_TOTAL.labels(stage="gateway", action="cancelled").inc()
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
     headers = dict(request.headers)
     headers.pop("host", None)
+    headers.pop(DEADLINE_HEADER.lower(), None)
     headers["X-Request-ID"] = request_id
+    headers[DEADLINE_HEADER] = format_deadline(deadline)
 
     if user_data:
         headers["X-User-Id"] = str(user_data.get("sub"))
@@ -84,15 +96,35 @@ async def reverse_proxy(request: Request, url: str, user_data: dict = None):
             headers=headers,
             content=content,
             params=request.query_params,
+            timeout=httpx.Timeout(remaining),
+        )
+        # The response must start before the deadline; a streamed body is
+        # then bounded by the services themselves
+        rp_resp = await asyncio.wait_for(
+            http_client.send(rp_req, stream=True), timeout=remaining
         )
-        rp_resp = await http_client.send(rp_req, stream=True)
+
+        resp_headers = dict(rp_resp.headers)
+        if rp_resp.headers.get("content-type", "").startswith("text/event-stream"):
+            # Server-Sent-Events: forward every chunk as soon as it arrives and
+            # keep nginx (and any other proxy) from buffering the stream
+            resp_headers.pop("content-length", None)
+            resp_headers["Cache-Control"] = "no-cache"
+            resp_headers["X-Accel-Buffering"] = "no"
 
         return StreamingResponse(
             rp_resp.aiter_raw(),
             status_code=rp_resp.status_code,
-            headers=dict(rp_resp.headers),
+            headers=resp_headers,
             background=BackgroundTask(rp_resp.aclose),
         )
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        DEADLINE_EXCEEDED_TOTAL.labels(stage="upstream", action="cancelled").inc()
+        logger.warning(
+            f"Upstream did not respond before the deadline: {url}",
+            extra={"request_id": request_id},
+        )
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     except httpx.RequestError as exc:
         logger.error(f"Service unavailable: {exc}", extra={"request_id": request_id})
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -0,0 +1,25 @@
+"""add_groundedness_to_audit_log
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6g7
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3d4e5f6a7b8'
+down_revision = 'b2c3d4e5f6g7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('answer_audit_logs', sa.Column('groundedness_score', sa.Float(), nullable=True))
+    op.add_column('answer_audit_logs', sa.Column('groundedness_source', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    op.drop_column('answer_audit_logs', 'groundedness_source')
+    op.drop_column('answer_audit_logs', 'groundedness_score')
@@ -0,0 +1,60 @@
+"""add_answer_review_queue_indexes
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+REVIEW_COLUMNS = ['faculty_id', 'created_at', 'id']
+
+# name -> partial index predicate (None for the full index)
+REVIEW_INDEXES = {
+    'ix_answer_audit_logs_review': None,
+    'ix_answer_audit_logs_review_unverified': 'verified_by_teacher IS false',
+    'ix_answer_audit_logs_review_incorrect': 'is_correct IS false',
+    'ix_answer_audit_logs_review_low_confidence': 'rag_confidence_score < 0.8',
+}
+
+
+def upgrade():
+    op.add_column('answer_audit_logs', sa.Column('faculty_id', sa.String(length=255), nullable=True))
+    op.execute(
+        """
+        UPDATE answer_audit_logs AS a
+        SET faculty_id = s.faculty_id
+        FROM chat_sessions AS s
+        WHERE a.session_id = s.id AND a.faculty_id IS NULL
+        """
+    )
+
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, predicate in REVIEW_INDEXES.items():
+            op.create_index(
+                name,
+                'answer_audit_logs',
+                REVIEW_COLUMNS,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(predicate) if predicate else None,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in REVIEW_INDEXES:
+            op.drop_index(
+                name,
+                table_name='answer_audit_logs',
+                postgresql_concurrently=True,
+            )
+    op.drop_column('answer_audit_logs', 'faculty_id')
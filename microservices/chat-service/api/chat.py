@@ -1,23 +1,36 @@
+import logging
 from typing import Optional, List
 from uuid import UUID
 
 from core.audit import log_audit
-from core.cache import cache_result
-from core.metrics import START_CHAT_TOTAL
-from db.session import get_db, get_read_db
+from core.config import settings
+from core.idempotency import idempotency
+from core.metrics import DEGRADED_MODE_REQUESTS_TOTAL, START_CHAT_TOTAL
+from db.session import AsyncSessionLocal, get_db, get_read_db
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
     Header,
     HTTPException,
+    Query,
     Request,
     status,
 )
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi_limiter.depends import RateLimiter
 from pydantic import BaseModel
 from services import chat_service
-from sqlalchemy.orm import Session
+from services.chat_jobs import chat_jobs
+from services.degraded_mode import degraded_mode
+from services.history_buffer import history_buffer
+from services.retrieval_memory import retrieval_memory
+from services.rollups import rollups
+from services.streaming import sse_event
+from services.summary_queue import summary_queue
+from services.verified_answers import verified_answers
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -37,6 +50,18 @@ class ChatResponse(BaseModel):
     audit_log_id: Optional[UUID] = None
 
 
+class ChatJobResponse(BaseModel):
+    """
+    Answer deferred to the chat worker in degraded mode (202 from /chat).
+    """
+
+    job_id: str
+    status: str  # pending, done, failed
+    session_id: Optional[UUID] = None
+    result: Optional[ChatResponse] = None
+    detail: Optional[str] = None
+
+
 class FeedbackRequest(BaseModel):
     audit_log_id: UUID
     is_correct: bool
@@ -57,6 +82,12 @@ class AnswerReviewResponse(BaseModel):
         from_attributes = True
 
 
+class AnswerReviewPage(BaseModel):
+    items: List[AnswerReviewResponse]
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
 class TeacherVerifyRequest(BaseModel):
     verified: bool
     comment: Optional[str] = None
@@ -72,15 +103,17 @@ def get_user_id_key(request: Request):
 async def delete_session(
     session_id: UUID,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_user_id: str = Header(...),
 ):
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
 
     request_id = getattr(request.state, "request_id", None)
-    success = chat_repository.soft_delete_session(db, session_id, x_user_id)
+    success = await chat_repository.soft_delete_session(db, session_id, x_user_id)
     if not success:
         raise HTTPException(status_code=404, detail="Session not found or unauthorized")
+    await history_buffer.clear(session_id)
+    await retrieval_memory.clear(session_id)
 
     log_audit(
         x_user_id,
@@ -102,11 +135,11 @@ async def delete_session(
 async def chat(
     request: ChatRequest,
     fastapi_req: Request,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_user_id: str = Header(...),
     x_faculty_id: Optional[str] = Header(None),
     x_semester_id: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
 ):
     request_id = getattr(fastapi_req.state, "request_id", None)
 
@@ -120,6 +153,35 @@ async def chat(
             detail="Academic context (Faculty and Semester) is required and non-bypassable.",
         )
 
+    # While the LLM provider is slow, only cached answers are served inline
+    cached_only = await degraded_mode.is_active()
+
+    # Mobile clients retry on flaky connections: a retry with the same
+    # Idempotency-Key gets the first answer instead of a second turn
+    return await idempotency.run(
+        f"chat:{x_user_id}",
+        idempotency_key,
+        {**request.model_dump(), "faculty_id": faculty_id, "semester_id": semester_id},
+        lambda: run_chat_turn(
+            db, request, x_user_id, faculty_id, semester_id, request_id, cached_only
+        ),
+    )
+
+
+async def run_chat_turn(
+    db: AsyncSession,
+    request: ChatRequest,
+    x_user_id: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: Optional[str],
+    cached_only: bool = False,
+):
+    """
+    One /chat turn. Also run by the chat worker for deferred answers. With
+    cached_only, a question without a cached answer is deferred to the chat
+    worker and answered 202 with its job.
+    """
     (
         assistant_message,
         session_id,
@@ -137,16 +199,28 @@ async def chat(
         faculty_id=faculty_id,
         semester_id=semester_id,
         request_id=request_id,
+        cached_only=cached_only,
     )
 
-    # Offload summarization to background
-    background_tasks.add_task(
-        chat_service.update_learning_summary_task,
-        db,
-        session_id,
-        learning_summary,
-        history_delta,
-    )
+    if assistant_message is None:
+        DEGRADED_MODE_REQUESTS_TOTAL.labels(result="deferred").inc()
+        job_id = await chat_jobs.submit(
+            x_user_id,
+            session_id,
+            request.message,
+            request.collection_name,
+            faculty_id,
+            semester_id,
+            request_id,
+        )
+        job = ChatJobResponse(job_id=job_id, status="pending", session_id=session_id)
+        return JSONResponse(status_code=202, content=job.model_dump(mode="json"))
+    if cached_only:
+        DEGRADED_MODE_REQUESTS_TOTAL.labels(result="answered").inc()
+
+    # Summarization is batched per session by the learning summary worker
+    if history_delta:
+        await summary_queue.enqueue(session_id, history_delta)
 
     log_audit(
         x_user_id,
@@ -164,11 +238,132 @@ async def chat(
     )
 
 
+async def _get_own_job(job_id: str, x_user_id: str) -> dict:
+    record = await chat_jobs.get(job_id)
+    if record is None or record["user_id"] != x_user_id:
+        raise HTTPException(status_code=404, detail="Chat job not found")
+    return record
+
+
+def _job_response(job_id: str, record: dict) -> ChatJobResponse:
+    return ChatJobResponse(
+        job_id=job_id,
+        status=record["status"],
+        session_id=record.get("session_id"),
+        result=record.get("response"),
+        detail=record.get("detail"),
+    )
+
+
+@router.get("/chat/jobs/{job_id}", response_model=ChatJobResponse)
+async def get_chat_job(job_id: str, x_user_id: str = Header(...)):
+    """
+    Polls an answer deferred in degraded mode.
+    """
+    return _job_response(job_id, await _get_own_job(job_id, x_user_id))
+
+
+@router.get("/chat/jobs/{job_id}/events")
+async def chat_job_events(job_id: str, x_user_id: str = Header(...)):
+    """
+    Server-Sent-Events variant of the poll: a single event named after the
+    job status once it is done or failed, or "pending" when it is still
+    running after CHAT_JOB_EVENTS_WAIT_SECONDS (the client then reconnects).
+    A Redis error while waiting ends the stream with a "failed" event.
+    """
+    await _get_own_job(job_id, x_user_id)
+
+    async def event_source():
+        try:
+            record = await chat_jobs.wait(job_id, settings.CHAT_JOB_EVENTS_WAIT_SECONDS)
+        except Exception as e:
+            logger.error(f"Failed to wait for chat job {job_id}: {e}")
+            yield sse_event(
+                "failed", {"job_id": job_id, "detail": "Chat job status unavailable"}
+            )
+            return
+        if record is None:
+            yield sse_event("failed", {"job_id": job_id, "detail": "Chat job expired"})
+            return
+        job = _job_response(job_id, record)
+        yield sse_event(job.status, job.model_dump(mode="json"))
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/chat/stream",
+    dependencies=[
+        Depends(RateLimiter(times=20, minutes=1, identifier=get_user_id_key))
+    ],
+)
+async def chat_stream(
+    request: ChatRequest,
+    fastapi_req: Request,
+    x_user_id: str = Header(...),
+    x_faculty_id: Optional[str] = Header(None),
+    x_semester_id: Optional[str] = Header(None),
+):
+    """
+    Streaming variant of /chat: the answer is sent as text/event-stream while
+    it is being generated, followed by a final "done" event, or an "error"
+    event when the turn fails after the response has started.
+    """
+    request_id = getattr(fastapi_req.state, "request_id", None)
+
+    faculty_id = request.faculty_id or x_faculty_id
+    semester_id = request.semester_id or x_semester_id
+
+    if not faculty_id or not semester_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Academic context (Faculty and Semester) is required and non-bypassable.",
+        )
+
+    async def event_source():
+        # The stream outlives the request scope, so it owns its DB session
+        async with AsyncSessionLocal() as db:
+            async for item in chat_service.stream_chat_message(
+                db,
+                user_id=x_user_id,
+                session_id=request.session_id,
+                user_message=request.message,
+                collection_name=request.collection_name,
+                faculty_id=faculty_id,
+                semester_id=semester_id,
+                request_id=request_id,
+            ):
+                if isinstance(item, str):
+                    yield item
+                    continue
+                _, session_id, _, history_delta, metadata, _, _ = item
+                log_audit(
+                    x_user_id,
+                    "message",
+                    "chat_session",
+                    resource_id=str(session_id),
+                    metadata=metadata,
+                    request_id=request_id,
+                )
+                if history_delta:
+                    await summary_queue.enqueue(session_id, history_delta)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/student/{student_id}/start-chat")
 async def start_chat(
     student_id: UUID,
     payload: dict, # { book_id }
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_user_id: str = Header(...),
     x_faculty_id: Optional[str] = Header(None),
     x_semester_id: Optional[str] = Header(None),
@@ -192,10 +387,10 @@ async def start_chat(
              raise HTTPException(status_code=500, detail=f"Selection verification error: {e}")
 
     # 2. Create session scoped to this book
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
     collection_name = payload.get("collection_name", "academic")
 
-    session = chat_repository.create_chat_session(
+    session = await chat_repository.create_chat_session(
         db,
         user_id=x_user_id,
         collection_name=collection_name,
@@ -214,13 +409,13 @@ async def start_chat(
 @router.post("/internal/sessions/invalidate")
 async def invalidate_sessions(
     payload: dict, # { user_id, book_id }
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Invalidates active chat sessions for a user tied to a specific book.
     Triggered when a book is removed or profile changes.
     """
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
     user_id = payload.get("user_id")
     book_id = payload.get("book_id")
 
@@ -229,7 +424,7 @@ async def invalidate_sessions(
 
     # If book_id is provided, invalidate sessions for that book
     # If not, invalidate ALL sessions for the user (profile change case)
-    chat_repository.invalidate_user_sessions(db, UUID(user_id), UUID(book_id) if book_id else None)
+    await chat_repository.invalidate_user_sessions(db, UUID(user_id), UUID(book_id) if book_id else None)
 
     return {"status": "sessions invalidated"}
 
@@ -237,28 +432,38 @@ async def invalidate_sessions(
 @router.post("/feedback")
 async def student_feedback(
     request: FeedbackRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_user_id: str = Header(...),
 ):
     from core.metrics import STUDENT_FEEDBACK_TOTAL
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
 
-    success = chat_repository.update_answer_feedback(
+    log_entry, previous = await chat_repository.update_answer_feedback(
         db, request.audit_log_id, request.is_correct
     )
-    if success:
-        STUDENT_FEEDBACK_TOTAL.labels(is_correct=str(request.is_correct)).inc()
-    if not success:
+    if not log_entry:
         raise HTTPException(status_code=404, detail="Audit log not found")
+    STUDENT_FEEDBACK_TOTAL.labels(is_correct=str(request.is_correct)).inc()
+    await rollups.record_feedback(log_entry, previous, request.is_correct)
     return {"status": "success"}
 
 
-@router.get("/teacher/answers", response_model=List[AnswerReviewResponse])
+@router.get("/teacher/answers", response_model=AnswerReviewPage)
 async def get_teacher_answers(
-    db: Session = Depends(get_read_db),
+    db: AsyncSession = Depends(get_read_db),
     x_user_role: str = Header(...),
     x_user_faculty_id: Optional[str] = Header(None),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    unverified: bool = False,
+    low_confidence: bool = False,
+    incorrect: bool = False,
 ):
+    """
+    Review queue, newest first. Filters: answers not yet verified by a
+    teacher, answers with a low RAG confidence score and answers students
+    marked as incorrect.
+    """
     if x_user_role not in ["teacher", "admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
@@ -266,9 +471,23 @@ async def get_teacher_answers(
     if x_user_role == "teacher" and not x_user_faculty_id:
         raise HTTPException(status_code=403, detail="Teacher faculty context missing")
 
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
+    from repository.chat_repository import decode_review_cursor
 
-    return chat_repository.get_answers_for_review(db, faculty_id=x_user_faculty_id)
+    try:
+        after = decode_review_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return await chat_repository.get_answers_for_review(
+        db,
+        faculty_id=x_user_faculty_id,
+        after=after,
+        limit=limit,
+        unverified=unverified,
+        low_confidence=low_confidence,
+        incorrect=incorrect,
+    )
 
 
 @router.post("/teacher/answers/{answer_id}/verify")
@@ -276,20 +495,21 @@ async def teacher_verify(
     answer_id: UUID,
     request: TeacherVerifyRequest,
     fastapi_req: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_user_id: str = Header(...),
     x_user_role: str = Header(...),
 ):
     if x_user_role not in ["teacher", "admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
 
-    success = chat_repository.verify_answer_by_teacher(
+    success = await chat_repository.verify_answer_by_teacher(
         db, answer_id, request.verified, request.comment, request.custom_tags
     )
     if not success:
         raise HTTPException(status_code=404, detail="Answer not found")
+    await verified_answers.refresh(db, answer_id)
 
     log_audit(
         x_user_id,
@@ -307,21 +527,22 @@ async def teacher_feedback(
     answer_id: UUID,
     request: TeacherVerifyRequest,  # Reuse model for feedback
     fastapi_req: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_user_id: str = Header(...),
     x_user_role: str = Header(...),
 ):
     if x_user_role not in ["teacher", "admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
 
     # Feedback is essentially a verification with a comment
-    success = chat_repository.verify_answer_by_teacher(
+    success = await chat_repository.verify_answer_by_teacher(
         db, answer_id, True, request.comment, request.custom_tags
     )
     if not success:
         raise HTTPException(status_code=404, detail="Answer not found")
+    await verified_answers.refresh(db, answer_id)
 
     log_audit(
         x_user_id,
@@ -335,45 +556,47 @@ async def teacher_feedback(
 
 
 @router.get("/teacher/students/{student_id}/ai-confidence")
-@cache_result(ttl=600)
 async def get_student_confidence(
     student_id: UUID,
-    db: Session = Depends(get_read_db),
+    db: AsyncSession = Depends(get_read_db),
     x_user_role: str = Header(...),
 ):
     if x_user_role not in ["teacher", "admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    from repository import chat_repository
+    confidence = await rollups.get_student_confidence(student_id)
+    if confidence is None:
+        from repository import async_chat_repository as chat_repository
 
-    confidence = chat_repository.get_student_ai_confidence(db, student_id)
+        confidence = await chat_repository.get_student_ai_confidence(db, student_id)
     return {"student_id": student_id, "ai_confidence_score": confidence or 0.0}
 
 
 @router.get("/teacher/courses/{course_id}/progress")
-@cache_result(ttl=600)
 async def get_course_chat_progress(
     course_id: str,
-    db: Session = Depends(get_read_db),
+    db: AsyncSession = Depends(get_read_db),
     x_user_role: str = Header(...),
 ):
     if x_user_role not in ["teacher", "admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    from repository import chat_repository
+    progress = await rollups.get_course_progress(course_id)
+    if progress is None:
+        from repository import async_chat_repository as chat_repository
 
-    stats = chat_repository.get_course_progress(db, course_id)
-    return {
-        "course_id": course_id,
-        "total_interactions": stats.total_interactions,
-        "avg_confidence": float(stats.avg_confidence or 0),
-        "unique_students": stats.unique_students,
-    }
+        stats = await chat_repository.get_course_progress(db, course_id)
+        progress = {
+            "total_interactions": stats.total_interactions,
+            "avg_confidence": float(stats.avg_confidence or 0),
+            "unique_students": stats.unique_students,
+        }
+    return {"course_id": course_id, **progress}
 
 
 @router.get("/teacher/performance")
 async def get_teacher_performance(
-    db: Session = Depends(get_read_db),
+    db: AsyncSession = Depends(get_read_db),
     x_user_role: str = Header(...),
     x_user_faculty_id: Optional[str] = Header(None),
 ):
@@ -384,25 +607,29 @@ async def get_teacher_performance(
     if x_user_role == "teacher" and not x_user_faculty_id:
         raise HTTPException(status_code=403, detail="Teacher faculty context missing")
 
-    from repository import chat_repository
+    stats = await rollups.get_performance(x_user_faculty_id)
+    if stats is not None:
+        return stats
+
+    from repository import async_chat_repository as chat_repository
 
-    return chat_repository.get_performance_stats(db, faculty_id=x_user_faculty_id)
+    return await chat_repository.get_performance_stats(db, faculty_id=x_user_faculty_id)
 
 
 @router.post("/verify/{log_id}")
 async def admin_verify(
     log_id: UUID,
     verified: bool = True,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_user_role: str = Header(...),
 ):
     if x_user_role not in ["admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
     from core.metrics import VERIFIED_ANSWERS_TOTAL
-    from repository import chat_repository
+    from repository import async_chat_repository as chat_repository
 
-    success = chat_repository.verify_answer(db, log_id, verified)
+    success = await chat_repository.verify_answer(db, log_id, verified)
     if success:
         VERIFIED_ANSWERS_TOTAL.labels(is_verified=str(verified)).inc()
     if not success:
@@ -0,0 +1,186 @@
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import orjson
+import redis.asyncio as aioredis
+from core.config import settings
+from core.metrics import CACHE_LOOKUPS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# First byte of every value written by TwoTierCache. None of them can start a
+# JSON text, so values written before the binary encoding are still readable.
+_DOCUMENT = b"\x01"  # orjson
+_DOCUMENT_ZLIB = b"\x02"  # zlib-compressed orjson
+_FLOAT32 = b"\x03"  # float32 vector bytes
+_FLOAT16 = b"\x04"  # float16 vector bytes
+
+_VECTOR_TAGS = {"float32": _FLOAT32, "float16": _FLOAT16}
+_VECTOR_DTYPES = {_FLOAT32: np.float32, _FLOAT16: np.float16}
+
+redis = None
+
+
+async def get_redis():
+    global redis
+    if redis is None:
+        # Values are binary, so responses must not be decoded
+        redis = await aioredis.from_url(settings.REDIS_URL)
+    return redis
+
+
+def encode(value, vector_dtype: str = None, compress_min_bytes: int = None) -> bytes:
+    """
+    Vectors (lists of floats) become raw float32/float16 bytes when a
+    vector_dtype is given; anything else is orjson, zlib-compressed when it is
+    at least compress_min_bytes long and compression pays off.
+    """
+    if vector_dtype:
+        return _VECTOR_TAGS[vector_dtype] + np.asarray(
+            value, dtype=_VECTOR_DTYPES[_VECTOR_TAGS[vector_dtype]]
+        ).tobytes()
+    data = orjson.dumps(value)
+    if compress_min_bytes and len(data) >= compress_min_bytes:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            return _DOCUMENT_ZLIB + compressed
+    return _DOCUMENT + data
+
+
+def decode(raw: bytes, legacy_decoder=json.loads):
+    tag, body = raw[:1], raw[1:]
+    if tag == _DOCUMENT:
+        return orjson.loads(body)
+    if tag == _DOCUMENT_ZLIB:
+        return orjson.loads(zlib.decompress(body))
+    if tag in _VECTOR_DTYPES:
+        return np.frombuffer(body, dtype=_VECTOR_DTYPES[tag]).tolist()
+    return legacy_decoder(raw)
+
+
+class LocalLRU:
+    """
+    Bounded in-process LRU with a per-entry TTL. Values are returned without
+    copying, so callers must not mutate them.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: float = None):
+        if self.max_entries <= 0:
+            return
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class TwoTierCache:
+    """
+    Cache namespace with a per-process LRU/TTL tier in front of Redis.
+
+    Keys are stored in Redis as {namespace}:{key}. The local tier holds decoded
+    values for at most local_ttl seconds, which also bounds how long an entry
+    deleted from Redis by another process can still be served here. Redis
+    errors are logged and treated as misses.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        local_ttl: float = None,
+        local_max_entries: int = None,
+        vector_dtype: str = None,
+        compress_min_bytes: int = None,
+        legacy_decoder=json.loads,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.vector_dtype = vector_dtype
+        self.compress_min_bytes = compress_min_bytes
+        self.legacy_decoder = legacy_decoder
+        self.local = LocalLRU(
+            local_max_entries
+            if local_max_entries is not None
+            else settings.CACHE_LOCAL_MAX_ENTRIES,
+            local_ttl or settings.CACHE_LOCAL_TTL_SECONDS,
+        )
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _count(self, tier: str, result: str, n: int = 1):
+        if n:
+            CACHE_LOOKUPS_TOTAL.labels(
+                namespace=self.namespace, tier=tier, result=result
+            ).inc(n)
+
+    async def get(self, key: str):
+        return (await self.get_many([key]))[0]
+
+    async def get_first(self, *keys: str):
+        """
+        Value of the first key that is cached, looked up with one round-trip.
+        """
+        return next((v for v in await self.get_many(keys) if v is not None), None)
+
+    async def get_many(self, keys) -> list:
+        values = [self.local.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        self._count("local", "hit", len(keys) - len(missing))
+        self._count("local", "miss", len(missing))
+        if not missing:
+            return values
+        try:
+            r = await get_redis()
+            raws = await r.mget([self._redis_key(keys[i]) for i in missing])
+        except Exception as e:
+            logger.error(f"Cache read failed for {self.namespace}: {e}")
+            self._count("redis", "error", len(missing))
+            return values
+        for i, raw in zip(missing, raws):
+            if raw is None:
+                self._count("redis", "miss")
+                continue
+            try:
+                values[i] = decode(raw, self.legacy_decoder)
+            except Exception as e:
+                logger.error(f"Undecodable cache entry in {self.namespace}: {e}")
+                self._count("redis", "error")
+                continue
+            self._count("redis", "hit")
+            self.local.set(keys[i], values[i])
+        return values
+
+    async def set(self, key: str, value, ttl: int = None):
+        ttl = ttl or self.ttl
+        self.local.set(key, value, ttl)
+        try:
+            r = await get_redis()
+            await r.set(
+                self._redis_key(key),
+                encode(value, self.vector_dtype, self.compress_min_bytes),
+                ex=ttl,
+            )
+        except Exception as e:
+            logger.error(f"Cache write failed for {self.namespace}: {e}")
@@ -0,0 +1,19 @@
+import os
+
+from celery import Celery
+
+celery_app = Celery(
+    "chat_tasks",
+    broker=os.getenv("REDIS_URL", "redis://redis:6379/0"),
+    backend=os.getenv("REDIS_URL", "redis://redis:6379/0"),
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    result_serializer="json",
+    timezone="UTC",
+    enable_utc=True,
+    # The broker is shared with the other services' workers
+    task_default_queue="chat_tasks",
+)
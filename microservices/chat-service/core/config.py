@@ -3,9 +3,169 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    READ_DATABASE_URL: str | None = None
     REDIS_URL: str
     OPENAI_API_KEY: str
+    # OpenAI-compatible endpoint, e.g. loadtest/fake_openai.py (None: api.openai.com)
+    OPENAI_BASE_URL: str | None = None
     RAG_SERVICE_URL: str = "http://rag-service:8000"
+    NOTIFICATION_SERVICE_URL: str = "http://notification-service:8000"
+
+    # rag-service client: pooled connections, retry budget and circuit breaker
+    RAG_TIMEOUT_SECONDS: float = 3.0
+    RAG_CONNECT_TIMEOUT_SECONDS: float = 1.0
+    RAG_MAX_CONNECTIONS: int = 100
+    RAG_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    RAG_MAX_RETRIES: int = 1
+    RAG_RETRY_BUDGET_RATIO: float = 0.1
+    RAG_BREAKER_FAILURE_RATE: float = 0.5
+    RAG_BREAKER_MIN_REQUESTS: int = 10
+    RAG_BREAKER_WINDOW_SECONDS: float = 30.0
+    RAG_BREAKER_OPEN_SECONDS: float = 15.0
+    # Last known search results, served when rag-service is unavailable
+    RAG_STALE_TTL_SECONDS: int = 604800
+
+    # Async engine pool, per service instance (PgBouncer transaction mode)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 10
+    DB_POOL_RECYCLE: int = 300
+
+    # Recent chat history: messages put in the prompt, turns kept in Redis
+    CHAT_HISTORY_WINDOW: int = 3
+    CHAT_HISTORY_BUFFER_TURNS: int = 5
+    CHAT_HISTORY_BUFFER_TTL_SECONDS: int = 86400
+
+    # Follow-ups ("another example", "explain that again") reuse the previous
+    # turn's chunks while enough of their topical words occur in its query
+    # and chunks; below FOLLOWUP_MIN_TOPIC_OVERLAP they are retrieved afresh
+    FOLLOWUP_REUSE_ENABLED: bool = True
+    FOLLOWUP_INTENTS: list[str] = ["EXAMPLE", "CONFUSED"]
+    FOLLOWUP_MIN_TOPIC_OVERLAP: float = 0.5
+
+    # Speculative retrieval: the raw message is searched while the intent is
+    # detected; the results are kept when the rewritten query's token Jaccard
+    # similarity to the message is at least SPECULATIVE_RETRIEVAL_MIN_SIMILARITY
+    SPECULATIVE_RETRIEVAL_ENABLED: bool = True
+    SPECULATIVE_RETRIEVAL_MIN_SIMILARITY: float = 0.6
+
+    # Prompt token budgets (o200k_base tokens) per part of the tutor prompt
+    PROMPT_CONTEXT_TOKEN_BUDGET: int = 2500
+    PROMPT_HISTORY_TOKEN_BUDGET: int = 800
+    PROMPT_SUMMARY_TOKEN_BUDGET: int = 300
+
+    # Learning summary worker (summary_worker.py)
+    SUMMARY_EVERY_N_TURNS: int = 10
+    SUMMARY_IDLE_SECONDS: int = 600
+    SUMMARY_STREAM_MAXLEN: int = 100000
+    SUMMARY_WORKER_CONCURRENCY: int = 8
+    SUMMARY_WORKER_METRICS_PORT: int = 9100
+
+    # Per-process tier of the two-tier caches (core/cache.py)
+    CACHE_LOCAL_MAX_ENTRIES: int = 2048
+    CACHE_LOCAL_TTL_SECONDS: int = 60
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+    # float32 keeps embeddings exact; float16 halves their size again
+    EMBEDDING_CACHE_DTYPE: str = "float32"
+
+    # Teacher dashboard rollups (rollup_reconciler.py)
+    ROLLUP_RECONCILE_INTERVAL_SECONDS: int = 3600
+    ROLLUP_RECONCILER_METRICS_PORT: int = 9101
+
+    # Per-call caps, shortened to the time left before the request deadline
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    # Optional stages are skipped when less time than this is left
+    DEADLINE_MIN_AUDITOR_SECONDS: float = 3.0
+    DEADLINE_MIN_ESCALATION_SECONDS: float = 8.0
+
+    # Shared LLM scheduler (core/llm_scheduler.py): requests and tokens per
+    # minute per model, enforced across all services through Redis (keep
+    # them identical in every service)
+    LLM_RATE_LIMITS: dict[str, tuple[int, int]] = {
+        "gpt-4o": (5000, 800000),
+        "gpt-4o-mini": (10000, 4000000),
+        "text-embedding-3-small": (10000, 5000000),
+    }
+    # Share of each bucket that only interactive calls may use
+    LLM_BACKGROUND_RESERVE: float = 0.2
+    LLM_PRIORITY_WEIGHTS: dict[str, int] = {"interactive": 4, "background": 1}
+    LLM_RATE_LIMIT_PAUSE_SECONDS: float = 2.0
+    # Per-process concurrency, adapted AIMD between the min and the max
+    LLM_MIN_CONCURRENCY: int = 2
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_MAX_CONCURRENCY_PER_FACULTY: int = 16
+    LLM_MAX_CONCURRENCY_PER_USER: int = 2
+    LLM_LATENCY_TARGET_SECONDS: float = 20.0
+    LLM_BACKOFF_COOLDOWN_SECONDS: float = 5.0
+
+    # Model cascade: easy questions are answered by the small model and
+    # escalated to the large one when the answer fails JSON parsing or the
+    # groundedness check. A route is "small" only if every condition holds.
+    CASCADE_ENABLED: bool = True
+    CASCADE_SMALL_MODEL: str = "gpt-4o-mini"
+    CASCADE_LARGE_MODEL: str = "gpt-4o"
+    CASCADE_SMALL_INTENTS: list[str] = ["DEFINITION"]
+    CASCADE_SMALL_MODES: list[str] = ["UNDERSTANDING"]
+    CASCADE_MIN_RAG_SCORE: float = 0.85
+    CASCADE_MAX_CONTEXT_TOKENS: int = 1500
+
+    # USD per million tokens (prompt, completion) for the estimated cost metric
+    LLM_PRICES_PER_MILLION_TOKENS: dict[str, tuple[float, float]] = {
+        "gpt-4o": (2.5, 10.0),
+        "gpt-4o-mini": (0.15, 0.6),
+        "text-embedding-3-small": (0.02, 0.0),
+    }
+
+    # Semantic answer cache (per faculty/semester)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.93
+    SEMANTIC_CACHE_NEAR_MISS_MARGIN: float = 0.05
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+    SEMANTIC_CACHE_TTL_SECONDS: int = 86400
+
+    # Teacher-verified answers, served before the answer cache (per
+    # faculty/semester, exact normalized match or embedding similarity)
+    VERIFIED_ANSWERS_ENABLED: bool = True
+    VERIFIED_ANSWERS_THRESHOLD: float = 0.95
+    VERIFIED_ANSWERS_MAX_ENTRIES: int = 10000
+
+    # Coalescing of identical in-flight questions (per faculty/semester)
+    SINGLEFLIGHT_ENABLED: bool = True
+    SINGLEFLIGHT_LOCK_TTL_SECONDS: int = 60
+    SINGLEFLIGHT_WAIT_SECONDS: float = 30.0
+
+    # Idempotency-Key on POST /chat (core/idempotency.py): responses are
+    # replayed for the TTL; duplicates of an in-flight request wait for it
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_TTL_SECONDS: int = 120
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0
+
+    # Degraded mode (services/degraded_mode.py): while the median chat
+    # completion latency of the last window, over every replica and the chat
+    # worker, is above ENTER (until it falls below EXIT), /chat only serves
+    # cached and teacher-verified answers and defers the rest to the chat
+    # worker (tasks.py), returning 202 with a job id
+    DEGRADED_MODE_ENABLED: bool = True
+    DEGRADED_MODE_ENTER_SECONDS: float = 15.0
+    DEGRADED_MODE_EXIT_SECONDS: float = 8.0
+    DEGRADED_MODE_WINDOW_SECONDS: float = 60.0
+    DEGRADED_MODE_MIN_SAMPLES: int = 5
+    DEGRADED_MODE_CHECK_SECONDS: float = 2.0
+    # Deferred answers are kept for polling, and awaited by the SSE endpoint;
+    # the worker retries storing an answer CHAT_JOB_FINISH_ATTEMPTS times
+    CHAT_JOB_TTL_SECONDS: int = 3600
+    CHAT_JOB_EVENTS_WAIT_SECONDS: float = 50.0
+    CHAT_JOB_FINISH_ATTEMPTS: int = 3
+
+    # Local groundedness scores in [LOWER, UPPER) are sent to the LLM auditor
+    GROUNDEDNESS_LOWER_BOUND: float = 0.35
+    GROUNDEDNESS_UPPER_BOUND: float = 0.75
+
+    # Write-behind persistence of chat turns (messages + audit log)
+    CHAT_WRITE_BEHIND_ENABLED: bool = False
+    CHAT_WRITE_BEHIND_BATCH_SIZE: int = 100
+    CHAT_WRITE_BEHIND_FLUSH_INTERVAL_MS: int = 200
+    CHAT_WRITE_BEHIND_MAX_QUEUE: int = 5000
 
     class Config:
         extra = "ignore"
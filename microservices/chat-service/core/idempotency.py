@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import time
+from uuid import uuid4
+
+import redis.asyncio as aioredis
+from core import deadline
+from core.config import settings
+from core.metrics import IDEMPOTENCY_REQUESTS_TOTAL
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# JSON {"token", "fingerprint"} while in flight, then
+# {"fingerprint", "status_code", "response"} for IDEMPOTENCY_TTL_SECONDS
+RECORD_KEY = "idempotency:{scope}:{key}"
+DONE_CHANNEL = "idempotency:done:{scope}:{key}"  # published when the record settles
+
+# Drops the in-flight marker only if it is still ours
+RELEASE_MARKER = """
+local record = redis.call('GET', KEYS[1])
+if record and cjson.decode(record)['token'] == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def fingerprint(body) -> str:
+    return hashlib.md5(
+        json.dumps(jsonable_encoder(body), sort_keys=True).encode()
+    ).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Runs a POST handler once per Idempotency-Key so that client retries do
+    not repeat its work:
+    - the first request claims the key and runs; its response is kept for
+      IDEMPOTENCY_TTL_SECONDS and replayed to later requests with the key;
+    - a duplicate arriving while the first is in flight waits for its
+      response (up to IDEMPOTENCY_WAIT_SECONDS), then gets 409;
+    - reusing a key for a different body is refused with 422.
+    Keys are scoped per endpoint and user. A failed request releases its key
+    so that the retry runs again. When Redis is unavailable requests run
+    without the guarantee.
+
+        return await idempotency.run(f"chat:{user_id}", idempotency_key, request, handler)
+    """
+
+    def __init__(self):
+        self.redis = None
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    async def run(self, scope: str, key: str | None, body, handler):
+        """
+        Returns the result of `await handler()`, or the JSONResponse replaying
+        the stored result of an earlier request with the same key.
+        """
+        if not key:
+            return await handler()
+        record_key = RECORD_KEY.format(scope=scope, key=key)
+        request_fingerprint = fingerprint(body)
+        token = uuid4().hex
+        for _ in range(2):
+            try:
+                redis = await self._get_redis()
+                claimed = await redis.set(
+                    record_key,
+                    json.dumps({"token": token, "fingerprint": request_fingerprint}),
+                    nx=True,
+                    ex=settings.IDEMPOTENCY_LOCK_TTL_SECONDS,
+                )
+            except Exception as e:
+                logger.error(f"Idempotency key check failed: {e}")
+                return await handler()
+            if claimed:
+                break
+            record, waited = await self._wait_for_record(scope, key)
+            if record is None:
+                # The first request failed: run again, as it would have
+                continue
+            if record["fingerprint"] != request_fingerprint:
+                IDEMPOTENCY_REQUESTS_TOTAL.labels(result="mismatch").inc()
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request",
+                )
+            if "response" not in record:
+                IDEMPOTENCY_REQUESTS_TOTAL.labels(result="in_progress").inc()
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                )
+            IDEMPOTENCY_REQUESTS_TOTAL.labels(
+                result="waited" if waited else "replayed"
+            ).inc()
+            return JSONResponse(
+                content=record["response"],
+                status_code=record["status_code"],
+                headers={REPLAYED_HEADER: "true"},
+            )
+        else:
+            return await handler()
+
+        IDEMPOTENCY_REQUESTS_TOTAL.labels(result="executed").inc()
+        try:
+            result = await handler()
+        except BaseException:
+            await self._settle(scope, key, token, None, request_fingerprint)
+            raise
+        await self._settle(scope, key, token, result, request_fingerprint)
+        return result
+
+    async def _settle(self, scope: str, key: str, token: str, result, request_fingerprint: str):
+        """
+        Stores the handler's result, a JSON-able object or a JSONResponse
+        (None: releases the key), and wakes the waiters.
+        """
+        record_key = RECORD_KEY.format(scope=scope, key=key)
+        try:
+            redis = await self._get_redis()
+            pipe = redis.pipeline()
+            if result is None:
+                pipe.eval(RELEASE_MARKER, 1, record_key, token)
+            else:
+                if isinstance(result, Response):
+                    status_code, response = result.status_code, json.loads(result.body)
+                else:
+                    status_code, response = 200, jsonable_encoder(result)
+                record = {
+                    "fingerprint": request_fingerprint,
+                    "status_code": status_code,
+                    "response": response,
+                }
+                pipe.set(
+                    record_key,
+                    json.dumps(record, ensure_ascii=False),
+                    ex=settings.IDEMPOTENCY_TTL_SECONDS,
+                )
+            pipe.publish(DONE_CHANNEL.format(scope=scope, key=key), "")
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to store idempotent response {scope}:{key}: {e}")
+
+    async def _wait_for_record(self, scope: str, key: str) -> tuple[dict | None, bool]:
+        """
+        (record, waited): the record of the request holding `key` once it has
+        a response, or still in flight after IDEMPOTENCY_WAIT_SECONDS (or the
+        request deadline). The record is None when the key was released.
+        """
+        record_key = RECORD_KEY.format(scope=scope, key=key)
+        pubsub = None
+        try:
+            redis = await self._get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(DONE_CHANNEL.format(scope=scope, key=key))
+            # Read after subscribing: the first request may have settled already
+            record = await redis.get(record_key)
+            waited = False
+            give_up_at = time.monotonic() + deadline.timeout(settings.IDEMPOTENCY_WAIT_SECONDS)
+            while record is not None and "response" not in json.loads(record):
+                remaining = give_up_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                waited = True
+                await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+                record = await redis.get(record_key)
+            return (None if record is None else json.loads(record)), waited
+        except Exception as e:
+            logger.error(f"Idempotency wait failed: {e}")
+            return None, False
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
+
+
+# Singleton instance
+idempotency = IdempotencyStore()
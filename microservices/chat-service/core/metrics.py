@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 # AI Teacher Performance Metrics
 ANSWERS_TOTAL = Counter(
@@ -18,6 +18,37 @@ SIMILARITY_SCORE = Histogram(
     buckets=[0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0]
 )
 
+INTENT_CLASSIFICATIONS_TOTAL = Counter(
+    "ai_teacher_intent_classifications_total",
+    "Intent detections by engine (rules, centroid, llm, followup)",
+    ["source"]
+)
+
+GROUNDEDNESS_SCORE = Histogram(
+    "ai_teacher_groundedness_score",
+    "Local lexical groundedness score of generated answers",
+    buckets=[0.1, 0.2, 0.3, 0.35, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.9, 1.0]
+)
+
+GROUNDEDNESS_VERDICTS_TOTAL = Counter(
+    "ai_teacher_groundedness_verdicts_total",
+    "Groundedness verdicts by deciding engine (local, llm, or deadline when the auditor was skipped)",
+    ["source", "grounded"]
+)
+
+SEMANTIC_CACHE_LOOKUPS_TOTAL = Counter(
+    "ai_teacher_semantic_cache_lookups_total",
+    "Semantic cache lookups by result (hit, near_miss, miss)",
+    ["cache", "result"]
+)
+
+SEMANTIC_CACHE_SIMILARITY = Histogram(
+    "ai_teacher_semantic_cache_similarity",
+    "Cosine similarity of the closest semantic cache entry",
+    ["cache"],
+    buckets=[0.5, 0.6, 0.7, 0.8, 0.85, 0.88, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0]
+)
+
 VERIFIED_ANSWERS_TOTAL = Counter(
     "ai_teacher_verified_answers_total",
     "Total number of answers verified by admins",
@@ -36,7 +67,215 @@ ANSWER_LATENCY = Histogram(
     buckets=[0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0]
 )
 
+TIME_TO_FIRST_TOKEN = Histogram(
+    "ai_teacher_time_to_first_token_seconds",
+    "Time until the first answer token is sent on the streaming chat endpoint",
+    buckets=[0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0]
+)
+
+RAG_BREAKER_STATE = Gauge(
+    "ai_teacher_rag_breaker_state",
+    "Circuit breaker state of a dependency (0 closed, 1 half-open, 2 open)",
+    ["dependency"]
+)
+
+RAG_RETRIES_TOTAL = Counter(
+    "ai_teacher_rag_retries_total",
+    "rag-service search retries allowed by the retry budget"
+)
+
+RAG_FALLBACK_TOTAL = Counter(
+    "ai_teacher_rag_fallback_total",
+    "Stale rag_cache fallbacks when rag-service is unavailable",
+    ["reason", "result"]
+)
+
+TURN_FLUSH_LATENCY = Histogram(
+    "ai_teacher_turn_flush_latency_seconds",
+    "Time taken to persist chat turns in one transaction",
+    ["mode"],
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+TURN_FLUSH_BATCH_SIZE = Histogram(
+    "ai_teacher_turn_flush_batch_size",
+    "Number of chat turns persisted per write-behind flush",
+    buckets=[1, 2, 5, 10, 25, 50, 100, 250, 500]
+)
+
+TURN_WRITE_QUEUE_DEPTH = Gauge(
+    "ai_teacher_turn_write_queue_depth",
+    "Chat turns waiting in the write-behind queue"
+)
+
+SUMMARY_EVENTS_TOTAL = Counter(
+    "ai_teacher_summary_events_total",
+    "Chat turns received by the learning summary worker"
+)
+
+SUMMARY_UPDATES_TOTAL = Counter(
+    "ai_teacher_summary_updates_total",
+    "Learning summary LLM updates by trigger (turns, idle)",
+    ["trigger"]
+)
+
+SUMMARY_TURNS_PER_UPDATE = Histogram(
+    "ai_teacher_summary_turns_per_update",
+    "Chat turns folded into one learning summary update",
+    buckets=[1, 2, 3, 5, 10, 15, 20, 50]
+)
+
+PROMPT_TOKENS = Histogram(
+    "ai_teacher_prompt_tokens",
+    "Tokens per tutor prompt by part (context, history, summary, total)",
+    ["part"],
+    buckets=[0, 50, 100, 250, 500, 1000, 1500, 2000, 2500, 3000, 4000, 6000, 8000]
+)
+
+SINGLEFLIGHT_LEADERS_TOTAL = Counter(
+    "ai_teacher_singleflight_leaders_total",
+    "Chat answers computed on behalf of coalesced identical questions"
+)
+
+SINGLEFLIGHT_WAITERS_TOTAL = Counter(
+    "ai_teacher_singleflight_waiters_total",
+    "Requests that awaited an identical in-flight question (shared, fallback)",
+    ["result"]
+)
+
+SINGLEFLIGHT_WAITERS = Gauge(
+    "ai_teacher_singleflight_waiting",
+    "Requests currently awaiting an identical in-flight question"
+)
+
+CACHE_LOOKUPS_TOTAL = Counter(
+    "ai_teacher_cache_lookups_total",
+    "Two-tier cache lookups by namespace, tier (local, redis) and result",
+    ["namespace", "tier", "result"]
+)
+
+ROLLUP_READS_TOTAL = Counter(
+    "ai_teacher_rollup_reads_total",
+    "Teacher dashboard reads by scope, served from rollups or the database",
+    ["scope", "source"]
+)
+
+ROLLUP_DRIFT_TOTAL = Counter(
+    "ai_teacher_rollup_drift_total",
+    "Rollups corrected by the reconciliation job",
+    ["scope"]
+)
+
 START_CHAT_TOTAL = Counter(
     "ai_teacher_start_chat_total",
     "Total number of book-scoped chat starts"
 )
+
+STAGE_LATENCY = Histogram(
+    "ai_teacher_stage_latency_seconds",
+    "Time spent per chat answer pipeline stage",
+    ["stage"],
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0]
+)
+
+LLM_TOKENS_TOTAL = Counter(
+    "ai_teacher_llm_tokens_total",
+    "OpenAI tokens by model and kind (prompt, completion), from response usage",
+    ["model", "kind"]
+)
+
+LLM_COST_USD_TOTAL = Counter(
+    "ai_teacher_llm_cost_usd_total",
+    "Estimated OpenAI cost in USD by faculty",
+    ["faculty_id"]
+)
+
+CASCADE_ANSWERS_TOTAL = Counter(
+    "ai_teacher_cascade_answers_total",
+    "Generated answers by cascade route (small, large) and outcome (accepted, escalated, failed)",
+    ["route", "outcome"]
+)
+
+CASCADE_ESCALATIONS_TOTAL = Counter(
+    "ai_teacher_cascade_escalations_total",
+    "Small-model answers escalated to the large model by reason (json, ungrounded)",
+    ["reason"]
+)
+
+CASCADE_LATENCY = Histogram(
+    "ai_teacher_cascade_latency_seconds",
+    "Generation and validation time of an answer by cascade route, escalation included",
+    ["route"],
+    buckets=[0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0]
+)
+
+DEADLINE_EXCEEDED_TOTAL = Counter(
+    "ai_teacher_deadline_exceeded_total",
+    "Stages cancelled or skipped because of the request deadline (X-Request-Deadline)",
+    ["stage", "action"]
+)
+
+FOLLOWUP_REUSE_TOTAL = Counter(
+    "ai_teacher_followup_reuse_total",
+    "Follow-up questions by retrieval outcome (reused, new_topic, no_context)",
+    ["result"]
+)
+
+SPECULATIVE_RETRIEVAL_TOTAL = Counter(
+    "ai_teacher_speculative_retrieval_total",
+    "Speculative retrievals of the raw message by outcome (hit, miss, cancelled)",
+    ["result"]
+)
+
+SPECULATIVE_RETRIEVAL_SAVED = Histogram(
+    "ai_teacher_speculative_retrieval_saved_seconds",
+    "Retrieval time overlapped with intent detection on speculation hits",
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0]
+)
+
+VERIFIED_ANSWERS_SERVED_TOTAL = Counter(
+    "ai_teacher_verified_answers_served_total",
+    "Teacher-verified answers served instead of a generated one, by match (text, semantic)",
+    ["match"]
+)
+
+LLM_QUEUE_WAIT = Histogram(
+    "ai_teacher_llm_queue_wait_seconds",
+    "Time an OpenAI call waited for the LLM scheduler (concurrency slot and rate limits), by priority class",
+    ["priority"],
+    buckets=[0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+)
+
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "ai_teacher_llm_concurrency_limit",
+    "Current AIMD limit on concurrent OpenAI calls of this process"
+)
+
+LLM_BACKOFFS_TOTAL = Counter(
+    "ai_teacher_llm_backoffs_total",
+    "LLM scheduler backoff signals by reason (rate_limited, latency)",
+    ["reason"]
+)
+
+IDEMPOTENCY_REQUESTS_TOTAL = Counter(
+    "ai_teacher_idempotency_requests_total",
+    "Requests carrying an Idempotency-Key by outcome (executed, replayed, waited, in_progress, mismatch)",
+    ["result"]
+)
+
+DEGRADED_MODE_ACTIVE = Gauge(
+    "ai_teacher_degraded_mode_active",
+    "Whether this process serves /chat in degraded mode (1) because the LLM provider is slow"
+)
+
+DEGRADED_MODE_REQUESTS_TOTAL = Counter(
+    "ai_teacher_degraded_mode_requests_total",
+    "/chat requests received in degraded mode by outcome (answered, deferred)",
+    ["result"]
+)
+
+CHAT_JOBS_TOTAL = Counter(
+    "ai_teacher_chat_jobs_total",
+    "Deferred chat answers computed by the chat worker by status (done, failed)",
+    ["status"]
+)
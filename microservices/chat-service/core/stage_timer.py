@@ -0,0 +1,122 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from core import deadline
+from core.config import settings
+from core.metrics import LLM_COST_USD_TOTAL, LLM_TOKENS_TOTAL, STAGE_LATENCY
+from opentelemetry import trace
+
+tracer = trace.get_tracer(__name__)
+
+_current_timer = ContextVar("stage_timer", default=None)
+
+
+class StageTimer:
+    """
+    Per-answer timings of the chat pipeline stages. Every stage is observed in
+    STAGE_LATENCY and traced as a child span of the request span with the
+    same name; OpenAI usage reported while the timer is active is added to
+    the answer's token count and to its faculty's estimated cost.
+
+        with StageTimer(faculty_id) as timer:
+            with stage("intent"):
+                ...
+    """
+
+    def __init__(self, faculty_id: str = None):
+        self.faculty_id = faculty_id
+        self.durations = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.cost = 0.0
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_timer.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            _current_timer.reset(self._token)
+        except ValueError:
+            # A streaming response closed from another context (client gone)
+            pass
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def summary(self) -> dict:
+        return {name: round(seconds * 1000) for name, seconds in self.durations.items()}
+
+
+def current_timer() -> StageTimer | None:
+    return _current_timer.get()
+
+
+@contextmanager
+def stage(name: str, check_deadline: bool = False):
+    """
+    Times a block that does not yield control to a caller (plain awaits are
+    fine); async generators use record_stage instead. With check_deadline
+    (remote stages before the answer exists), raises DeadlineExceeded instead
+    of starting the stage once the request deadline has passed. Stages after
+    generation never check it: the answer is paid for and must be delivered
+    and persisted.
+    """
+    if check_deadline:
+        deadline.check(name)
+    start = time.perf_counter()
+    with tracer.start_as_current_span(name):
+        try:
+            yield
+        finally:
+            _observe(name, time.perf_counter() - start)
+
+
+def record_stage(name: str, seconds: float):
+    """
+    Records a stage timed by the caller, e.g. generation spread over the
+    tokens of a streamed answer. The span is back-dated to its start.
+    """
+    end = time.time_ns()
+    tracer.start_span(name, start_time=end - int(seconds * 1e9)).end(end_time=end)
+    _observe(name, seconds)
+
+
+def _observe(name: str, seconds: float):
+    STAGE_LATENCY.labels(stage=name).observe(seconds)
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    USD estimate from LLM_PRICES_PER_MILLION_TOKENS; unknown models cost 0.
+    """
+    prompt_price, completion_price = settings.LLM_PRICES_PER_MILLION_TOKENS.get(
+        model, (0.0, 0.0)
+    )
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+def record_usage(model: str, usage):
+    """
+    Counts the `usage` of an OpenAI response (chat completion, final stream
+    chunk or embedding). Missing usage is ignored.
+    """
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    LLM_TOKENS_TOTAL.labels(model=model, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS_TOTAL.labels(model=model, kind="completion").inc(completion_tokens)
+
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    timer = _current_timer.get()
+    faculty_id = timer.faculty_id if timer is not None else None
+    LLM_COST_USD_TOTAL.labels(faculty_id=faculty_id or "none").inc(cost)
+    if timer is not None:
+        timer.tokens["prompt"] += prompt_tokens
+        timer.tokens["completion"] += completion_tokens
+        timer.cost += cost
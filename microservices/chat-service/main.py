@@ -2,6 +2,7 @@ import uuid
 
 import redis.asyncio as aioredis
 from api.chat import router as chat_router
+from core import deadline
 from core.config import settings
 from core.observability import instrument_app, setup_logging, setup_tracing
 from db.base import Base
@@ -9,6 +10,8 @@ from db.session import engine
 from fastapi import FastAPI, Request
 from fastapi_limiter import FastAPILimiter
 from prometheus_fastapi_instrumentator import Instrumentator
+from services.rag_client import rag_client
+from services.turn_writer import turn_writer
 
 # Setup observability
 logger = setup_logging("chat-service")
@@ -18,6 +21,7 @@ Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Chat Service", version="1.0.0")
 instrument_app(app, "chat-service")
+deadline.install(app)
 
 
 @app.on_event("startup")
@@ -30,6 +34,13 @@ async def startup():
         Instrumentator().instrument(app).expose(app)
     except Exception as e:
         logger.error(f"Failed to initialize Redis for rate limiting: {e}")
+    await turn_writer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await turn_writer.stop()
+    await rag_client.close()
 
 
 @app.middleware("http")
@@ -1,5 +1,5 @@
 from db.base import BaseModel
-from sqlalchemy import JSON, Boolean, Column, Float, ForeignKey, String, Text
+from sqlalchemy import JSON, Boolean, Column, Float, ForeignKey, Index, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 
 
@@ -22,11 +22,17 @@ class ChatMessage(BaseModel):
     role = Column(String(50), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
 
+    __table_args__ = (
+        # Recent-history window: WHERE session_id = ? ORDER BY created_at DESC LIMIT N
+        Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),
+    )
+
 
 class AnswerAuditLog(BaseModel):
     __tablename__ = "answer_audit_logs"
     user_id = Column(UUID(as_uuid=True), index=True, nullable=False)
     session_id = Column(UUID(as_uuid=True), index=True)
+    faculty_id = Column(String(255))  # copied from the session for the review queue
     book_id = Column(String(255), index=True)
     question_text = Column(Text, nullable=False)
     ai_answer = Column(Text, nullable=False)
@@ -35,5 +41,34 @@ class AnswerAuditLog(BaseModel):
     verified_by_teacher = Column(Boolean, default=False)
     teacher_comment = Column(Text)
     rag_confidence_score = Column(Float)
+    groundedness_score = Column(Float)  # local lexical score in [0, 1]
+    groundedness_source = Column(String(20))  # engine that decided: local / llm
     custom_tags = Column(JSON)
     is_correct = Column(Boolean, nullable=True)  # student feedback
+
+    __table_args__ = (
+        # Teacher review queue: WHERE faculty_id = ? [AND filter]
+        # ORDER BY created_at DESC, id DESC with a (created_at, id) keyset cursor
+        Index("ix_answer_audit_logs_review", "faculty_id", "created_at", "id"),
+        Index(
+            "ix_answer_audit_logs_review_unverified",
+            "faculty_id",
+            "created_at",
+            "id",
+            postgresql_where=text("verified_by_teacher IS false"),
+        ),
+        Index(
+            "ix_answer_audit_logs_review_incorrect",
+            "faculty_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_correct IS false"),
+        ),
+        Index(
+            "ix_answer_audit_logs_review_low_confidence",
+            "faculty_id",
+            "created_at",
+            "id",
+            postgresql_where=text("rag_confidence_score < 0.8"),
+        ),
+    )
@@ -0,0 +1,48 @@
+import re
+
+# Harakat, tanween, shadda, sukun and the superscript alef
+_ARABIC_DIACRITICS = re.compile(r"[\u0610-\u061a\u064b-\u0652\u0670]")
+_TATWEEL = "\u0640"
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+_WHITESPACE = re.compile(r"\s+")
+
+_CHAR_MAP = str.maketrans(
+    {
+        "أ": "ا",
+        "إ": "ا",
+        "آ": "ا",
+        "ٱ": "ا",
+        "ى": "ي",
+        "ؤ": "و",
+        "ئ": "ي",
+        "ة": "ه",
+    }
+)
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Folds Arabic orthographic variants (diacritics, tatweel, alef/yaa/taa marbuta
+    forms) so that spelling differences do not change the normalized text.
+    """
+    text = _ARABIC_DIACRITICS.sub("", text or "")
+    text = text.replace(_TATWEEL, "")
+    return text.translate(_CHAR_MAP)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalizes a student question for exact-match caching: Arabic folding,
+    lowercasing, punctuation removal and whitespace collapsing.
+    """
+    text = normalize_arabic(question).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits normalized text into word tokens.
+    """
+    normalized = normalize_question(text)
+    return normalized.split() if normalized else []
@@ -1,20 +1,217 @@
-def create_teacher_prompt(
+import logging
+import re
+
+from core.config import settings
+from rag.normalize import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Chunks are split with CHUNK_OVERLAP = 50 characters in rag-service; a shared
+# boundary of at least MIN_OVERLAP characters means two chunks are adjacent spans
+MIN_OVERLAP = 16
+MAX_OVERLAP = 200
+DUPLICATE_JACCARD = 0.85
+# Per-message framing tokens added by the chat completions format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_SENTENCE_END = re.compile(r"[.!?؟\n]")
+
+_encoding = None
+
+
+def _get_encoding():
+    """
+    o200k_base (gpt-4o/gpt-4o-mini), loaded on first use. Returns None when the
+    BPE file cannot be loaded (e.g. no network and no TIKTOKEN_CACHE_DIR).
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        # Arabic text averages roughly 3 characters per o200k token
+        return -(-len(text) // 3)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: max_tokens * 3]
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def _boundary_overlap(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of `left` that is a prefix of `right`.
+    """
+    for size in range(min(len(left), len(right), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def drop_near_duplicates(chunks: list[dict], threshold: float = DUPLICATE_JACCARD) -> list[dict]:
+    """
+    Keeps the highest-scoring chunk of every group of near-identical chunks
+    (the same passage indexed twice, or re-uploaded editions of a book).
+    """
+    kept, kept_tokens = [], []
+    for chunk in sorted(chunks, key=lambda c: c.get("score", 0.0), reverse=True):
+        tokens = set(normalize_question(chunk.get("text", "")).split())
+        if any(_jaccard(tokens, other) >= threshold for other in kept_tokens):
+            continue
+        kept.append(chunk)
+        kept_tokens.append(tokens)
+    return kept
+
+
+def merge_chunks(chunks: list[dict]) -> list[dict]:
+    """
+    Merges chunks of the same (source, page): a chunk contained in another is
+    dropped and two chunks sharing an overlap boundary are joined into one
+    span, so the overlapping text is sent once. The remaining chunks of a page
+    become one block under a single header. A block scores as its best chunk.
+    """
+    pages = {}
+    for chunk in chunks:
+        key = (chunk.get("source", "Unknown"), chunk.get("page", "N/A"))
+        pages.setdefault(key, []).append(chunk)
+
+    blocks = []
+    for (source, page), members in pages.items():
+        spans = [c.get("text", "").strip() for c in members]
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(spans)):
+                for j in range(len(spans)):
+                    if i == j:
+                        continue
+                    if spans[j] in spans[i]:
+                        del spans[j]
+                    else:
+                        overlap = _boundary_overlap(spans[i], spans[j])
+                        if not overlap:
+                            continue
+                        spans[i] = spans[i] + spans[j][overlap:]
+                        del spans[j]
+                    merged = True
+                    break
+                if merged:
+                    break
+        best = max(members, key=lambda c: c.get("score", 0.0))
+        blocks.append(
+            {
+                **best,
+                "source": source,
+                "page": page,
+                "text": "\n...\n".join(s for s in spans if s),
+                "merged_from": len(members),
+            }
+        )
+    return blocks
+
+
+def _format_block(index: int, block: dict) -> str:
+    return (
+        f"Chunk [{index}] (Source: {block.get('source', 'Unknown')}, "
+        f"Page: {block.get('page', 'N/A')}):\n{block.get('text', '')}"
+    )
+
+
+def pack_context(chunks: list[dict], budget: int) -> list[dict]:
+    """
+    Deduplicates and merges the retrieved chunks, then fills the token budget
+    with the highest-scoring blocks. A block that does not fit is skipped in
+    favour of smaller ones, except the best block, which is cut at a sentence
+    boundary rather than leaving the prompt without context.
+    """
+    blocks = sorted(
+        merge_chunks(drop_near_duplicates(chunks)),
+        key=lambda b: b.get("score", 0.0),
+        reverse=True,
+    )
+    packed, used = [], 0
+    for block in blocks:
+        cost = count_tokens(_format_block(len(packed), block)) + 2  # separator
+        if used + cost <= budget:
+            packed.append(block)
+            used += cost
+        elif not packed:
+            header = count_tokens(_format_block(0, {**block, "text": ""}))
+            text = truncate_to_tokens(block.get("text", ""), budget - header - 2)
+            cut = max((m.end() for m in _SENTENCE_END.finditer(text)), default=0)
+            if cut > len(text) // 2:
+                text = text[:cut]
+            if text:
+                packed.append({**block, "text": text})
+                used += count_tokens(_format_block(0, packed[0])) + 2
+    return packed
+
+
+def fit_history(chat_history: list, budget: int) -> list[dict]:
+    """
+    The most recent messages whose tokens fit in the budget, oldest first.
+    """
+    fitted, used = [], 0
+    for msg in reversed(chat_history or []):
+        content = msg.get("content", "")
+        cost = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget:
+            break
+        fitted.append({"role": msg.get("role", "user"), "content": content})
+        used += cost
+    return list(reversed(fitted))
+
+
+def build_teacher_prompt(
     retrieved_context: list[dict],
     user_question: str,
     chat_history: list = None,
     learning_summary: str = None,
     intent: str = "GENERAL",
     mode: str = "UNDERSTANDING",
-) -> list[dict]:
+    context_budget: int = None,
+    history_budget: int = None,
+    summary_budget: int = None,
+) -> dict:
     """
-    Creates a strict, production-grade deterministic prompt for the AI Tutor.
+    Assembles the tutor prompt within the PROMPT_*_TOKEN_BUDGET settings.
+    Returns the messages, the chunks that made it into the prompt and the
+    token count of each part (context, history, summary, total).
     """
-    formatted_chunks = []
-    for i, chunk in enumerate(retrieved_context):
-        chunk_text = chunk.get("text", "")
-        source = chunk.get("source", "Unknown")
-        page = chunk.get("page", "N/A")
-        formatted_chunks.append(f"Chunk [{i}] (Source: {source}, Page: {page}):\n{chunk_text}")
+    context_budget = context_budget or settings.PROMPT_CONTEXT_TOKEN_BUDGET
+    history_budget = history_budget or settings.PROMPT_HISTORY_TOKEN_BUDGET
+    summary_budget = summary_budget or settings.PROMPT_SUMMARY_TOKEN_BUDGET
+
+    context_chunks = pack_context(retrieved_context or [], context_budget)
+    formatted_chunks = [_format_block(i, b) for i, b in enumerate(context_chunks)]
+    if learning_summary:
+        learning_summary = truncate_to_tokens(learning_summary, summary_budget)
 
     context_str = (
         "\n\n---\n\n".join(formatted_chunks)
@@ -54,11 +251,8 @@ DETECTED INTENT: {intent}
         {"role": "system", "content": system_instructions},
     ]
 
-    if chat_history:
-        for msg in chat_history[-5:]:  # Keep last 5 turns for context
-            messages.append(
-                {"role": msg.get("role", "user"), "content": msg.get("content", "")}
-            )
+    history = fit_history((chat_history or [])[-5:], history_budget)
+    messages.extend(history)
 
     user_content = f"""
 المحتوى المرجعي:
@@ -69,4 +263,37 @@ DETECTED INTENT: {intent}
 """
     messages.append({"role": "user", "content": user_content})
 
-    return messages
+    token_counts = {
+        "context": count_tokens(context_str) if formatted_chunks else 0,
+        "history": sum(count_tokens(m["content"]) for m in history),
+        "summary": count_tokens(learning_summary),
+        "total": sum(
+            count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages
+        ),
+    }
+    return {
+        "messages": messages,
+        "context_chunks": context_chunks,
+        "token_counts": token_counts,
+    }
+
+
+def create_teacher_prompt(
+    retrieved_context: list[dict],
+    user_question: str,
+    chat_history: list = None,
+    learning_summary: str = None,
+    intent: str = "GENERAL",
+    mode: str = "UNDERSTANDING",
+) -> list[dict]:
+    """
+    Creates a strict, production-grade deterministic prompt for the AI Tutor.
+    """
+    return build_teacher_prompt(
+        retrieved_context,
+        user_question,
+        chat_history,
+        learning_summary,
+        intent=intent,
+        mode=mode,
+    )["messages"]
@@ -0,0 +1,320 @@
+"""
+AsyncSession versions of the chat_repository functions, used on the request
+path so database round-trips do not block the event loop.
+"""
+
+import json
+from datetime import datetime
+from uuid import UUID, uuid4
+
+from models.chat import AnswerAuditLog, ChatMessage, ChatSession
+from repository.chat_repository import (
+    _audit_log_row,
+    answer_stats_query,
+    course_progress_query,
+    review_page,
+    review_queue_query,
+    verified_answers_query,
+)
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def get_chat_session(db: AsyncSession, session_id: UUID):
+    result = await db.execute(
+        select(ChatSession).where(
+            ChatSession.id == session_id, ChatSession.is_deleted.is_(None)
+        )
+    )
+    return result.scalars().first()
+
+
+async def create_chat_session(
+    db: AsyncSession,
+    user_id: str,
+    collection_name: str = None,
+    faculty_id: str = None,
+    semester_id: str = None,
+    book_id: UUID = None,
+):
+    session = ChatSession(
+        id=uuid4(),
+        user_id=user_id,
+        collection_name=collection_name,
+        faculty_id=faculty_id,
+        semester_id=semester_id,
+        book_id=book_id,
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    return session
+
+
+async def get_latest_learning_summary(
+    db: AsyncSession, user_id: str, collection_name: str
+):
+    result = await db.execute(
+        select(ChatSession.learning_summary)
+        .where(
+            ChatSession.user_id == user_id,
+            ChatSession.collection_name == collection_name,
+            ChatSession.learning_summary.is_not(None),
+        )
+        .order_by(ChatSession.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar()
+
+
+async def update_session_summary(db: AsyncSession, session_id: UUID, summary: str):
+    session = await get_chat_session(db, session_id)
+    if session:
+        session.learning_summary = summary
+        await db.commit()
+    return session
+
+
+async def get_chat_messages(db: AsyncSession, session_id: UUID):
+    result = await db.execute(
+        select(ChatMessage)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at.asc())
+    )
+    return result.scalars().all()
+
+
+async def get_recent_chat_messages(db: AsyncSession, session_id: UUID, limit: int):
+    """
+    The last `limit` messages of the session, oldest first.
+    """
+    result = await db.execute(
+        select(ChatMessage)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at.desc())
+        .limit(limit)
+    )
+    return list(reversed(result.scalars().all()))
+
+
+async def create_chat_message(
+    db: AsyncSession, session_id: UUID, role: str, content: str
+):
+    message = ChatMessage(session_id=session_id, role=role, content=content)
+    db.add(message)
+    await db.commit()
+    await db.refresh(message)
+    return message
+
+
+async def soft_delete_session(db: AsyncSession, session_id: UUID, user_id: str):
+    result = await db.execute(
+        update(ChatSession)
+        .where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+        .values(is_deleted=datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def invalidate_user_sessions(
+    db: AsyncSession, user_id: UUID, book_id: UUID = None
+):
+    stmt = update(ChatSession).where(
+        ChatSession.user_id == user_id, ChatSession.is_deleted.is_(None)
+    )
+    if book_id:
+        stmt = stmt.where(ChatSession.book_id == book_id)
+    await db.execute(stmt.values(is_deleted=datetime.utcnow()))
+    await db.commit()
+
+
+async def create_answer_audit_log(
+    db: AsyncSession,
+    user_id: str,
+    session_id: UUID,
+    question_text: str,
+    ai_answer: str,
+    source_info: dict,
+    book_id: str = None,
+    rag_confidence_score: float = None,
+    groundedness: dict = None,
+    faculty_id: str = None,
+):
+    groundedness = groundedness or {}
+    log_entry = AnswerAuditLog(
+        id=uuid4(),
+        user_id=user_id,
+        session_id=session_id,
+        faculty_id=faculty_id,
+        book_id=book_id,
+        question_text=question_text,
+        ai_answer=ai_answer,
+        source_reference=json.dumps(source_info),
+        verified=False,
+        rag_confidence_score=rag_confidence_score,
+        groundedness_score=groundedness.get("score"),
+        groundedness_source=groundedness.get("source"),
+    )
+    db.add(log_entry)
+    await db.commit()
+    await db.refresh(log_entry)
+    return log_entry
+
+
+async def persist_chat_turns(db: AsyncSession, turns: list[dict]) -> list[UUID]:
+    """
+    See chat_repository.persist_chat_turns.
+    """
+    if not turns:
+        return []
+    messages = []
+    for turn in turns:
+        messages.append(
+            {"session_id": turn["session_id"], "role": "user", "content": turn["question_text"]}
+        )
+        messages.append(
+            {"session_id": turn["session_id"], "role": "assistant", "content": turn["ai_answer"]}
+        )
+    try:
+        await db.execute(
+            insert(ChatMessage)
+            .values(created_at=func.clock_timestamp())
+            .returning(ChatMessage.id, sort_by_parameter_order=True),
+            messages,
+        )
+        result = await db.execute(
+            insert(AnswerAuditLog).returning(
+                AnswerAuditLog.id, sort_by_parameter_order=True
+            ),
+            [_audit_log_row(turn) for turn in turns],
+        )
+        audit_log_ids = result.scalars().all()
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return list(audit_log_ids)
+
+
+async def persist_chat_turn(db: AsyncSession, **turn) -> UUID:
+    return (await persist_chat_turns(db, [turn]))[0]
+
+
+async def _get_audit_log(db: AsyncSession, log_id: UUID):
+    result = await db.execute(select(AnswerAuditLog).where(AnswerAuditLog.id == log_id))
+    return result.scalars().first()
+
+
+async def update_answer_feedback(db: AsyncSession, log_id: UUID, is_correct: bool):
+    """
+    Returns (log_entry, previous is_correct), or (None, None) when not found.
+    """
+    log_entry = await _get_audit_log(db, log_id)
+    if not log_entry:
+        return None, None
+    previous = log_entry.is_correct
+    log_entry.is_correct = is_correct
+    await db.commit()
+    return log_entry, previous
+
+
+async def verify_answer_by_teacher(
+    db: AsyncSession,
+    log_id: UUID,
+    verified: bool,
+    comment: str = None,
+    custom_tags: list = None,
+):
+    log_entry = await _get_audit_log(db, log_id)
+    if log_entry:
+        log_entry.verified_by_teacher = verified
+        log_entry.teacher_comment = comment
+        if custom_tags is not None:
+            log_entry.custom_tags = custom_tags
+        await db.commit()
+        return True
+    return False
+
+
+async def get_answers_for_review(
+    db: AsyncSession,
+    faculty_id: str = None,
+    after: tuple = None,
+    limit: int = 50,
+    **filters,
+):
+    """
+    See chat_repository.review_queue_query.
+    """
+    result = await db.execute(review_queue_query(faculty_id, after, limit, **filters))
+    return review_page(result.scalars().all(), limit)
+
+
+async def get_verified_answer(db: AsyncSession, log_id: UUID):
+    """
+    (log_entry, faculty_id, semester_id) of an audit log, or None.
+    """
+    return (await db.execute(verified_answers_query(log_id))).first()
+
+
+async def get_verified_answers(db: AsyncSession) -> list:
+    """
+    (log_entry, faculty_id, semester_id) of every teacher-verified answer.
+    """
+    return (await db.execute(verified_answers_query())).all()
+
+
+async def get_performance_stats(db: AsyncSession, faculty_id: str = None):
+    stmt = select(
+        func.avg(AnswerAuditLog.rag_confidence_score).label("avg_confidence"),
+        func.count(AnswerAuditLog.id).label("total_answers"),
+        func.avg(case((AnswerAuditLog.is_correct.is_(True), 1), else_=0)).label(
+            "positive_feedback_rate"
+        ),
+    )
+
+    if faculty_id:
+        stmt = stmt.where(AnswerAuditLog.faculty_id == faculty_id)
+
+    stats = (await db.execute(stmt)).one()
+    return {
+        "avg_confidence": float(stats.avg_confidence or 0),
+        "total_answers": int(stats.total_answers or 0),
+        "positive_feedback_rate": float(stats.positive_feedback_rate or 0),
+    }
+
+
+async def get_student_ai_confidence(db: AsyncSession, student_id: UUID):
+    result = await db.execute(
+        select(func.avg(AnswerAuditLog.rag_confidence_score)).where(
+            AnswerAuditLog.user_id == student_id
+        )
+    )
+    return result.scalar()
+
+
+async def get_course_progress(db: AsyncSession, course_id: str):
+    return (await db.execute(course_progress_query(course_id))).one()
+
+
+async def get_answer_stats(db: AsyncSession, column=None) -> list:
+    return (await db.execute(answer_stats_query(column))).all()
+
+
+async def get_course_students(db: AsyncSession) -> list:
+    result = await db.execute(
+        select(AnswerAuditLog.book_id, AnswerAuditLog.user_id)
+        .where(AnswerAuditLog.book_id.is_not(None))
+        .distinct()
+    )
+    return result.all()
+
+
+async def verify_answer(db: AsyncSession, log_id: UUID, verified: bool = True):
+    log_entry = await _get_audit_log(db, log_id)
+    if log_entry:
+        log_entry.verified = verified
+        await db.commit()
+        return True
+    return False
@@ -1,10 +1,16 @@
+import base64
 import json
 from datetime import datetime
 from uuid import UUID, uuid4
 
 from models.chat import AnswerAuditLog, ChatMessage, ChatSession
+from sqlalchemy import case, func, insert, literal, select, tuple_
 from sqlalchemy.orm import Session
 
+# Answers below this RAG score are "low confidence" in the review queue; it is
+# also the predicate of ix_answer_audit_logs_review_low_confidence
+LOW_CONFIDENCE_THRESHOLD = 0.8
+
 
 def get_chat_session(db: Session, session_id: UUID):
     return (
@@ -68,6 +74,20 @@ def get_chat_messages(db: Session, session_id: UUID):
     )
 
 
+def get_recent_chat_messages(db: Session, session_id: UUID, limit: int):
+    """
+    The last `limit` messages of the session, oldest first.
+    """
+    messages = (
+        db.query(ChatMessage)
+        .filter(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return list(reversed(messages))
+
+
 def create_chat_message(db: Session, session_id: UUID, role: str, content: str):
     message = ChatMessage(session_id=session_id, role=role, content=content)
     db.add(message)
@@ -113,17 +133,23 @@ def create_answer_audit_log(
     source_info: dict,
     book_id: str = None,
     rag_confidence_score: float = None,
+    groundedness: dict = None,
+    faculty_id: str = None,
 ):
+    groundedness = groundedness or {}
     log_entry = AnswerAuditLog(
         id=uuid4(),
         user_id=user_id,
         session_id=session_id,
+        faculty_id=faculty_id,
         book_id=book_id,
         question_text=question_text,
         ai_answer=ai_answer,
         source_reference=json.dumps(source_info),
         verified=False,
         rag_confidence_score=rag_confidence_score,
+        groundedness_score=groundedness.get("score"),
+        groundedness_source=groundedness.get("source"),
     )
     db.add(log_entry)
     db.commit()
@@ -131,14 +157,83 @@ def create_answer_audit_log(
     return log_entry
 
 
+def _audit_log_row(turn: dict) -> dict:
+    groundedness = turn.get("groundedness") or {}
+    return {
+        "id": turn.get("audit_log_id") or uuid4(),
+        "user_id": turn["user_id"],
+        "session_id": turn["session_id"],
+        "faculty_id": turn.get("faculty_id"),
+        "book_id": turn.get("book_id"),
+        "question_text": turn["question_text"],
+        "ai_answer": turn["ai_answer"],
+        "source_reference": json.dumps(turn.get("source_info") or {}),
+        "verified": False,
+        "verified_by_teacher": False,
+        "rag_confidence_score": turn.get("rag_confidence_score"),
+        "groundedness_score": groundedness.get("score"),
+        "groundedness_source": groundedness.get("source"),
+    }
+
+
+def persist_chat_turns(db: Session, turns: list[dict]) -> list[UUID]:
+    """
+    Persists chat turns (user message, assistant message and answer audit log
+    each) in a single transaction with two bulk INSERT ... RETURNING
+    statements. Returns the audit log ids in the order of the turns.
+
+    A turn is a dict with session_id, user_id, question_text, ai_answer and
+    optionally source_info, book_id, rag_confidence_score, groundedness and a
+    pre-generated audit_log_id.
+    """
+    if not turns:
+        return []
+    messages = []
+    for turn in turns:
+        messages.append(
+            {"session_id": turn["session_id"], "role": "user", "content": turn["question_text"]}
+        )
+        messages.append(
+            {"session_id": turn["session_id"], "role": "assistant", "content": turn["ai_answer"]}
+        )
+    try:
+        # clock_timestamp() (unlike now()) advances within the transaction, so
+        # history keeps the user message ahead of its answer.
+        db.execute(
+            insert(ChatMessage)
+            .values(created_at=func.clock_timestamp())
+            .returning(ChatMessage.id, sort_by_parameter_order=True),
+            messages,
+        )
+        audit_log_ids = db.execute(
+            insert(AnswerAuditLog).returning(
+                AnswerAuditLog.id, sort_by_parameter_order=True
+            ),
+            [_audit_log_row(turn) for turn in turns],
+        ).scalars().all()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return list(audit_log_ids)
+
+
+def persist_chat_turn(db: Session, **turn) -> UUID:
+    return persist_chat_turns(db, [turn])[0]
+
+
 def update_answer_feedback(db: Session, log_id: UUID, is_correct: bool):
+    """
+    Returns (log_entry, previous is_correct), or (None, None) when not found.
+    """
     log_entry = db.query(AnswerAuditLog).filter(AnswerAuditLog.id == log_id).first()
-    if log_entry:
-        log_entry.is_correct = is_correct
-        db.commit()
-        db.refresh(log_entry)
-        return True
-    return False
+    if not log_entry:
+        return None, None
+    previous = log_entry.is_correct
+    log_entry.is_correct = is_correct
+    db.commit()
+    db.refresh(log_entry)
+    return log_entry, previous
 
 
 def verify_answer_by_teacher(
@@ -156,24 +251,88 @@ def verify_answer_by_teacher(
     return False
 
 
-def get_answers_for_review(
-    db: Session, faculty_id: str = None, skip: int = 0, limit: int = 50
+def encode_review_cursor(entry: AnswerAuditLog) -> str:
+    raw = f"{entry.created_at.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_review_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """
+    Raises ValueError for a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, entry_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(entry_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid review cursor: {cursor}") from e
+
+
+def review_queue_query(
+    faculty_id: str = None,
+    after: tuple[datetime, UUID] = None,
+    limit: int = 50,
+    unverified: bool = False,
+    low_confidence: bool = False,
+    incorrect: bool = False,
 ):
-    query = db.query(AnswerAuditLog).join(
-        ChatSession, AnswerAuditLog.session_id == ChatSession.id
-    )
+    """
+    Newest-first page of the review queue, keyset-paginated on (created_at, id)
+    so that every page is an index range scan, however deep. One row more than
+    `limit` is selected to tell whether there is a next page. The filter
+    predicates are written like the partial index predicates so the planner
+    can use those indexes.
+    """
+    stmt = select(AnswerAuditLog)
     if faculty_id:
-        query = query.filter(ChatSession.faculty_id == faculty_id)
+        stmt = stmt.where(AnswerAuditLog.faculty_id == faculty_id)
+    if unverified:
+        stmt = stmt.where(AnswerAuditLog.verified_by_teacher.is_(False))
+    if incorrect:
+        stmt = stmt.where(AnswerAuditLog.is_correct.is_(False))
+    if low_confidence:
+        stmt = stmt.where(
+            AnswerAuditLog.rag_confidence_score
+            < literal(LOW_CONFIDENCE_THRESHOLD, literal_execute=True)
+        )
+    if after:
+        stmt = stmt.where(
+            tuple_(AnswerAuditLog.created_at, AnswerAuditLog.id) < tuple_(*after)
+        )
+    return stmt.order_by(
+        AnswerAuditLog.created_at.desc(), AnswerAuditLog.id.desc()
+    ).limit(limit + 1)
 
-    return (
-        query.order_by(AnswerAuditLog.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+
+def verified_answers_query(log_id: UUID = None):
+    """
+    Audit logs with the faculty and semester of their session, the scope of
+    the verified-answer library (services.verified_answers): every answer
+    verified by a teacher, or the log `log_id` whatever its state.
+    """
+    stmt = select(
+        AnswerAuditLog, ChatSession.faculty_id, ChatSession.semester_id
+    ).join(ChatSession, ChatSession.id == AnswerAuditLog.session_id)
+    if log_id is not None:
+        return stmt.where(AnswerAuditLog.id == log_id)
+    return stmt.where(AnswerAuditLog.verified_by_teacher.is_(True))
 
 
-from sqlalchemy import func, case
+def review_page(entries: list, limit: int) -> dict:
+    items = list(entries[:limit])
+    next_cursor = encode_review_cursor(items[-1]) if len(entries) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def get_answers_for_review(
+    db: Session, faculty_id: str = None, after: tuple = None, limit: int = 50, **filters
+):
+    entries = (
+        db.execute(review_queue_query(faculty_id, after, limit, **filters))
+        .scalars()
+        .all()
+    )
+    return review_page(entries, limit)
 
 
 def get_performance_stats(db: Session, faculty_id: str = None):
@@ -183,10 +342,10 @@ def get_performance_stats(db: Session, faculty_id: str = None):
         func.avg(case((AnswerAuditLog.is_correct == True, 1), else_=0)).label(
             "positive_feedback_rate"
         ),
-    ).join(ChatSession, AnswerAuditLog.session_id == ChatSession.id)
+    )
 
     if faculty_id:
-        query = query.filter(ChatSession.faculty_id == faculty_id)
+        query = query.filter(AnswerAuditLog.faculty_id == faculty_id)
 
     stats = query.one()
     return {
@@ -196,6 +355,51 @@ def get_performance_stats(db: Session, faculty_id: str = None):
     }
 
 
+def get_student_ai_confidence(db: Session, student_id: UUID):
+    """
+    Average RAG confidence of the answers a student received.
+    """
+    return (
+        db.query(func.avg(AnswerAuditLog.rag_confidence_score))
+        .filter(AnswerAuditLog.user_id == student_id)
+        .scalar()
+    )
+
+
+def course_progress_query(course_id: str):
+    return select(
+        func.count(AnswerAuditLog.id).label("total_interactions"),
+        func.avg(AnswerAuditLog.rag_confidence_score).label("avg_confidence"),
+        func.count(AnswerAuditLog.user_id.distinct()).label("unique_students"),
+    ).where(AnswerAuditLog.book_id == course_id)
+
+
+def get_course_progress(db: Session, course_id: str):
+    """
+    Chat activity of a course (book): answers, average RAG confidence and
+    number of students.
+    """
+    return db.execute(course_progress_query(course_id)).one()
+
+
+def answer_stats_query(column=None):
+    """
+    Rollup counters (see services.rollups) over all audit logs, or per value
+    of `column` (faculty_id, user_id, book_id).
+    """
+    stmt = select(
+        (column if column is not None else literal(None)).label("key"),
+        func.count(AnswerAuditLog.id).label("answers"),
+        func.sum(AnswerAuditLog.rag_confidence_score).label("confidence_sum"),
+        func.count(AnswerAuditLog.rag_confidence_score).label("confidence_n"),
+        func.count(case((AnswerAuditLog.is_correct.is_(True), 1))).label("correct"),
+        func.count(case((AnswerAuditLog.is_correct.is_(False), 1))).label("incorrect"),
+    )
+    if column is not None:
+        stmt = stmt.group_by(column)
+    return stmt
+
+
 def verify_answer(db: Session, log_id: UUID, verified: bool = True):
     log_entry = db.query(AnswerAuditLog).filter(AnswerAuditLog.id == log_id).first()
     if log_entry:
@@ -0,0 +1,57 @@
+"""
+Teacher dashboard rollup reconciler: rebuilds the Redis rollups
+(services/rollups.py) from answer_audit_logs every
+ROLLUP_RECONCILE_INTERVAL_SECONDS, fixing drift of the write-time counters.
+
+    python rollup_reconciler.py          # run periodically
+    python rollup_reconciler.py --once   # single pass (cron, first deploy)
+"""
+
+import argparse
+import asyncio
+import signal
+
+from core.config import settings
+from core.observability import setup_logging
+from db.session import AsyncReadSessionLocal
+from prometheus_client import start_http_server
+from services.rollups import rollups
+
+logger = setup_logging("chat-rollup-reconciler")
+
+
+async def reconcile_once():
+    async with AsyncReadSessionLocal() as db:
+        drifted = await rollups.reconcile(db)
+    logger.info(f"Rollups reconciled, {drifted} had drifted")
+
+
+async def main(once: bool):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    while not stop.is_set():
+        try:
+            await reconcile_once()
+        except Exception as e:
+            logger.error(f"Rollup reconciliation failed: {e}")
+            if once:
+                raise
+        if once:
+            return
+        try:
+            await asyncio.wait_for(
+                stop.wait(), timeout=settings.ROLLUP_RECONCILE_INTERVAL_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+    if settings.ROLLUP_RECONCILER_METRICS_PORT and not args.once:
+        start_http_server(settings.ROLLUP_RECONCILER_METRICS_PORT)
+    asyncio.run(main(args.once))
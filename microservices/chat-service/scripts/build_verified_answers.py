@@ -0,0 +1,28 @@
+"""
+Rebuilds the teacher-verified answer library (services/verified_answers.py)
+from the answers marked verified_by_teacher in answer_audit_logs. The chat
+service keeps the library up to date as teachers verify or reject answers;
+this is for the first deploy and after a Redis data loss.
+
+    python scripts/build_verified_answers.py
+"""
+
+import asyncio
+import os
+import sys
+
+# Run from anywhere: the service modules live one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db.session import AsyncReadSessionLocal  # noqa: E402
+from services.verified_answers import verified_answers  # noqa: E402
+
+
+async def main():
+    async with AsyncReadSessionLocal() as db:
+        indexed = await verified_answers.rebuild(db)
+    print(f"Indexed {indexed} verified answers")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Offline evaluation of the local intent classifier against the LLM labels.
+
+Replays the logged samples that arrived after the model was trained (or all
+of them with --all) through the classifier and reports agreement with the LLM
+intent/mode, how many messages skip the LLM call and the latency that saves.
+
+    python scripts/evaluate_intent_classifier.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Run from anywhere: the service modules live one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.intent_classifier import MODEL_KEY, IntentClassifier, needs_rewrite  # noqa: E402
+from services.llm_service import llm_service  # noqa: E402
+from train_intent_classifier import embed_samples, load_samples  # noqa: E402
+
+
+def _pct(part: int, total: int) -> str:
+    return f"{100.0 * part / total:.1f}%" if total else "n/a"
+
+
+async def main(args):
+    redis = await llm_service._get_redis()
+    raw_model = await redis.get(MODEL_KEY)
+    classifier = IntentClassifier()
+    if raw_model:
+        model = json.loads(raw_model)
+        classifier.set_model(model)
+    else:
+        model = {}
+        print("No trained model found, evaluating the keyword rules only")
+
+    samples = await load_samples(redis, args.limit)
+    if not args.all:
+        trained_until = model.get("trained_until", 0)
+        samples = [s for s in samples if s.get("ts", 0) > trained_until]
+    samples = await embed_samples(samples)
+    if not samples:
+        print("No samples to evaluate")
+        return
+
+    by_source = {"rules": [0, 0, 0], "centroid": [0, 0, 0]}  # covered, intent ok, mode ok
+    skipped_llm = 0
+    local_ms = []
+    for sample in samples:
+        start = time.perf_counter()
+        result = classifier.classify(sample["message"], sample["embedding"])
+        local_ms.append((time.perf_counter() - start) * 1000)
+        if result is None:
+            continue
+        counts = by_source[result["source"]]
+        counts[0] += 1
+        counts[1] += result["intent"] == sample["intent"]
+        counts[2] += result["mode"] == sample["mode"]
+        history = "history" if sample.get("has_history") else ""
+        if not needs_rewrite(sample["message"], history):
+            skipped_llm += 1
+
+    total = len(samples)
+    covered = sum(c[0] for c in by_source.values())
+    intent_ok = sum(c[1] for c in by_source.values())
+    mode_ok = sum(c[2] for c in by_source.values())
+    llm_ms = np.asarray([s.get("latency_ms") or 0 for s in samples], dtype=np.float64)
+
+    print(f"Samples evaluated: {total}")
+    for source, (n, i_ok, m_ok) in by_source.items():
+        print(
+            f"  {source:<9} coverage {_pct(n, total):>6}  "
+            f"intent agreement {_pct(i_ok, n):>6}  mode agreement {_pct(m_ok, n):>6}"
+        )
+    print(
+        f"  {'local':<9} coverage {_pct(covered, total):>6}  "
+        f"intent agreement {_pct(intent_ok, covered):>6}  "
+        f"mode agreement {_pct(mode_ok, covered):>6}"
+    )
+    print(f"LLM call skipped (confident and self-contained): {_pct(skipped_llm, total)}")
+    print(
+        f"Local classify latency: p50 {np.percentile(local_ms, 50):.3f} ms, "
+        f"p95 {np.percentile(local_ms, 95):.3f} ms"
+    )
+    print(
+        f"LLM intent latency: mean {llm_ms.mean():.0f} ms, "
+        f"p50 {np.percentile(llm_ms, 50):.0f} ms, p95 {np.percentile(llm_ms, 95):.0f} ms"
+    )
+    saved = llm_ms.mean() * skipped_llm / total
+    print(f"Estimated latency saved per message: {saved:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--all", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""
+Trains the local intent classifier from the intents labelled by the LLM.
+
+Reads the logged samples from Redis, embeds the messages, fits one centroid per
+intent and per mode on the older samples and calibrates the confidence
+threshold on the most recent ones, then stores the model where the chat
+service picks it up (see services.intent_classifier).
+
+    python scripts/train_intent_classifier.py --target-precision 0.9
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Run from anywhere: the service modules live one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.intent_classifier import (  # noqa: E402
+    MODEL_KEY,
+    SAMPLES_KEY,
+    IntentClassifier,
+    calibrate_threshold,
+    fit_centroids,
+)
+from services.llm_service import llm_service  # noqa: E402
+
+
+async def load_samples(redis, limit: int = None) -> list[dict]:
+    """
+    Logged samples, oldest first.
+    """
+    raw = await redis.lrange(SAMPLES_KEY, 0, (limit or 0) - 1)
+    samples = [json.loads(item) for item in raw]
+    samples = [s for s in samples if s.get("intent") and s.get("mode")]
+    return sorted(samples, key=lambda s: s.get("ts", 0))
+
+
+async def embed_samples(samples: list[dict], concurrency: int = 8) -> list[dict]:
+    """
+    Attaches the message embedding to each sample, dropping failures.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed(sample):
+        async with semaphore:
+            sample["embedding"] = await llm_service.get_embedding(sample["message"])
+
+    await asyncio.gather(*(embed(s) for s in samples))
+    return [s for s in samples if s.get("embedding")]
+
+
+async def main(args):
+    redis = await llm_service._get_redis()
+    samples = await embed_samples(await load_samples(redis, args.limit))
+    if len(samples) < args.min_samples:
+        print(f"Not enough labelled samples: {len(samples)} < {args.min_samples}")
+        return
+
+    split = int(len(samples) * (1 - args.calibration_share))
+    fit, calibration = samples[:split], samples[split:]
+
+    model = {
+        "intent_centroids": fit_centroids(
+            [s["embedding"] for s in fit], [s["intent"] for s in fit]
+        ),
+        "mode_centroids": fit_centroids(
+            [s["embedding"] for s in fit], [s["mode"] for s in fit]
+        ),
+        "threshold": None,
+        "margin": args.margin,
+    }
+
+    classifier = IntentClassifier()
+    classifier.set_model({**model, "threshold": -1.0})
+    similarities, correct = [], []
+    for sample in calibration:
+        query = np.asarray(sample["embedding"], dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        intent, similarity, margin = classifier._nearest(
+            classifier.intent_matrix, classifier.intent_labels, query
+        )
+        if margin < args.margin:
+            continue
+        similarities.append(similarity)
+        correct.append(intent == sample["intent"])
+
+    model["threshold"] = (
+        calibrate_threshold(similarities, correct, args.target_precision)
+        if similarities
+        else 1.01
+    )
+    model["trained_until"] = samples[-1].get("ts", time.time())
+    model["samples"] = len(samples)
+
+    await redis.set(MODEL_KEY, json.dumps(model))
+    accepted = sum(s >= model["threshold"] for s in similarities)
+    print(f"Fitted {len(model['intent_centroids'])} intents on {len(fit)} samples")
+    print(
+        f"Threshold {model['threshold']:.4f}: {accepted}/{len(calibration)} "
+        f"calibration samples classified locally"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--min-samples", type=int, default=200)
+    parser.add_argument("--calibration-share", type=float, default=0.2)
+    parser.add_argument("--target-precision", type=float, default=0.9)
+    parser.add_argument("--margin", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+import json
+import logging
+import time
+from uuid import uuid4
+
+import httpx
+import redis.asyncio as aioredis
+from core.celery_app import celery_app
+from core.config import settings
+from core.metrics import CHAT_JOBS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# JSON {"status": "pending" | "done" | "failed", "user_id", "session_id",
+# "response" (ChatResponse) when done, "detail" when failed}
+JOB_KEY = "chat_job:{job_id}"
+JOB_CHANNEL = "chat_job:done:{job_id}"  # published when the job settles
+
+READY_NOTIFICATION = "إجابة سؤالك جاهزة، افتح المحادثة لقراءتها."
+
+
+class ChatJobs:
+    """
+    Chat answers deferred to the chat worker (tasks.answer_chat_task) in
+    degraded mode. The client polls GET /chat/jobs/{job_id} or listens on
+    GET /chat/jobs/{job_id}/events, and is notified through
+    notification-service once the answer is ready.
+    """
+
+    def __init__(self):
+        self.redis = None
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    async def submit(
+        self,
+        user_id: str,
+        session_id,
+        user_message: str,
+        collection_name: str,
+        faculty_id: str,
+        semester_id: str,
+        request_id: str = None,
+    ) -> str:
+        job_id = uuid4().hex
+        redis = await self._get_redis()
+        await redis.set(
+            JOB_KEY.format(job_id=job_id),
+            json.dumps(
+                {"status": "pending", "user_id": user_id, "session_id": str(session_id)}
+            ),
+            ex=settings.CHAT_JOB_TTL_SECONDS,
+        )
+        celery_app.send_task(
+            "tasks.answer_chat_task",
+            args=[
+                job_id,
+                user_id,
+                str(session_id),
+                user_message,
+                collection_name,
+                faculty_id,
+                semester_id,
+                request_id,
+            ],
+        )
+        return job_id
+
+    async def get(self, job_id: str) -> dict | None:
+        redis = await self._get_redis()
+        record = await redis.get(JOB_KEY.format(job_id=job_id))
+        return json.loads(record) if record else None
+
+    async def finish(self, job_id: str, response: dict = None, detail: str = None):
+        """
+        Settles the job with the answer (ChatResponse) or the failure detail.
+        """
+        record = await self.get(job_id) or {}
+        status = "done" if response is not None else "failed"
+        record.update(status=status, response=response, detail=detail)
+        redis = await self._get_redis()
+        pipe = redis.pipeline()
+        pipe.set(
+            JOB_KEY.format(job_id=job_id),
+            json.dumps(record, ensure_ascii=False),
+            ex=settings.CHAT_JOB_TTL_SECONDS,
+        )
+        pipe.publish(JOB_CHANNEL.format(job_id=job_id), status)
+        await pipe.execute()
+        CHAT_JOBS_TOTAL.labels(status=status).inc()
+
+    async def wait(self, job_id: str, timeout: float) -> dict | None:
+        """
+        The job record once settled, or still pending after `timeout`.
+        """
+        redis = await self._get_redis()
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(JOB_CHANNEL.format(job_id=job_id))
+            # Read after subscribing: the job may have settled already
+            record = await self.get(job_id)
+            give_up_at = time.monotonic() + timeout
+            while record is not None and record["status"] == "pending":
+                remaining = give_up_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+                record = await self.get(job_id)
+            return record
+        finally:
+            await pubsub.aclose()
+
+    async def notify(self, user_id: str):
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.post(
+                    f"{settings.NOTIFICATION_SERVICE_URL}/notify",
+                    json={"user_id": user_id, "message": READY_NOTIFICATION, "type": "fcm"},
+                )
+                response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Failed to notify {user_id} of a ready answer: {e}")
+
+
+# Singleton instance
+chat_jobs = ChatJobs()
@@ -1,29 +1,58 @@
+import asyncio
 import json
 import logging
+import time
 from uuid import UUID
 
-import httpx
 from core.audit import log_audit
 from core.metrics import (
     ANSWERS_TOTAL,
+    FOLLOWUP_REUSE_TOTAL,
     HALLUCINATIONS_BLOCKED_TOTAL,
+    RAG_FALLBACK_TOTAL,
+    SPECULATIVE_RETRIEVAL_SAVED,
+    SPECULATIVE_RETRIEVAL_TOTAL,
+    INTENT_CLASSIFICATIONS_TOTAL,
+    PROMPT_TOKENS,
     SIMILARITY_SCORE,
     ANSWER_LATENCY,
+    TIME_TO_FIRST_TOKEN,
+    TURN_FLUSH_LATENCY,
 )
 from core.config import settings
-from rag.prompt import create_teacher_prompt
-from repository import chat_repository
-from services.llm_service import llm_service
-from sqlalchemy.orm import Session
-from tenacity import retry, stop_after_attempt, wait_exponential
+from core.deadline import DeadlineExceeded
+from core.llm_scheduler import set_priority
+from core.stage_timer import StageTimer, current_timer, record_stage, stage
+from openai import APIError
+from rag.normalize import tokenize
+from rag.prompt import build_teacher_prompt
+from repository import async_chat_repository as chat_repository
+from services.history_buffer import history_buffer
+from services.intent_classifier import intent_classifier, needs_rewrite, topic_overlap
+from services.llm_service import HALLUCINATION_MESSAGE, llm_service
+from services.rag_client import CircuitOpenError, rag_client
+from services.retrieval_memory import retrieval_memory
+from services.rollups import rollups
+from services.semantic_cache import semantic_cache
+from services.streaming import SectionStreamParser, split_sections, sse_event
+from services.turn_writer import turn_writer
+from services.verified_answers import verified_answers
+from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
 SIMILARITY_THRESHOLD = 0.7
 MAX_QUERY_LENGTH = 500
 
+STREAM_ERROR_MESSAGE = "عذراً، حدث خطأ في معالجة طلبك. يرجى المحاولة مرة أخرى لاحقاً."
+
+NOT_COVERED_MESSAGE = "عذراً، هذا الموضوع غير مغطى في الكتاب المقرر المتاح لي حالياً. أنا مصمم للمساعدة في محتوى المنهج الدراسي فقط لضمان دقة المعلومات."
+
+# The JSON envelope of the blocking path cannot be rendered incrementally,
+# so the streaming path asks for the bare sectioned answer instead.
+STREAM_FORMAT_INSTRUCTION = "Return ONLY the answer text (no JSON, no markdown code blocks). Start each section on its own line with its heading followed by a colon, in this order: التعريف: ، الشرح: ، مثال: ، ملخص:"
+
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=2))
 async def call_rag_search(
     user_message: str,
     collection_name: str,
@@ -31,24 +60,20 @@ async def call_rag_search(
     semester_id: str,
     request_id: str,
 ):
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        resp = await client.post(
-            f"{settings.RAG_SERVICE_URL}/search",
-            json={
-                "query": user_message,
-                "top_k": 5,
-                "collection_name": collection_name,
-                "faculty_id": faculty_id,
-                "semester_id": semester_id,
-            },
-            headers={"X-Request-ID": request_id},
-        )
-        resp.raise_for_status()
-        return resp.json()
+    return await rag_client.search(
+        {
+            "query": user_message,
+            "top_k": 5,
+            "collection_name": collection_name,
+            "faculty_id": faculty_id,
+            "semester_id": semester_id,
+        },
+        request_id=request_id,
+    )
 
 
 async def handle_chat_message(
-    db: Session,
+    db: AsyncSession,
     user_id: str,
     session_id: UUID | None,
     user_message: str,
@@ -56,8 +81,15 @@ async def handle_chat_message(
     faculty_id: str,
     semester_id: str,
     request_id: str = None,
+    cached_only: bool = False,
 ) -> tuple:
-    with ANSWER_LATENCY.time():
+    """
+    Answers a chat message. With cached_only (degraded mode) only cached and
+    teacher-verified answers are served: any other question is left
+    unanswered (None) for the chat worker, in the returned session.
+    """
+    set_priority("interactive", faculty_id, user_id)
+    with ANSWER_LATENCY.time(), StageTimer(faculty_id):
         return await _handle_chat_message_logic(
             db,
             user_id,
@@ -67,94 +99,155 @@ async def handle_chat_message(
             faculty_id,
             semester_id,
             request_id,
+            cached_only,
         )
 
 
-async def _handle_chat_message_logic(
-    db: Session,
-    user_id: str,
-    session_id: UUID | None,
-    user_message: str,
-    collection_name: str,
-    faculty_id: str,
-    semester_id: str,
-    request_id: str = None,
-) -> tuple:
-    # 1. Get/Create Session
-    if session_id:
-        chat_session = chat_repository.get_chat_session(db, session_id)
-        if not chat_session or str(chat_session.user_id) != user_id:
-            chat_session = chat_repository.create_chat_session(
-                db, user_id, collection_name, faculty_id, semester_id
-            )
-    else:
-        chat_session = chat_repository.create_chat_session(
-            db, user_id, collection_name, faculty_id, semester_id
-        )
-
-    # 2. Guardrails: Input Validation
+def _check_guardrails(user_message: str) -> str | None:
+    """
+    Returns a refusal message when the input must not reach the pipeline.
+    """
     if not user_message or len(user_message.strip()) == 0:
-        return "من فضلك أدخل سؤالاً صحيحاً.", chat_session.id, None, "", {}, {}, None
+        return "من فضلك أدخل سؤالاً صحيحاً."
 
     if len(user_message) > MAX_QUERY_LENGTH:
-        return (
-            f"عذراً، السؤال طويل جداً. يرجى اختصاره إلى أقل من {MAX_QUERY_LENGTH} حرفاً.",
-            chat_session.id,
-            None,
-            "",
-            {},
-            {},
-            None
-        )
+        return f"عذراً، السؤال طويل جداً. يرجى اختصاره إلى أقل من {MAX_QUERY_LENGTH} حرفاً."
 
     # Academic Safety: Detect cheating attempts
     cheating_keywords = ["حل الامتحان", "إجابة كاملة", "حل لي هذا", "أعطني الأجوبة"]
     if any(kw in user_message for kw in cheating_keywords):
-        return (
-            "أنا هنا لمساعدتك في فهم المادة وشرح المفاهيم بأسلوب تعليمي، وليس لحل الامتحانات أو الواجبات بشكل كامل. كيف يمكنني مساعدتك في شرح نقطة معينة؟",
-            chat_session.id,
-            None,
-            "",
-            {},
-            {},
-            None
-        )
+        return "أنا هنا لمساعدتك في فهم المادة وشرح المفاهيم بأسلوب تعليمي، وليس لحل الامتحانات أو الواجبات بشكل كامل. كيف يمكنني مساعدتك في شرح نقطة معينة؟"
 
-    # 3. Memory Optimization: Get history and summary
-    chat_history = chat_repository.get_chat_messages(db, session_id=chat_session.id)
-    # Only keep very recent messages for flow, rely on summary for long-term memory
-    history_formatted = [
-        {"role": msg.role, "content": msg.content} for msg in chat_history[-3:]
-    ]
-    history_str = "\n".join([f"{m['role']}: {m['content']}" for m in history_formatted])
+    return None
+
+
+def _parse_cached_answer(cached_resp: str) -> dict:
+    try:
+        resp_json = json.loads(cached_resp)
+    except ValueError:
+        return {"answer": cached_resp}
+    return resp_json if isinstance(resp_json, dict) else {"answer": cached_resp}
 
-    learning_summary = (
-        chat_session.learning_summary
-        or chat_repository.get_latest_learning_summary(db, user_id, collection_name)
-    )
 
-    # 4. Intent Detection & Query Rewriting
-    analysis = await llm_service.detect_intent_and_rewrite_query(
-        user_message, history_str
+async def _lookup_cached_answer(
+    turn: dict, faculty_id: str, semester_id: str, user_message: str
+) -> dict | None:
+    """
+    Answer-cache stage: teacher-verified answers first, then exact/normalized
+    text match and the semantic cache over question embeddings. Returns the
+    cached answer payload or None. The question embedding is kept on the turn
+    for later stages.
+    """
+    verified = settings.VERIFIED_ANSWERS_ENABLED
+    if verified:
+        cached_resp = await verified_answers.lookup_text(
+            faculty_id, semester_id, user_message
+        )
+        if cached_resp:
+            turn["stages"]["answer_cache"] = "verified"
+            return _parse_cached_answer(cached_resp)
+
+    cached_resp = await llm_service.get_cached_response(
+        faculty_id, semester_id, user_message
     )
-    intent = analysis.get("intent", "GENERAL")
-    mode = analysis.get("mode", "UNDERSTANDING")
-    rewritten_query = analysis.get("rewritten_query", user_message)
+    if cached_resp:
+        turn["stages"]["answer_cache"] = "hit"
+        return _parse_cached_answer(cached_resp)
+
+    if settings.SEMANTIC_CACHE_ENABLED or verified:
+        try:
+            turn["question_embedding"] = await llm_service.get_embedding(user_message)
+        except Exception as e:
+            logger.error(f"Question embedding failed: {e}")
+    if verified and turn["question_embedding"] is not None:
+        cached_resp = await verified_answers.lookup(
+            faculty_id, semester_id, turn["question_embedding"]
+        )
+        if cached_resp:
+            turn["stages"]["answer_cache"] = "verified"
+            return _parse_cached_answer(cached_resp)
+
+    if settings.SEMANTIC_CACHE_ENABLED and turn["question_embedding"] is not None:
+        cached_resp = await semantic_cache.lookup(
+            faculty_id, semester_id, turn["question_embedding"]
+        )
+        if cached_resp:
+            turn["stages"]["answer_cache"] = "semantic_hit"
+            return _parse_cached_answer(cached_resp)
+
+    turn["stages"]["answer_cache"] = "miss"
+    return None
 
-    # 5. RAG Hardening: Multi-stage Retrieval with Threshold
+
+async def _detect_intent(turn: dict, user_message: str, history_str: str) -> dict:
+    """
+    Intent stage: the local classifier handles confident, self-contained
+    questions; everything else goes to the LLM intent/rewrite call.
+    """
+    await intent_classifier.ensure_loaded()
+    local = intent_classifier.classify(user_message, turn["question_embedding"])
+    if local and not needs_rewrite(user_message, history_str):
+        turn["stages"]["intent"] = local["source"]
+        INTENT_CLASSIFICATIONS_TOTAL.labels(source=local["source"]).inc()
+        return {
+            "intent": local["intent"],
+            "mode": local["mode"],
+            "rewritten_query": user_message,
+        }
+
+    turn["stages"]["intent"] = "llm"
+    INTENT_CLASSIFICATIONS_TOTAL.labels(source="llm").inc()
+    return await llm_service.detect_intent_and_rewrite_query(user_message, history_str)
+
+
+async def _match_followup(session_id: UUID, user_message: str) -> dict | None:
+    """
+    Follow-up stage: a continuation of the previous turn (EXAMPLE/CONFUSED by
+    the keyword rules) whose topical words are found in the previous query
+    and chunks reuses that retrieval. Returns {"intent", "mode", "retrieval"}
+    or None when the question must be retrieved afresh.
+    """
+    local = intent_classifier.classify(user_message)
+    if not local or local["intent"] not in settings.FOLLOWUP_INTENTS:
+        return None
+
+    previous = await retrieval_memory.get(session_id)
+    if not previous or not previous["chunks"]:
+        FOLLOWUP_REUSE_TOTAL.labels(result="no_context").inc()
+        return None
+    reference = " ".join([previous["query"]] + [c["text"] for c in previous["chunks"]])
+    if topic_overlap(user_message, reference) < settings.FOLLOWUP_MIN_TOPIC_OVERLAP:
+        FOLLOWUP_REUSE_TOTAL.labels(result="new_topic").inc()
+        return None
+
+    FOLLOWUP_REUSE_TOTAL.labels(result="reused").inc()
+    return {"intent": local["intent"], "mode": local["mode"], "retrieval": previous}
+
+
+async def _retrieve_chunks(
+    rewritten_query: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str,
+    stages: dict,
+) -> tuple[list, float]:
+    """
+    Retrieval stage: RAG search (with result caching and stale fallback) and
+    similarity threshold.
+    """
     relevant_chunks = []
     max_score = 0.0
-    cache_used = False
-
-    if intent not in ["OUTSIDE_SYLLABUS", "GENERAL"]:
-        try:
-            # Intelligent Caching for RAG results
-            results = await llm_service.get_cached_rag_results(
-                rewritten_query, collection_name, faculty_id, semester_id
-            )
-            if results:
-                cache_used = True
-            else:
+    try:
+        # Intelligent Caching for RAG results
+        results = await llm_service.get_cached_rag_results(
+            rewritten_query, collection_name, faculty_id, semester_id
+        )
+        if results:
+            stages["retrieval"] = "cache"
+        else:
+            stages["retrieval"] = "rag"
+            try:
                 results = await call_rag_search(
                     rewritten_query,
                     collection_name,
@@ -162,30 +255,393 @@ async def _handle_chat_message_logic(
                     semester_id,
                     request_id,
                 )
+            except Exception as e:
+                # Serve-stale: fall back to the last known results for the query
+                reason = "breaker_open" if isinstance(e, CircuitOpenError) else "error"
+                results = await llm_service.get_stale_rag_results(
+                    rewritten_query, collection_name, faculty_id, semester_id
+                )
+                RAG_FALLBACK_TOTAL.labels(
+                    reason=reason, result="hit" if results else "miss"
+                ).inc()
+                if results is None:
+                    raise
+                stages["retrieval"] = "stale"
+                logger.warning(
+                    f"RAG search unavailable ({reason}), serving stale results",
+                    extra={"request_id": request_id},
+                )
+            else:
                 await llm_service.cache_rag_results(
                     rewritten_query, collection_name, faculty_id, semester_id, results
                 )
 
-            # Enforce similarity score threshold
-            filtered_results = [
-                r for r in results if r.get("score", 0) >= SIMILARITY_THRESHOLD
-            ]
-            if filtered_results:
-                max_score = max(r.get("score", 0) for r in filtered_results)
-                SIMILARITY_SCORE.observe(max_score)
-                # Keep full objects for source attribution
-                relevant_chunks = filtered_results
-        except Exception as e:
-            logger.error(f"RAG service error: {e}", extra={"request_id": request_id})
+        # Enforce similarity score threshold
+        filtered_results = [
+            r for r in results if r.get("score", 0) >= SIMILARITY_THRESHOLD
+        ]
+        if filtered_results:
+            max_score = max(r.get("score", 0) for r in filtered_results)
+            SIMILARITY_SCORE.observe(max_score)
+            # Keep full objects for source attribution
+            relevant_chunks = filtered_results
+    except Exception as e:
+        stages["retrieval"] = "error"
+        logger.error(f"RAG service error: {e}", extra={"request_id": request_id})
+    return relevant_chunks, max_score
 
-    # 6. Generate Response with Structured Validation
-    source_info = {"book": "N/A", "page": "N/A"}
-    hallucination_detected = False
 
-    if not relevant_chunks and intent not in ["GENERAL"]:
-        assistant_message = "عذراً، هذا الموضوع غير مغطى في الكتاب المقرر المتاح لي حالياً. أنا مصمم للمساعدة في محتوى المنهج الدراسي فقط لضمان دقة المعلومات."
+def _query_similarity(a: str, b: str) -> float:
+    """Token Jaccard similarity of two normalized queries."""
+    tokens_a, tokens_b = set(tokenize(a)), set(tokenize(b))
+    if not tokens_a or not tokens_b:
+        return 1.0 if tokens_a == tokens_b else 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+def _start_speculative_retrieval(
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str,
+) -> dict | None:
+    """
+    Starts the retrieval of the raw message as a task, to overlap the RAG
+    search with intent detection. See _use_speculative_retrieval.
+    """
+    if not settings.SPECULATIVE_RETRIEVAL_ENABLED:
+        return None
+    speculation = {"stages": {}, "started": time.perf_counter(), "elapsed": None}
+
+    async def retrieve():
+        try:
+            return await _retrieve_chunks(
+                user_message,
+                collection_name,
+                faculty_id,
+                semester_id,
+                request_id,
+                speculation["stages"],
+            )
+        finally:
+            speculation["elapsed"] = time.perf_counter() - speculation["started"]
+
+    speculation["task"] = asyncio.create_task(retrieve())
+    return speculation
+
+
+def _cancel_speculative_retrieval(speculation: dict | None, result: str, stages: dict):
+    if speculation is None:
+        return
+    speculation["task"].cancel()
+    stages["speculation"] = result
+    SPECULATIVE_RETRIEVAL_TOTAL.labels(result=result).inc()
+
+
+async def _use_speculative_retrieval(
+    speculation: dict | None, user_message: str, rewritten_query: str, stages: dict
+) -> tuple[list, float] | None:
+    """
+    The speculative results when the rewritten query is close enough to the
+    raw message (token Jaccard), else None and the speculation is cancelled.
+    The latency saved is the part of the search that overlapped intent
+    detection.
+    """
+    if speculation is None:
+        return None
+    similarity = _query_similarity(user_message, rewritten_query)
+    if similarity < settings.SPECULATIVE_RETRIEVAL_MIN_SIMILARITY:
+        _cancel_speculative_retrieval(speculation, "miss", stages)
+        return None
+
+    wait_start = time.perf_counter()
+    result = await speculation["task"]
+    waited = time.perf_counter() - wait_start
+    stages.update(speculation["stages"], speculation="hit")
+    SPECULATIVE_RETRIEVAL_TOTAL.labels(result="hit").inc()
+    SPECULATIVE_RETRIEVAL_SAVED.observe(max(speculation["elapsed"] - waited, 0.0))
+    return result
+
+
+async def _load_recent_history(db: AsyncSession, session_id: UUID, stages: dict) -> list:
+    """
+    History stage: the last CHAT_HISTORY_WINDOW messages, from the Redis ring
+    buffer or, when it is cold, from a windowed query that also warms it.
+    """
+    window = settings.CHAT_HISTORY_WINDOW
+    history = await history_buffer.get(session_id, window)
+    if history is not None:
+        stages["history"] = "buffer"
+        return history
+
+    stages["history"] = "db"
+    messages = await chat_repository.get_recent_chat_messages(
+        db, session_id, history_buffer.max_messages
+    )
+    history = [{"role": msg.role, "content": msg.content} for msg in messages]
+    await history_buffer.fill(session_id, history)
+    return history[-window:]
+
+
+async def _prepare_turn(
+    db: AsyncSession,
+    user_id: str,
+    session_id: UUID | None,
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str = None,
+    cached_only: bool = False,
+) -> dict:
+    """
+    Runs every stage up to (but excluding) answer generation.
+    turn["answer"] is already set when a stage short-circuited the pipeline
+    (guardrail refusal, answer cache hit, topic not covered). With
+    cached_only, turn["deferred"] is set instead of running any stage past
+    the answer cache.
+    """
+    # 1. Get/Create Session
+    with stage("session"):
+        if session_id:
+            chat_session = await chat_repository.get_chat_session(db, session_id)
+            if not chat_session or str(chat_session.user_id) != user_id:
+                chat_session = await chat_repository.create_chat_session(
+                    db, user_id, collection_name, faculty_id, semester_id
+                )
+        else:
+            chat_session = await chat_repository.create_chat_session(
+                db, user_id, collection_name, faculty_id, semester_id
+            )
+
+    turn = {
+        "session": chat_session,
+        # Per-stage outcome markers: "skipped", "cache", "rag", "llm", ...
+        "stages": {},
+        "refusal": False,
+        "answer": None,
+        "intent": None,
+        "mode": None,
+        "relevant_chunks": [],
+        "max_score": 0.0,
+        "book_id": None,
+        "source_info": {"book": "N/A", "page": "N/A"},
+        "hallucination": False,
+        "learning_summary": chat_session.learning_summary,
+        "prompt_messages": None,
+        "context_text": "",
+        "prompt_tokens": None,
+        "question_embedding": None,
+        "groundedness": None,
+        # Model cascade route ("small", "large") and the model that answered
+        "route": None,
+        "model": None,
+        "escalation": None,
+        # Previous retrieval reused by a follow-up question (_match_followup)
+        "followup": None,
+        # (key, token) while this request leads a singleflight
+        "flight": None,
+        # Left for the chat worker (degraded mode)
+        "deferred": False,
+    }
+
+    # 2. Guardrails: Input Validation
+    refusal = _check_guardrails(user_message)
+    if refusal:
+        turn.update(refusal=True, answer=refusal)
+        return turn
+
+    # Follow-ups are answered from this session's previous retrieval, so the
+    # per-faculty answer cache and singleflight (keyed on the question text
+    # alone) do not apply to them
+    if settings.FOLLOWUP_REUSE_ENABLED and session_id:
+        with stage("followup"):
+            turn["followup"] = await _match_followup(chat_session.id, user_message)
+
+    # 3. Answer Cache Fast Path: a hit short-circuits every remote stage
+    if turn["followup"]:
+        turn["stages"]["answer_cache"] = "skipped"
     else:
-        prompt_messages = create_teacher_prompt(
+        with stage("answer_cache"):
+            cached = await _lookup_cached_answer(
+                turn, faculty_id, semester_id, user_message
+            )
+        if cached:
+            verified = turn["stages"]["answer_cache"] == "verified"
+            _apply_shared_answer(turn, cached, "verified" if verified else "cache")
+            return turn
+
+    if cached_only:
+        turn["deferred"] = True
+        return turn
+
+    # Singleflight: an identical question already in flight is awaited instead
+    # of running intent detection, retrieval and generation again
+    if settings.SINGLEFLIGHT_ENABLED and not turn["followup"]:
+        key = llm_service.flight_key(faculty_id, semester_id, user_message)
+        leader, token = await llm_service.acquire_flight(key)
+        if not leader:
+            with stage("singleflight", check_deadline=True):
+                shared = await llm_service.wait_for_flight(key)
+            if shared:
+                _apply_shared_answer(turn, _parse_cached_answer(shared), "singleflight")
+                return turn
+        else:
+            turn["flight"] = (key, token)
+
+    try:
+        await _plan_generation(
+            db,
+            turn,
+            user_id,
+            user_message,
+            collection_name,
+            faculty_id,
+            semester_id,
+            request_id,
+        )
+    except BaseException:
+        await _land_flight(turn)
+        raise
+    return turn
+
+
+def _apply_shared_answer(turn: dict, cached: dict, generation: str):
+    """
+    Fills the turn from an answer payload computed by another request
+    (answer cache or singleflight leader).
+    """
+    turn["stages"].update(
+        history="skipped",
+        intent="skipped",
+        retrieval="skipped",
+        generation=generation,
+    )
+    turn.update(
+        answer=cached.get("answer", ""),
+        intent=cached.get("intent", "CACHED"),
+        mode=cached.get("mode", "UNDERSTANDING"),
+        max_score=cached.get("rag_score", 0.0),
+        book_id=cached.get("book_id"),
+        source_info=cached.get("source", turn["source_info"]),
+    )
+
+
+async def _land_flight(turn: dict, payload: str = None):
+    """
+    Ends this request's singleflight leadership, sharing `payload` with the
+    waiting requests (None lets them compute their own answer).
+    """
+    flight, turn["flight"] = turn.get("flight"), None
+    if flight:
+        await llm_service.land_flight(*flight, payload)
+
+
+async def _plan_generation(
+    db: AsyncSession,
+    turn: dict,
+    user_id: str,
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str = None,
+):
+    """
+    History, intent, retrieval and prompt assembly for a turn that needs
+    a generated answer.
+    """
+    chat_session = turn["session"]
+    stages = turn["stages"]
+
+    # 4. Memory Optimization: Get history and summary
+    # Only keep very recent messages for flow, rely on summary for long-term memory
+    with stage("history", check_deadline=True):
+        history_formatted = await _load_recent_history(db, chat_session.id, stages)
+        learning_summary = (
+            chat_session.learning_summary
+            or await chat_repository.get_latest_learning_summary(
+                db, user_id, collection_name
+            )
+        )
+        # End the read transaction so the pooled connection is not held while
+        # the remote stages run (PgBouncer transaction mode)
+        await db.commit()
+    history_str = "\n".join([f"{m['role']}: {m['content']}" for m in history_formatted])
+    turn["learning_summary"] = learning_summary
+
+    followup = turn["followup"]
+    if followup:
+        # 5-6. Follow-up: the intent comes from the rules and the chunks from
+        # the previous turn, so neither the rewrite nor the search is run
+        stages["intent"] = "followup"
+        INTENT_CLASSIFICATIONS_TOTAL.labels(source="followup").inc()
+        intent, mode = followup["intent"], followup["mode"]
+        stages["retrieval"] = "reused"
+        relevant_chunks = followup["retrieval"]["chunks"]
+        turn.update(
+            intent=intent,
+            mode=mode,
+            relevant_chunks=relevant_chunks,
+            max_score=followup["retrieval"]["max_score"],
+        )
+    else:
+        # 5. Intent Detection & Query Rewriting, with the retrieval of the raw
+        # message started speculatively alongside
+        speculation = _start_speculative_retrieval(
+            user_message, collection_name, faculty_id, semester_id, request_id
+        )
+        try:
+            with stage("intent", check_deadline=True):
+                analysis = await _detect_intent(turn, user_message, history_str)
+        except BaseException:
+            _cancel_speculative_retrieval(speculation, "cancelled", stages)
+            raise
+        intent = analysis.get("intent", "GENERAL")
+        mode = analysis.get("mode", "UNDERSTANDING")
+        rewritten_query = analysis.get("rewritten_query", user_message)
+        turn.update(intent=intent, mode=mode)
+
+        # 6. RAG Hardening: Multi-stage Retrieval with Threshold
+        relevant_chunks = []
+        if intent not in ["OUTSIDE_SYLLABUS", "GENERAL"]:
+            with stage("retrieval", check_deadline=True):
+                speculative = await _use_speculative_retrieval(
+                    speculation, user_message, rewritten_query, stages
+                )
+                if speculative is not None:
+                    relevant_chunks, max_score = speculative
+                    rewritten_query = user_message
+                else:
+                    relevant_chunks, max_score = await _retrieve_chunks(
+                        rewritten_query,
+                        collection_name,
+                        faculty_id,
+                        semester_id,
+                        request_id,
+                        stages,
+                    )
+            turn.update(relevant_chunks=relevant_chunks, max_score=max_score)
+            if stages["retrieval"] != "error":
+                # Kept for the follow-up questions of this session
+                await retrieval_memory.save(
+                    chat_session.id, rewritten_query, relevant_chunks, max_score
+                )
+        else:
+            _cancel_speculative_retrieval(speculation, "cancelled", stages)
+            stages["retrieval"] = "skipped"
+    if relevant_chunks:
+        turn["book_id"] = relevant_chunks[0].get("book_id")
+
+    if not relevant_chunks and intent not in ["GENERAL"]:
+        stages["generation"] = "skipped"
+        turn["answer"] = NOT_COVERED_MESSAGE
+        return
+
+    # 7. Prompt assembly; generation itself is done by the caller
+    with stage("prompt"):
+        prompt = build_teacher_prompt(
             relevant_chunks,
             user_message,
             history_formatted,
@@ -193,46 +649,80 @@ async def _handle_chat_message_logic(
             intent=intent,
             mode=mode,
         )
+    for part, tokens in prompt["token_counts"].items():
+        PROMPT_TOKENS.labels(part=part).observe(tokens)
+    turn["prompt_messages"] = prompt["messages"]
+    turn["prompt_tokens"] = prompt["token_counts"]
+    # Groundedness is checked against the context the model actually saw
+    turn["context_text"] = "\n".join([c["text"] for c in prompt["context_chunks"]])
 
-        # Intelligent Caching for Responses
-        cached_resp = await llm_service.get_cached_response(
-            faculty_id, semester_id, user_message
-        )
-        if cached_resp:
-            cache_used = True
-            try:
-                resp_json = json.loads(cached_resp)
-                assistant_message = resp_json.get("answer", "")
-                source_info = resp_json.get("source", source_info)
-            except:
-                assistant_message = cached_resp
-        else:
-            context_text = "\n".join([c["text"] for c in relevant_chunks])
-            resp_data = await llm_service.get_chat_completion_with_validation(
-                prompt_messages, context=context_text
+
+async def _cache_generated_answer(
+    turn: dict, faculty_id: str, semester_id: str, user_message: str, resp_data: dict
+):
+    if turn["hallucination"] or turn["followup"]:
+        # Follow-up answers depend on the session, not only on the question
+        return
+    payload = json.dumps(
+        {
+            **resp_data,
+            "intent": turn["intent"],
+            "mode": turn["mode"],
+            "rag_score": turn["max_score"],
+            "book_id": turn["book_id"],
+        }
+    )
+    await llm_service.cache_response(faculty_id, semester_id, user_message, payload)
+    await _land_flight(turn, payload)
+    if (
+        settings.SEMANTIC_CACHE_ENABLED
+        and turn["question_embedding"] is not None
+        and len(payload) >= 50
+    ):
+        try:
+            await semantic_cache.store(
+                faculty_id, semester_id, turn["question_embedding"], payload
             )
-            assistant_message = resp_data.get("answer", "")
-            source_info = resp_data.get("source", source_info)
-            hallucination_detected = resp_data.get("hallucination", False)
+        except Exception as e:
+            logger.error(f"Failed to store answer in semantic cache: {e}")
 
-            if not hallucination_detected:
-                await llm_service.cache_response(
-                    faculty_id, semester_id, user_message, json.dumps(resp_data)
-                )
 
-    # 7. AI Quality Evaluation Logging
+async def _finalize_turn(
+    db: AsyncSession,
+    turn: dict,
+    user_id: str,
+    user_message: str,
+    faculty_id: str,
+    request_id: str = None,
+) -> tuple:
+    """
+    Quality evaluation, logging and persistence shared by every answer path.
+    """
+    chat_session = turn["session"]
+    stages = turn["stages"]
+    assistant_message = turn["answer"]
+    source_info = turn["source_info"]
+    max_score = turn["max_score"]
+    hallucination_detected = turn["hallucination"]
+    cache_used = "cache" in (stages.get("generation"), stages.get("retrieval"))
+
+    # 8. AI Quality Evaluation Logging
     quality_flag = "PASS"
     if hallucination_detected:
         quality_flag = "HALLUCINATION"
         HALLUCINATIONS_BLOCKED_TOTAL.inc()
-    elif (not relevant_chunks and intent != "GENERAL") or len(assistant_message) < 20:
+    elif stages["generation"] == "skipped" or len(assistant_message) < 20:
         quality_flag = "FAIL"
 
     ANSWERS_TOTAL.labels(faculty_id=faculty_id, status=quality_flag).inc()
 
+    stages_str = ",".join(f"{k}:{v}" for k, v in stages.items())
+    groundedness = turn["groundedness"] or {}
     logger.info(
-        f"AI_QUALITY_LOG: req={request_id} intent={intent} rag_score={max_score} cache={cache_used} "
-        f"resp_len={len(assistant_message)} flag={quality_flag} source={source_info}"
+        f"AI_QUALITY_LOG: req={request_id} intent={turn['intent']} rag_score={max_score} cache={cache_used} "
+        f"stages={stages_str} resp_len={len(assistant_message)} flag={quality_flag} source={source_info} "
+        f"grounded_score={groundedness.get('score')} grounded_by={groundedness.get('source')} "
+        f"route={turn['route']} model={turn['model']} escalation={turn['escalation']}"
     )
 
     if hallucination_detected:
@@ -248,58 +738,312 @@ async def _handle_chat_message_logic(
             request_id=request_id,
         )
 
-    # 8. Save messages and Audit Log
-    chat_repository.create_chat_message(db, chat_session.id, "user", user_message)
-    chat_repository.create_chat_message(
-        db, chat_session.id, "assistant", assistant_message
-    )
+    # 9. Save messages and Audit Log (one transaction, or queued for write-behind)
+    turn_row = {
+        "session_id": chat_session.id,
+        "user_id": user_id,
+        "faculty_id": faculty_id,
+        "question_text": user_message,
+        "ai_answer": assistant_message,
+        "source_info": source_info,
+        "book_id": turn["book_id"],
+        "rag_confidence_score": max_score,
+        "groundedness": turn["groundedness"],
+    }
+    with stage("persist"):
+        audit_log_id = turn_writer.enqueue(turn_row)
+        if audit_log_id is None:
+            with TURN_FLUSH_LATENCY.labels(mode="sync").time():
+                audit_log_id = await chat_repository.persist_chat_turn(db, **turn_row)
+            await rollups.record_answers([turn_row])
+        # The buffer is known to be complete only if this turn loaded the history
+        await history_buffer.append(
+            chat_session.id,
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_message},
+            create=stages.get("history") in ("buffer", "db"),
+        )
 
-    audit_log = chat_repository.create_answer_audit_log(
-        db,
-        user_id=user_id,
-        session_id=chat_session.id,
-        question_text=user_message,
-        ai_answer=assistant_message,
-        source_info=source_info,
-        book_id=relevant_chunks[0].get("book_id") if relevant_chunks else None,
-        rag_confidence_score=max_score,
-    )
+    timer = current_timer()
+    if timer is not None:
+        logger.info(
+            f"STAGE_TIMINGS: req={request_id} faculty={faculty_id} ms={timer.summary()} "
+            f"prompt_tokens={timer.tokens['prompt']} completion_tokens={timer.tokens['completion']} "
+            f"cost_usd={timer.cost:.6f}"
+        )
 
     # Prepare background task info (summarization)
     # We summarize if history is getting long
     history_delta = f"user: {user_message}\nassistant: {assistant_message}"
 
     metadata = {
-        "intent": intent,
-        "mode": mode,
+        "intent": turn["intent"],
+        "mode": turn["mode"],
         "rag_score": max_score,
         "cache_used": cache_used,
-        "relevant_chunks_count": len(relevant_chunks),
+        "stages": stages,
+        "relevant_chunks_count": len(turn["relevant_chunks"]),
         "quality_flag": quality_flag,
         "source": source_info,
+        "route": turn["route"],
+        "model": turn["model"],
+        "teacher_verified": stages.get("generation") == "verified",
+        "timings_ms": timer.summary() if timer is not None else {},
     }
 
     return (
         assistant_message,
         chat_session.id,
-        learning_summary,
+        turn["learning_summary"],
         history_delta,
         metadata,
         source_info,
-        audit_log.id,
+        audit_log_id,
+    )
+
+
+async def _handle_chat_message_logic(
+    db: AsyncSession,
+    user_id: str,
+    session_id: UUID | None,
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str = None,
+    cached_only: bool = False,
+) -> tuple:
+    turn = await _prepare_turn(
+        db,
+        user_id,
+        session_id,
+        user_message,
+        collection_name,
+        faculty_id,
+        semester_id,
+        request_id,
+        cached_only,
     )
+    if turn["refusal"]:
+        return turn["answer"], turn["session"].id, None, "", {}, {}, None
+    if turn["deferred"]:
+        return None, turn["session"].id, None, "", {}, {}, None
 
+    try:
+        if turn["answer"] is None:
+            turn["stages"]["generation"] = "llm"
+            route = llm_service.choose_route(
+                turn["intent"],
+                turn["mode"],
+                turn["max_score"],
+                turn["prompt_tokens"]["context"],
+            )
+            resp_data = await llm_service.get_chat_completion_with_validation(
+                turn["prompt_messages"], context=turn["context_text"], route=route
+            )
+            turn.update(
+                answer=resp_data.get("answer", ""),
+                source_info=resp_data.get("source", turn["source_info"]),
+                hallucination=resp_data.get("hallucination", False),
+                groundedness=resp_data.get("groundedness"),
+                route=resp_data.get("route"),
+                model=resp_data.get("model"),
+                escalation=resp_data.get("escalation"),
+            )
+            with stage("cache_write"):
+                await _cache_generated_answer(
+                    turn, faculty_id, semester_id, user_message, resp_data
+                )
+    finally:
+        # No shareable answer (not covered, hallucination, error)
+        await _land_flight(turn)
+
+    return await _finalize_turn(db, turn, user_id, user_message, faculty_id, request_id)
 
-async def update_learning_summary_task(
-    db: Session, session_id: UUID, current_summary: str, history_delta: str
+
+async def stream_chat_message(
+    db: AsyncSession,
+    user_id: str,
+    session_id: UUID | None,
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str = None,
 ):
     """
-    Background task to update the learning summary without blocking the user response.
+    Streaming variant of handle_chat_message. Yields Server-Sent-Events:
+    "section" when a new answer section (التعريف/الشرح/مثال/ملخص) starts,
+    "delta" for answer text and a final "done" event carrying the source,
+    audit_log_id and groundedness verdict. The last item yielded is the
+    result tuple of handle_chat_message, for the caller's bookkeeping. When
+    any stage fails, an "error" event ends the stream instead (the 200
+    headers are already sent, so its status_code stands in for the HTTP
+    status of /chat), and the turn is neither cached nor persisted (no
+    result tuple).
     """
-    try:
-        updated_summary = await llm_service.summarize_learning_state(
-            current_summary or "", history_delta
+    set_priority("interactive", faculty_id, user_id)
+    with StageTimer(faculty_id):
+        try:
+            async for item in _stream_chat_message(
+                db,
+                user_id,
+                session_id,
+                user_message,
+                collection_name,
+                faculty_id,
+                semester_id,
+                request_id,
+            ):
+                yield item
+        except DeadlineExceeded as e:
+            logger.warning(f"Chat stream cancelled: {e}")
+            yield sse_event(
+                "error",
+                {
+                    "session_id": str(session_id) if session_id else None,
+                    "status_code": 504,
+                    "detail": str(e),
+                },
+            )
+        except Exception as e:
+            logger.error(f"Chat stream failed: {e}")
+            yield sse_event(
+                "error",
+                {
+                    "session_id": str(session_id) if session_id else None,
+                    "status_code": 500,
+                    "detail": STREAM_ERROR_MESSAGE,
+                },
+            )
+
+
+async def _stream_chat_message(
+    db: AsyncSession,
+    user_id: str,
+    session_id: UUID | None,
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str = None,
+):
+    start = time.perf_counter()
+    turn = await _prepare_turn(
+        db,
+        user_id,
+        session_id,
+        user_message,
+        collection_name,
+        faculty_id,
+        semester_id,
+        request_id,
+    )
+    chat_session = turn["session"]
+
+    if turn["refusal"]:
+        yield sse_event("delta", {"section": None, "text": turn["answer"]})
+        yield sse_event(
+            "done",
+            {
+                "session_id": str(chat_session.id),
+                "source": {},
+                "audit_log_id": None,
+                "grounded": None,
+            },
         )
-        chat_repository.update_session_summary(db, session_id, updated_summary)
-    except Exception as e:
-        logger.error(f"Failed to update learning summary: {e}")
+        yield (turn["answer"], chat_session.id, None, "", {}, {}, None)
+        return
+
+    try:
+        if turn["answer"] is not None:
+            # Cached or "not covered" answers are already complete
+            TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+            for section, text in split_sections(turn["answer"]):
+                if section:
+                    yield sse_event("section", {"section": section})
+                yield sse_event("delta", {"section": section, "text": text})
+            grounded = None
+        else:
+            turn["stages"]["generation"] = "llm_stream"
+            parser = SectionStreamParser()
+            parts = []
+            first_token = True
+            generation_start = time.perf_counter()
+            try:
+                async for token in llm_service.stream_chat_completion(
+                    turn["prompt_messages"]
+                    + [{"role": "system", "content": STREAM_FORMAT_INSTRUCTION}]
+                ):
+                    if first_token:
+                        TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+                        first_token = False
+                    parts.append(token)
+                    for event, payload in parser.feed(token):
+                        yield sse_event(event, payload)
+            except APIError:
+                # The client drops any partial text; nothing is cached or
+                # persisted for a turn without an answer
+                yield sse_event(
+                    "error",
+                    {
+                        "session_id": str(chat_session.id),
+                        "status_code": 502,
+                        "detail": STREAM_ERROR_MESSAGE,
+                    },
+                )
+                return
+            for event, payload in parser.flush():
+                yield sse_event(event, payload)
+            record_stage("generation", time.perf_counter() - generation_start)
+
+            answer = "".join(parts).strip()
+            top_chunk = turn["relevant_chunks"][0] if turn["relevant_chunks"] else {}
+            source_info = {
+                "book": top_chunk.get("source", "N/A"),
+                "page": top_chunk.get("page", "N/A"),
+            }
+            grounded = True
+            if turn["context_text"] and answer:
+                with stage("groundedness"):
+                    verdict = await llm_service.verify_groundedness(
+                        answer, turn["context_text"]
+                    )
+                turn["groundedness"] = verdict
+                grounded = verdict["grounded"]
+            if not grounded:
+                logger.warning("Hallucination detected! Groundedness check failed.")
+                turn.update(
+                    answer=HALLUCINATION_MESSAGE,
+                    source_info={"book": "System", "page": "N/A"},
+                    hallucination=True,
+                )
+            else:
+                turn.update(answer=answer, source_info=source_info)
+                with stage("cache_write"):
+                    await _cache_generated_answer(
+                        turn,
+                        faculty_id,
+                        semester_id,
+                        user_message,
+                        {"answer": answer, "source": source_info},
+                    )
+    finally:
+        await _land_flight(turn)
+
+    result = await _finalize_turn(db, turn, user_id, user_message, faculty_id, request_id)
+    ANSWER_LATENCY.observe(time.perf_counter() - start)
+
+    done = {
+        "session_id": str(chat_session.id),
+        "source": turn["source_info"],
+        "audit_log_id": str(result[6]),
+        "grounded": grounded,
+        "groundedness": turn["groundedness"],
+        "teacher_verified": turn["stages"].get("generation") == "verified",
+    }
+    if turn["hallucination"]:
+        # Replaces the streamed text on the client
+        done["answer"] = turn["answer"]
+    yield sse_event("done", done)
+    yield result
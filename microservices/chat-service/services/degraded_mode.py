@@ -0,0 +1,92 @@
+import logging
+import time
+from uuid import uuid4
+
+import redis.asyncio as aioredis
+from core.config import settings
+from core.metrics import DEGRADED_MODE_ACTIVE
+
+logger = logging.getLogger(__name__)
+
+# ZSET "<latency>:<nonce>" scored by the Unix time of the call
+LATENCY_KEY = "degraded_mode:completion_latency"
+
+
+class DegradedMode:
+    """
+    Watches the latency of chat completions over a sliding window shared in
+    Redis by every replica and the chat worker.
+
+    off -> on   when at least DEGRADED_MODE_MIN_SAMPLES calls ended in the
+                window and their median latency exceeds DEGRADED_MODE_ENTER_SECONDS
+    on  -> off  when the median falls below DEGRADED_MODE_EXIT_SECONDS, or the
+                window no longer holds enough calls
+
+    The shared window is read at most every DEGRADED_MODE_CHECK_SECONDS.
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.active = False
+        self.checked_at = 0.0
+        DEGRADED_MODE_ACTIVE.set(0)
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    async def record(self, latency: float):
+        now = time.time()
+        try:
+            redis = await self._get_redis()
+            pipe = redis.pipeline()
+            pipe.zadd(LATENCY_KEY, {f"{latency:.3f}:{uuid4().hex[:8]}": now})
+            pipe.zremrangebyscore(
+                LATENCY_KEY, 0, now - settings.DEGRADED_MODE_WINDOW_SECONDS
+            )
+            pipe.expire(LATENCY_KEY, int(settings.DEGRADED_MODE_WINDOW_SECONDS) + 60)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to record completion latency: {e}")
+
+    async def is_active(self) -> bool:
+        if not settings.DEGRADED_MODE_ENABLED:
+            return False
+        now = time.monotonic()
+        if now - self.checked_at < settings.DEGRADED_MODE_CHECK_SECONDS:
+            return self.active
+        self.checked_at = now
+        try:
+            redis = await self._get_redis()
+            samples = await redis.zrangebyscore(
+                LATENCY_KEY, time.time() - settings.DEGRADED_MODE_WINDOW_SECONDS, "+inf"
+            )
+        except Exception as e:
+            # Keep the last decision rather than flap on a Redis error
+            logger.error(f"Failed to read completion latency: {e}")
+            return self.active
+        latencies = sorted(float(sample.split(":")[0]) for sample in samples)
+        if len(latencies) < settings.DEGRADED_MODE_MIN_SAMPLES:
+            self._set(False)
+        else:
+            median = latencies[len(latencies) // 2]
+            threshold = (
+                settings.DEGRADED_MODE_EXIT_SECONDS
+                if self.active
+                else settings.DEGRADED_MODE_ENTER_SECONDS
+            )
+            self._set(median > threshold)
+        return self.active
+
+    def _set(self, active: bool):
+        if active != self.active:
+            logger.warning(f"Degraded mode is now {'on' if active else 'off'}")
+        self.active = active
+        DEGRADED_MODE_ACTIVE.set(int(active))
+
+
+# Singleton instance
+degraded_mode = DegradedMode()
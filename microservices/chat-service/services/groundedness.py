@@ -0,0 +1,116 @@
+import re
+
+import numpy as np
+from rag.normalize import tokenize
+
+# Sentences shorter than this (in content tokens) carry no evidence either way
+MIN_SENTENCE_TOKENS = 3
+# A sentence counts as supported when this share of its tokens is in the context
+SENTENCE_SUPPORT_THRESHOLD = 0.6
+
+TOKEN_WEIGHT = 0.4
+BIGRAM_WEIGHT = 0.3
+SENTENCE_WEIGHT = 0.3
+
+_SENTENCE_SPLIT = re.compile(r"[.!?؟؛\n]+")
+
+# Function words plus the fixed answer template (section headings, citation
+# phrases) that the prompt asks for but that never appear in the context.
+# Stored in normalized form (see rag.normalize).
+STOPWORDS = {
+    "في", "من", "الي", "علي", "عن", "مع", "هو", "هي", "هم", "هذا", "هذه", "ذلك",
+    "تلك", "التي", "الذي", "الذين", "ان", "او", "ثم", "كما", "لا", "ما", "ماذا",
+    "لم", "لن", "قد", "كل", "بعض", "اي", "غير", "بين", "عند", "حتي", "اذا", "كان",
+    "كانت", "يكون", "تكون", "وهو", "وهي", "وفي", "ومن", "به", "بها", "له", "لها",
+    "فيه", "فيها", "منه", "منها", "عليه", "عليها", "ايضا", "يمكن", "حيث", "و",
+    "التعريف", "الشرح", "مثال", "ملخص", "ورد", "المحتوي", "المرجعي", "وفقا",
+    "the", "a", "an", "of", "in", "on", "to", "is", "are", "and", "or", "for",
+    "with", "as", "by", "it", "this", "that", "be", "at", "from",
+}
+
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+
+def _stem(token: str) -> str:
+    """
+    Light Arabic stemming: strips the definite article and attached
+    conjunction/preposition so "والمعادلة" and "المعادلة" match "معادلة".
+    """
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            return token[len(prefix) :]
+    return token
+
+
+def _content_tokens(text: str) -> list[str]:
+    return [_stem(t) for t in tokenize(text) if t not in STOPWORDS]
+
+
+def score_groundedness(answer: str, context: str) -> dict:
+    """
+    Scores how well the answer is supported by the context, in [0, 1].
+
+    Combines three lexical signals computed over Arabic-normalized content
+    tokens: unigram coverage, bigram coverage and the share of answer
+    sentences whose tokens are mostly found in the context.
+    """
+    context_tokens = _content_tokens(context)
+    vocab = {token: i for i, token in enumerate(dict.fromkeys(context_tokens))}
+    vocab_size = len(vocab) + 1
+
+    token_ids = []
+    sentence_ids = []
+    for sentence_index, sentence in enumerate(_SENTENCE_SPLIT.split(answer or "")):
+        for token in _content_tokens(sentence):
+            token_ids.append(vocab.get(token, -1))
+            sentence_ids.append(sentence_index)
+
+    if not token_ids or not vocab:
+        return {
+            "score": 0.0,
+            "token_coverage": 0.0,
+            "bigram_coverage": 0.0,
+            "supported_ratio": 0.0,
+        }
+
+    ids = np.asarray(token_ids, dtype=np.int64)
+    sentences = np.asarray(sentence_ids, dtype=np.int64)
+    covered = ids >= 0
+    token_coverage = float(covered.mean())
+
+    # Bigrams are encoded as a single integer: left_id * vocab_size + right_id
+    context_ids = np.asarray([vocab[t] for t in context_tokens], dtype=np.int64)
+    context_bigrams = np.unique(context_ids[:-1] * vocab_size + context_ids[1:])
+    same_sentence = sentences[:-1] == sentences[1:]
+    answer_bigrams = (ids[:-1] * vocab_size + ids[1:])[same_sentence]
+    both_known = (covered[:-1] & covered[1:])[same_sentence]
+    if answer_bigrams.size:
+        bigram_hits = np.isin(answer_bigrams, context_bigrams) & both_known
+        bigram_coverage = float(bigram_hits.mean())
+    else:
+        bigram_coverage = token_coverage
+
+    # Sentence-level support ratio, weighted by sentence length
+    lengths = np.bincount(sentences)
+    hits = np.bincount(sentences, weights=covered)
+    evaluated = lengths >= MIN_SENTENCE_TOKENS
+    if evaluated.any():
+        ratios = hits[evaluated] / lengths[evaluated]
+        supported = ratios >= SENTENCE_SUPPORT_THRESHOLD
+        supported_ratio = float(
+            lengths[evaluated][supported].sum() / lengths[evaluated].sum()
+        )
+    else:
+        supported_ratio = token_coverage
+
+    score = (
+        TOKEN_WEIGHT * token_coverage
+        + BIGRAM_WEIGHT * bigram_coverage
+        + SENTENCE_WEIGHT * supported_ratio
+    )
+    return {
+        "score": round(score, 4),
+        "token_coverage": round(token_coverage, 4),
+        "bigram_coverage": round(bigram_coverage, 4),
+        "supported_ratio": round(supported_ratio, 4),
+    }
@@ -0,0 +1,110 @@
+import json
+import logging
+
+import redis.asyncio as aioredis
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FILL_IF_ABSENT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('RPUSH', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+"""
+
+
+class HistoryBuffer:
+    """
+    Per-session ring buffer of the most recent chat messages in Redis:
+      chat_history:{session_id}  LIST of {"role", "content"} JSON, oldest first
+    It is appended to when a turn is persisted and trimmed to the last
+    max_turns turns, so building the prompt does not need to read Postgres.
+    """
+
+    def __init__(self, max_turns: int = None, ttl: int = None):
+        self.max_messages = 2 * (max_turns or settings.CHAT_HISTORY_BUFFER_TURNS)
+        self.ttl = ttl or settings.CHAT_HISTORY_BUFFER_TTL_SECONDS
+        self.redis = None
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    @staticmethod
+    def _key(session_id) -> str:
+        return f"chat_history:{session_id}"
+
+    async def get(self, session_id, limit: int) -> list[dict] | None:
+        """
+        The last `limit` messages, or None when the buffer is cold (evicted,
+        expired or never written) and the caller must read the database.
+        """
+        try:
+            redis = await self._get_redis()
+            key = self._key(session_id)
+            pipe = redis.pipeline()
+            pipe.exists(key)
+            pipe.lrange(key, -limit, -1)
+            exists, items = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to read chat history buffer: {e}")
+            return None
+        if not exists:
+            return None
+        return [json.loads(item) for item in items]
+
+    async def append(self, session_id, *messages: dict, create: bool = True):
+        """
+        Appends messages and trims the buffer. With create=False nothing is
+        written to a cold buffer, which would otherwise look complete while
+        missing the earlier turns.
+        """
+        try:
+            redis = await self._get_redis()
+            key = self._key(session_id)
+            items = [json.dumps(m, ensure_ascii=False) for m in messages]
+            pipe = redis.pipeline()
+            if create:
+                pipe.rpush(key, *items)
+            else:
+                pipe.rpushx(key, *items)
+            pipe.ltrim(key, -self.max_messages, -1)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to append to chat history buffer: {e}")
+
+    async def fill(self, session_id, messages: list[dict]):
+        """
+        Warms a cold buffer from the database. The messages are pushed only
+        when the buffer does not exist, so a concurrent append is not lost or
+        duplicated.
+        """
+        if not messages:
+            return
+        try:
+            redis = await self._get_redis()
+            await redis.eval(
+                FILL_IF_ABSENT,
+                1,
+                self._key(session_id),
+                self.ttl,
+                *[json.dumps(m, ensure_ascii=False) for m in messages[-self.max_messages :]],
+            )
+        except Exception as e:
+            logger.error(f"Failed to fill chat history buffer: {e}")
+
+    async def clear(self, session_id):
+        try:
+            redis = await self._get_redis()
+            await redis.delete(self._key(session_id))
+        except Exception as e:
+            logger.error(f"Failed to clear chat history buffer: {e}")
+
+
+# Singleton instance
+history_buffer = HistoryBuffer()
@@ -0,0 +1,249 @@
+import json
+import logging
+import time
+
+import numpy as np
+import redis.asyncio as aioredis
+from core.config import settings
+from rag.normalize import normalize_question, tokenize
+
+logger = logging.getLogger(__name__)
+
+INTENTS = [
+    "DEFINITION",
+    "EXAMPLE",
+    "EXAM_STYLE",
+    "REVISION",
+    "CONFUSED",
+    "OUTSIDE_SYLLABUS",
+    "GENERAL",
+]
+MODES = ["UNDERSTANDING", "EXAM", "QUESTION_PREDICTION"]
+
+MODEL_KEY = "intent_classifier:model"
+SAMPLES_KEY = "intent_classifier:samples"
+MAX_SAMPLES = 20000
+
+# Keyword rules, checked in order so the more specific intents come first.
+# Keywords are normalized once at import (see rag.normalize).
+INTENT_RULES = [
+    ("EXAM_STYLE", ["سؤال امتحان", "اسئله امتحان", "سؤال متوقع", "اسئله متوقعه", "نموذج امتحان", "اسئله الامتحان"]),
+    ("CONFUSED", ["لم افهم", "ما فهمت", "مش فاهم", "اشرح مره اخري", "اشرح مجددا", "اشرح ثانيه", "وضح اكثر", "بطريقه ابسط", "explain again", "don't understand", "i don't get it"]),
+    ("EXAMPLE", ["مثال", "امثله", "مثالا", "اعطني مثال", "example"]),
+    ("DEFINITION", ["ما هو", "ما هي", "ما معني", "ماذا يعني", "عرف", "تعريف", "define", "what is"]),
+    ("GENERAL", ["مرحبا", "السلام عليكم", "اهلا", "شكرا", "كيف حالك", "صباح الخير", "مساء الخير", "hello", "thanks"]),
+]
+MODE_RULES = [
+    ("QUESTION_PREDICTION", ["توقع", "متوقع", "متوقعه"]),
+    ("EXAM", ["امتحان", "الامتحان", "اختبار", "exam"]),
+]
+
+# Words that point back to earlier turns; a question containing them is not
+# self-contained and still needs the LLM rewrite when there is history.
+ANAPHORA = {
+    "هذا", "هذه", "ذلك", "تلك", "هو", "هي", "هم", "نفس", "السابق", "السابقه",
+    "اخر", "اخري", "ايضا", "مجددا", "كذلك", "it", "this", "that", "again", "another",
+}
+MAX_SELF_CONTAINED_TOKENS = 12
+
+# Words of a follow-up request that say nothing about its topic ("give me
+# another example", "explain that again"); see topic_overlap.
+FOLLOWUP_FILLER = {
+    "اعطني", "اعطيني", "هات", "اريد", "ممكن", "لو", "سمحت", "من", "في", "عن",
+    "علي", "الي", "مع", "لي", "لنا", "ثاني", "ثانيه", "مره", "اكثر", "اشرح",
+    "وضح", "فهمت", "افهم", "لم", "ما", "مش", "بطريقه", "ابسط", "مثال", "امثله",
+    "مثالا", "give", "me", "please", "a", "an", "the", "of", "on", "more",
+    "explain", "example", "examples", "i", "don", "t", "get", "understand",
+}
+
+
+def _normalize_rules(rules: list) -> list:
+    return [(label, [normalize_question(kw) for kw in kws]) for label, kws in rules]
+
+
+INTENT_RULES = _normalize_rules(INTENT_RULES)
+MODE_RULES = _normalize_rules(MODE_RULES)
+ANAPHORA = {normalize_question(word) for word in ANAPHORA}
+FOLLOWUP_FILLER = {normalize_question(word) for word in FOLLOWUP_FILLER}
+
+
+def _match_rules(text: str, rules: list) -> str | None:
+    padded = f" {text} "
+    for label, keywords in rules:
+        if any(f" {kw} " in padded or padded.startswith(f" {kw}") for kw in keywords):
+            return label
+    return None
+
+
+def _topical_words(tokens: list[str]) -> set[str]:
+    return {t for t in tokens if t not in ANAPHORA and t not in FOLLOWUP_FILLER}
+
+
+def needs_rewrite(message: str, history: str) -> bool:
+    """
+    Short questions that do not refer back to the conversation are already a
+    good retrieval query, so the LLM rewrite step can be skipped for them.
+    With history, a question that refers back (anaphora) or names no topic
+    at all ("give me an example", "explain more") is rewritten.
+    """
+    tokens = tokenize(message)
+    if len(tokens) > MAX_SELF_CONTAINED_TOKENS:
+        return True
+    if not history:
+        return False
+    return any(t in ANAPHORA for t in tokens) or not _topical_words(tokens)
+
+
+def topic_overlap(message: str, reference: str) -> float:
+    """
+    Share of the topical words of `message` (neither anaphora nor follow-up
+    filler) that occur in `reference`. A message without topical words
+    ("another example please") continues the reference topic: 1.0.
+    """
+    topical = _topical_words(tokenize(message))
+    if not topical:
+        return 1.0
+    vocabulary = set(tokenize(reference))
+    return len(topical & vocabulary) / len(topical)
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def fit_centroids(embeddings: list, labels: list[str]) -> dict:
+    """
+    Mean unit vector per label.
+    """
+    matrix = _unit_rows(np.asarray(embeddings, dtype=np.float32))
+    labels_arr = np.asarray(labels)
+    centroids = {}
+    for label in sorted(set(labels)):
+        centroid = matrix[labels_arr == label].mean(axis=0)
+        centroids[label] = _unit_rows(centroid).tolist()
+    return centroids
+
+
+def calibrate_threshold(
+    similarities: list[float], correct: list[bool], target_precision: float = 0.9
+) -> float:
+    """
+    Lowest similarity threshold at which the predictions accepted above it
+    still agree with the LLM labels at target_precision.
+    """
+    order = np.argsort(similarities)[::-1]
+    sims = np.asarray(similarities)[order]
+    hits = np.asarray(correct, dtype=np.float64)[order]
+    precision = np.cumsum(hits) / np.arange(1, len(hits) + 1)
+    passing = np.nonzero(precision >= target_precision)[0]
+    if not passing.size:
+        return 1.01  # Never confident: everything falls back to the LLM
+    return float(sims[passing[-1]])
+
+
+class IntentClassifier:
+    """
+    Local intent/mode classifier: an Arabic keyword rule layer plus
+    nearest-centroid over the question embedding. The centroids and the
+    confidence threshold are trained offline (scripts/train_intent_classifier.py)
+    from intents labelled by the LLM and stored in Redis.
+    """
+
+    def __init__(self, reload_interval: float = 300.0):
+        self.reload_interval = reload_interval
+        self.redis = None
+        self.loaded_at = 0.0
+        self.threshold = None
+        self.margin = 0.0
+        self.intent_labels = []
+        self.intent_matrix = None
+        self.mode_labels = []
+        self.mode_matrix = None
+
+    def set_model(self, model: dict):
+        self.threshold = model.get("threshold")
+        self.margin = model.get("margin", 0.0)
+        self.intent_labels = list(model.get("intent_centroids", {}))
+        self.intent_matrix = (
+            np.asarray(list(model["intent_centroids"].values()), dtype=np.float32)
+            if self.intent_labels
+            else None
+        )
+        self.mode_labels = list(model.get("mode_centroids", {}))
+        self.mode_matrix = (
+            np.asarray(list(model["mode_centroids"].values()), dtype=np.float32)
+            if self.mode_labels
+            else None
+        )
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    async def ensure_loaded(self):
+        """
+        (Re)loads the trained model from Redis at most every reload_interval.
+        """
+        if time.monotonic() - self.loaded_at < self.reload_interval:
+            return
+        self.loaded_at = time.monotonic()
+        try:
+            redis = await self._get_redis()
+            raw = await redis.get(MODEL_KEY)
+            if raw:
+                self.set_model(json.loads(raw))
+        except Exception as e:
+            logger.error(f"Failed to load intent classifier model: {e}")
+
+    @staticmethod
+    def _nearest(matrix: np.ndarray, labels: list, query: np.ndarray) -> tuple:
+        sims = matrix @ query
+        order = np.argsort(sims)[::-1]
+        best = float(sims[order[0]])
+        second = float(sims[order[1]]) if len(order) > 1 else -1.0
+        return labels[order[0]], best, best - second
+
+    def classify(self, message: str, embedding=None) -> dict | None:
+        """
+        Returns {"intent", "mode", "confidence", "source"} or None when the
+        message must fall back to the LLM.
+        """
+        text = normalize_question(message)
+        intent = _match_rules(text, INTENT_RULES)
+        mode = _match_rules(text, MODE_RULES)
+        if intent:
+            return {
+                "intent": intent,
+                "mode": mode or "UNDERSTANDING",
+                "confidence": 1.0,
+                "source": "rules",
+            }
+
+        if embedding is None or self.intent_matrix is None or self.threshold is None:
+            return None
+        query = _unit_rows(np.asarray(embedding, dtype=np.float32))
+        if query.shape[0] != self.intent_matrix.shape[1]:
+            return None
+
+        intent, similarity, margin = self._nearest(
+            self.intent_matrix, self.intent_labels, query
+        )
+        if similarity < self.threshold or margin < self.margin:
+            return None
+        if mode is None and self.mode_matrix is not None:
+            mode, _, _ = self._nearest(self.mode_matrix, self.mode_labels, query)
+        return {
+            "intent": intent,
+            "mode": mode or "UNDERSTANDING",
+            "confidence": round(similarity, 4),
+            "source": "centroid",
+        }
+
+
+# Singleton instance
+intent_classifier = IntentClassifier()
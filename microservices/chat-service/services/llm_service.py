@@ -1,23 +1,83 @@
+import asyncio
 import hashlib
 import json
 import logging
+import time
+from uuid import uuid4
 
 import redis.asyncio as aioredis
+from core import deadline
+from core.cache import TwoTierCache
 from core.config import settings
+from core.llm_scheduler import COMPLETION_TOKENS, estimate_tokens, llm_scheduler
+from core.metrics import (
+    CASCADE_ANSWERS_TOTAL,
+    CASCADE_ESCALATIONS_TOTAL,
+    CASCADE_LATENCY,
+    GROUNDEDNESS_SCORE,
+    GROUNDEDNESS_VERDICTS_TOTAL,
+    SINGLEFLIGHT_LEADERS_TOTAL,
+    SINGLEFLIGHT_WAITERS,
+    SINGLEFLIGHT_WAITERS_TOTAL,
+)
+from core.stage_timer import record_usage, stage
 from openai import APIError, AsyncOpenAI
+from rag.normalize import normalize_question
+from services.degraded_mode import degraded_mode
+from services.groundedness import score_groundedness
+from services.intent_classifier import MAX_SAMPLES, SAMPLES_KEY
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Singleflight: one computation per question in flight across all replicas
+FLIGHT_LOCK_KEY = "singleflight:lock:{key}"  # owner token of the leader
+FLIGHT_RESULT_KEY = "singleflight:result:{key}"  # leader's answer, briefly kept
+FLIGHT_CHANNEL = "singleflight:done:{key}"  # answer payload, "" when it failed
+FLIGHT_RESULT_TTL_SECONDS = 60
+
+# Releases the lock only if it is still ours
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+HALLUCINATION_MESSAGE = "عذراً، هذا السؤال خارج نطاق المحتوى المقرر حالياً. أنا مصمم للمساعدة في محتوى المنهج الدراسي فقط لضمان دقة المعلومات."
+
 
 class LLMService:
     def __init__(self):
         """
         Initializes the LLMService with the OpenAI API key and Redis.
         """
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL
+        )
         self.redis = None
+        # flight key -> task awaiting the leader, shared by local waiters
+        self._flight_waiters = {}
+        self.intent_cache = TwoTierCache("intent", ttl=3600)
+        self.rag_cache = TwoTierCache("rag_cache", ttl=3600 * 6)
+        # Only read while rag-service is unavailable: not worth local memory
+        self.rag_stale_cache = TwoTierCache(
+            "rag_stale", ttl=settings.RAG_STALE_TTL_SECONDS, local_max_entries=0
+        )
+        self.answer_cache = TwoTierCache(
+            "ans_cache",
+            ttl=3600 * 24,
+            compress_min_bytes=settings.CACHE_COMPRESS_MIN_BYTES,
+            legacy_decoder=bytes.decode,
+        )
+        # Embeddings never change, so the local copy can live as long as Redis's
+        self.embedding_cache = TwoTierCache(
+            "emb",
+            ttl=86400,
+            local_ttl=86400,
+            vector_dtype=settings.EMBEDDING_CACHE_DTYPE,
+        )
 
     async def _get_redis(self):
         if self.redis is None:
@@ -35,11 +95,22 @@ class LLMService:
         """
         try:
             logger.info(f"Requesting chat completion with model {model}")
-            response = await self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
+            tokens = estimate_tokens(
+                *[m["content"] for m in messages], completion=COMPLETION_TOKENS
             )
+            async with llm_scheduler.slot(model, tokens):
+                call_start = time.perf_counter()
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        timeout=deadline.timeout(settings.LLM_TIMEOUT_SECONDS),
+                    )
+                finally:
+                    # Timeouts count too: they are the slowest calls
+                    await degraded_mode.record(time.perf_counter() - call_start)
+            record_usage(model, response.usage)
             content = response.choices[0].message.content
             logger.info("Successfully received chat completion")
             return content
@@ -50,20 +121,50 @@ class LLMService:
             logger.error(f"Unexpected error in get_chat_completion: {e}")
             return "عذراً، حدث خطأ غير متوقع."
 
+    async def stream_chat_completion(
+        self, messages: list[dict], model: str = "gpt-4o", temperature: float = 0.1
+    ):
+        """
+        Streams a chat completion, yielding content deltas as they arrive.
+        Raises APIError, possibly after some deltas were yielded.
+        """
+        try:
+            logger.info(f"Requesting streaming chat completion with model {model}")
+            tokens = estimate_tokens(
+                *[m["content"] for m in messages], completion=COMPLETION_TOKENS
+            )
+            # The slot is held until the stream ends
+            async with llm_scheduler.slot(model, tokens, latency_signal=False):
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                    timeout=deadline.timeout(settings.LLM_TIMEOUT_SECONDS),
+                    # The last chunk then carries the usage, with no choices
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    if chunk.usage:
+                        record_usage(model, chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            logger.info("Successfully streamed chat completion")
+        except APIError as e:
+            # Raised rather than yielded: error text must never pass for an answer
+            logger.error(f"OpenAI API error while streaming: {e}")
+            raise
+
     async def detect_intent_and_rewrite_query(
         self, user_message: str, history: str
     ) -> dict:
         """
         Detects user intent and rewrites the query for RAG with caching.
         """
-        cache_key = (
-            f"intent:{hashlib.md5((user_message + history).encode()).hexdigest()}"
-        )
-        redis = await self._get_redis()
-
-        cached = await redis.get(cache_key)
+        cache_key = hashlib.md5((user_message + history).encode()).hexdigest()
+        cached = await self.intent_cache.get(cache_key)
         if cached:
-            return json.loads(cached)
+            return cached
 
         system_prompt = """
 Analyze the student message and history.
@@ -85,20 +186,47 @@ Output JSON:
                 "content": f"History: {history}\n\nStudent Message: {user_message}",
             },
         ]
+        start = time.perf_counter()
         response_text = await self.get_chat_completion(messages, model="gpt-4o-mini")
+        latency_ms = round((time.perf_counter() - start) * 1000)
         try:
             # Simple cleanup for potential markdown blocks
             if "```json" in response_text:
                 response_text = response_text.split("```json")[1].split("```")[0]
             result = json.loads(response_text)
-            await redis.setex(cache_key, 3600, json.dumps(result))  # Cache for 1 hour
-            return result
         except Exception:
             return {
                 "intent": "GENERAL",
                 "mode": "UNDERSTANDING",
                 "rewritten_query": user_message,
             }
+        await self.intent_cache.set(cache_key, result)  # Cache for 1 hour
+        await self._log_intent_sample(user_message, bool(history), result, latency_ms)
+        return result
+
+    async def _log_intent_sample(
+        self, user_message: str, has_history: bool, result: dict, latency_ms: int
+    ):
+        """
+        Keeps LLM-labelled messages as training/evaluation data for the local
+        intent classifier. Best effort: never affects the intent returned.
+        """
+        sample = {
+            "message": user_message,
+            "has_history": has_history,
+            "intent": result.get("intent"),
+            "mode": result.get("mode"),
+            "latency_ms": latency_ms,
+            "ts": time.time(),
+        }
+        try:
+            redis = await self._get_redis()
+            pipe = redis.pipeline()
+            pipe.lpush(SAMPLES_KEY, json.dumps(sample, ensure_ascii=False))
+            pipe.ltrim(SAMPLES_KEY, 0, MAX_SAMPLES - 1)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to log intent sample: {e}")
 
     async def rerank_results(self, query: str, chunks: list[str]) -> list[str]:
         """
@@ -179,12 +307,57 @@ Only return 'TRUE' or 'FALSE'.
         )
         return "TRUE" in response.upper()
 
+    async def verify_groundedness(self, answer: str, context: str) -> dict:
+        """
+        Scores the answer locally and only asks the LLM auditor when the local
+        score falls inside the uncertain band and the request deadline leaves
+        time for it; otherwise the middle of the band decides.
+        Returns {"grounded": bool, "score": float, "source": "local" | "llm" | "deadline"}.
+        """
+        score = score_groundedness(answer, context)["score"]
+        GROUNDEDNESS_SCORE.observe(score)
+
+        if score >= settings.GROUNDEDNESS_UPPER_BOUND:
+            grounded, source = True, "local"
+        elif score < settings.GROUNDEDNESS_LOWER_BOUND:
+            grounded, source = False, "local"
+        elif deadline.has_budget("groundedness_llm", settings.DEADLINE_MIN_AUDITOR_SECONDS):
+            grounded, source = await self.check_groundedness(answer, context), "llm"
+        else:
+            midpoint = (settings.GROUNDEDNESS_LOWER_BOUND + settings.GROUNDEDNESS_UPPER_BOUND) / 2
+            grounded, source = score >= midpoint, "deadline"
+
+        GROUNDEDNESS_VERDICTS_TOTAL.labels(source=source, grounded=str(grounded)).inc()
+        return {"grounded": grounded, "score": score, "source": source}
+
+    @staticmethod
+    def choose_route(
+        intent: str, mode: str, max_score: float, context_tokens: int
+    ) -> str:
+        """
+        Cascade routing policy: "small" for questions the small model usually
+        answers well (configured intents and modes, a confident retrieval and a
+        small context), "large" otherwise.
+        """
+        if (
+            settings.CASCADE_ENABLED
+            and intent in settings.CASCADE_SMALL_INTENTS
+            and mode in settings.CASCADE_SMALL_MODES
+            and max_score >= settings.CASCADE_MIN_RAG_SCORE
+            and context_tokens <= settings.CASCADE_MAX_CONTEXT_TOKENS
+        ):
+            return "small"
+        return "large"
+
     async def get_chat_completion_with_validation(
-        self, messages: list[dict], context: str = None
+        self, messages: list[dict], context: str = None, route: str = "large"
     ) -> dict:
         """
         Enforces structured output validation and groundedness after LLM call.
-        Returns a dict with 'answer' and 'source' info.
+        Returns a dict with 'answer' and 'source' info, plus the cascade
+        'route', the 'model' that answered and the 'escalation' reason.
+        On the small route, an answer that is not valid JSON or not grounded
+        is regenerated by the large model.
         """
         # Request JSON output
         messages.append(
@@ -193,9 +366,43 @@ Only return 'TRUE' or 'FALSE'.
                 "content": "You MUST return a JSON object with 'answer' and 'source' (book, page) keys. Ensure the 'answer' follows the Arabic structure: التعريف، الشرح، مثال، ملخص.",
             }
         )
-        response_text = await self.get_chat_completion(
-            messages, model="gpt-4o", temperature=0.1
+        start = time.perf_counter()
+        escalation = None
+        if route == "small":
+            model = settings.CASCADE_SMALL_MODEL
+            result, failure = await self._generate_validated(messages, model, context)
+            # Not enough time left for a second generation: keep the failure
+            if failure and deadline.has_budget(
+                "escalation", settings.DEADLINE_MIN_ESCALATION_SECONDS
+            ):
+                escalation = failure
+                CASCADE_ESCALATIONS_TOTAL.labels(reason=failure).inc()
+        if route != "small" or escalation:
+            model = settings.CASCADE_LARGE_MODEL
+            result, failure = await self._generate_validated(messages, model, context)
+
+        outcome = "escalated" if escalation else "failed" if failure else "accepted"
+        elapsed = time.perf_counter() - start
+        CASCADE_ANSWERS_TOTAL.labels(route=route, outcome=outcome).inc()
+        CASCADE_LATENCY.labels(route=route).observe(elapsed)
+        logger.info(
+            f"CASCADE: route={route} model={model} outcome={outcome} escalation={escalation} "
+            f"failure={failure} latency_ms={round(elapsed * 1000)}"
         )
+        result.update(route=route, model=model, escalation=escalation)
+        return result
+
+    async def _generate_validated(
+        self, messages: list[dict], model: str, context: str = None
+    ) -> tuple[dict, str | None]:
+        """
+        One generation with JSON and groundedness validation. Returns the
+        answer dict and the failure reason ("json", "ungrounded") or None.
+        """
+        with stage("generation", check_deadline=True):
+            response_text = await self.get_chat_completion(
+                messages, model=model, temperature=0.1
+            )
 
         try:
             # Simple cleanup for potential markdown blocks
@@ -204,59 +411,181 @@ Only return 'TRUE' or 'FALSE'.
             result = json.loads(response_text)
         except Exception:
             # Fallback if LLM failed to return valid JSON
-            logger.error(f"Failed to parse LLM response as JSON: {response_text}")
+            logger.error(f"Failed to parse {model} response as JSON: {response_text}")
             return {
                 "answer": "عذراً، حدث خطأ في معالجة الإجابة بشكل صحيح.",
                 "source": {"book": "N/A", "page": "N/A"},
-            }
+            }, "json"
 
         # Groundedness Check
         if context and result.get("answer"):
-            is_grounded = await self.check_groundedness(result["answer"], context)
-            if not is_grounded:
-                logger.warning("Hallucination detected! Groundedness check failed.")
+            with stage("groundedness"):
+                verdict = await self.verify_groundedness(result["answer"], context)
+            if not verdict["grounded"]:
+                logger.warning(f"Hallucination detected! Groundedness check failed ({model}).")
                 return {
-                    "answer": "عذراً، هذا السؤال خارج نطاق المحتوى المقرر حالياً. أنا مصمم للمساعدة في محتوى المنهج الدراسي فقط لضمان دقة المعلومات.",
+                    "answer": HALLUCINATION_MESSAGE,
                     "source": {"book": "System", "page": "N/A"},
                     "hallucination": True,
-                }
+                    "groundedness": verdict,
+                }, "ungrounded"
+            result["groundedness"] = verdict
 
-        return result
+        return result, None
+
+    @staticmethod
+    def _rag_cache_key(query: str, collection: str, faculty: str, semester: str) -> str:
+        return f"{faculty}:{semester}:{hashlib.md5((query + collection).encode()).hexdigest()}"
 
     async def get_cached_rag_results(
         self, query: str, collection: str, faculty: str, semester: str
     ):
-        redis = await self._get_redis()
-        key = f"rag_cache:{faculty}:{semester}:{hashlib.md5((query + collection).encode()).hexdigest()}"
-        cached = await redis.get(key)
-        return json.loads(cached) if cached else None
+        return await self.rag_cache.get(
+            self._rag_cache_key(query, collection, faculty, semester)
+        )
+
+    async def get_stale_rag_results(
+        self, query: str, collection: str, faculty: str, semester: str
+    ):
+        """
+        Last known search results for the query, kept well beyond the
+        rag_cache TTL so they can be served while rag-service is down.
+        """
+        return await self.rag_stale_cache.get(
+            self._rag_cache_key(query, collection, faculty, semester)
+        )
 
     async def cache_rag_results(
         self, query: str, collection: str, faculty: str, semester: str, results: list
     ):
-        redis = await self._get_redis()
-        key = f"rag_cache:{faculty}:{semester}:{hashlib.md5((query + collection).encode()).hexdigest()}"
-        await redis.setex(key, 3600 * 6, json.dumps(results))  # 6 hours cache
+        key = self._rag_cache_key(query, collection, faculty, semester)
+        await asyncio.gather(
+            self.rag_cache.set(key, results),  # 6 hours cache
+            self.rag_stale_cache.set(key, results),
+        )
+
+    @staticmethod
+    def _answer_cache_key(faculty: str, semester: str, question: str) -> str:
+        return f"{faculty}:{semester}:{hashlib.md5(question.encode()).hexdigest()}"
 
     async def get_cached_response(self, faculty: str, semester: str, question: str):
-        redis = await self._get_redis()
-        norm_q = question.strip().lower()
-        key = (
-            f"ans_cache:{faculty}:{semester}:{hashlib.md5(norm_q.encode()).hexdigest()}"
+        """
+        Looks up a cached answer by the exact question first, then by its
+        normalized form (Arabic folding, punctuation and whitespace removed).
+        Both keys are fetched in a single round-trip.
+        """
+        exact_key = self._answer_cache_key(faculty, semester, question.strip().lower())
+        norm_key = self._answer_cache_key(
+            faculty, semester, normalize_question(question)
         )
-        return await redis.get(key)
+        return await self.answer_cache.get_first(exact_key, norm_key)
 
     async def cache_response(
         self, faculty: str, semester: str, question: str, response: str
     ):
         if len(response) < 50:
             return  # Don't cache short/error responses
-        redis = await self._get_redis()
-        norm_q = question.strip().lower()
-        key = (
-            f"ans_cache:{faculty}:{semester}:{hashlib.md5(norm_q.encode()).hexdigest()}"
-        )
-        await redis.setex(key, 3600 * 24, response)  # 24 hours cache
+        key = self._answer_cache_key(faculty, semester, normalize_question(question))
+        await self.answer_cache.set(key, response)  # 24 hours cache
+
+    @staticmethod
+    def flight_key(faculty: str, semester: str, question: str) -> str:
+        scope = f"{faculty}:{semester}:{normalize_question(question)}"
+        return hashlib.md5(scope.encode()).hexdigest()
+
+    async def acquire_flight(self, key: str) -> tuple[bool, str | None]:
+        """
+        Tries to become the leader computing the answer for `key`.
+        Returns (leader, token): the token is needed to land the flight. When
+        Redis is unavailable the request leads without a lock (token None).
+        """
+        token = uuid4().hex
+        try:
+            redis = await self._get_redis()
+            acquired = await redis.set(
+                FLIGHT_LOCK_KEY.format(key=key),
+                token,
+                nx=True,
+                ex=settings.SINGLEFLIGHT_LOCK_TTL_SECONDS,
+            )
+        except Exception as e:
+            logger.error(f"Singleflight lock failed: {e}")
+            return True, None
+        if not acquired:
+            return False, None
+        SINGLEFLIGHT_LEADERS_TOTAL.inc()
+        return True, token
+
+    async def land_flight(self, key: str, token: str | None, payload: str = None):
+        """
+        Hands the leader's answer payload to the waiters (None when no answer
+        can be shared, so they compute their own) and releases the lock.
+        """
+        if token is None:
+            return
+        try:
+            redis = await self._get_redis()
+            pipe = redis.pipeline()
+            if payload is not None:
+                pipe.setex(
+                    FLIGHT_RESULT_KEY.format(key=key), FLIGHT_RESULT_TTL_SECONDS, payload
+                )
+            pipe.eval(RELEASE_LOCK, 1, FLIGHT_LOCK_KEY.format(key=key), token)
+            pipe.publish(FLIGHT_CHANNEL.format(key=key), payload or "")
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to land singleflight {key}: {e}")
+
+    async def wait_for_flight(self, key: str) -> str | None:
+        """
+        Awaits the answer of the request leading `key`. Returns None when the
+        leader failed, gave up or did not finish within SINGLEFLIGHT_WAIT_SECONDS
+        (or the request deadline); the caller then computes the answer itself.
+        Waiters in one process share a single subscription.
+        """
+        waiter = self._flight_waiters.get(key)
+        if waiter is None:
+            waiter = asyncio.ensure_future(self._await_flight(key))
+            self._flight_waiters[key] = waiter
+            waiter.add_done_callback(lambda _: self._flight_waiters.pop(key, None))
+        SINGLEFLIGHT_WAITERS.inc()
+        try:
+            payload = await asyncio.wait_for(
+                asyncio.shield(waiter), timeout=deadline.timeout(None)
+            )
+        except asyncio.TimeoutError:
+            payload = None
+        finally:
+            SINGLEFLIGHT_WAITERS.dec()
+        SINGLEFLIGHT_WAITERS_TOTAL.labels(result="shared" if payload else "fallback").inc()
+        return payload
+
+    async def _await_flight(self, key: str) -> str | None:
+        pubsub = None
+        try:
+            redis = await self._get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(FLIGHT_CHANNEL.format(key=key))
+            # The leader may have landed before the subscription was active
+            result, leading = await redis.mget(
+                FLIGHT_RESULT_KEY.format(key=key), FLIGHT_LOCK_KEY.format(key=key)
+            )
+            if result or not leading:
+                return result
+            give_up_at = time.monotonic() + settings.SINGLEFLIGHT_WAIT_SECONDS
+            while (remaining := give_up_at - time.monotonic()) > 0:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=remaining
+                )
+                if message and message["type"] == "message":
+                    return message["data"] or None
+            return None
+        except Exception as e:
+            logger.error(f"Singleflight wait failed: {e}")
+            return None
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
 
     async def get_embedding(
         self, text: str, model: str = "text-embedding-3-small"
@@ -264,24 +593,26 @@ Only return 'TRUE' or 'FALSE'.
         """
         Generates an embedding for a given text with caching.
         """
-        cache_key = f"emb:{hashlib.md5(text.encode()).hexdigest()}"
-        redis = await self._get_redis()
-
-        cached = await redis.get(cache_key)
+        cache_key = hashlib.md5(text.encode()).hexdigest()
+        cached = await self.embedding_cache.get(cache_key)
         if cached:
-            return json.loads(cached)
+            return cached
 
         try:
             logger.info(f"Generating embedding with model {model}")
             # Ensure text is not empty and within limits (simplified)
             text = text.replace("\n", " ")
-            response = await self.client.embeddings.create(input=[text], model=model)
+            async with llm_scheduler.slot(model, estimate_tokens(text)):
+                response = await self.client.embeddings.create(
+                    input=[text],
+                    model=model,
+                    timeout=deadline.timeout(settings.LLM_TIMEOUT_SECONDS),
+                )
+            record_usage(model, response.usage)
             embedding = response.data[0].embedding
             logger.info("Successfully generated embedding")
 
-            await redis.setex(
-                cache_key, 86400, json.dumps(embedding)
-            )  # Cache for 24 hours
+            await self.embedding_cache.set(cache_key, embedding)  # Cache for 24 hours
             return embedding
         except APIError as e:
             logger.error(f"OpenAI API error during embedding: {e}")
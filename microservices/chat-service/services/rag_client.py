@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+import httpx
+from core import deadline
+from core.config import settings
+from core.metrics import RAG_BREAKER_STATE, RAG_RETRIES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a sliding time window.
+
+    closed    -> open       when at least min_requests calls were made in the
+                            window and the failure rate reached the threshold
+    open      -> half_open  after open_seconds; a single probe call is let through
+    half_open -> closed     when the probe succeeds (the window is reset)
+    half_open -> open       when the probe fails
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = None,
+        min_requests: int = None,
+        window_seconds: float = None,
+        open_seconds: float = None,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate or settings.RAG_BREAKER_FAILURE_RATE
+        self.min_requests = min_requests or settings.RAG_BREAKER_MIN_REQUESTS
+        self.window_seconds = window_seconds or settings.RAG_BREAKER_WINDOW_SECONDS
+        self.open_seconds = open_seconds or settings.RAG_BREAKER_OPEN_SECONDS
+        self.outcomes = deque()  # (timestamp, succeeded)
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = None  # set while the half-open probe is in flight
+        self._set_state("closed")
+
+    def _set_state(self, state: str):
+        if getattr(self, "state", None) != state:
+            logger.warning(f"Circuit breaker {self.name} is now {state}")
+        self.state = state
+        RAG_BREAKER_STATE.labels(dependency=self.name).set(BREAKER_STATES[state])
+
+    def _trim(self, now: float):
+        while self.outcomes and self.outcomes[0][0] < now - self.window_seconds:
+            _, succeeded = self.outcomes.popleft()
+            if not succeeded:
+                self.failures -= 1
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self._set_state("half_open")
+        # A probe that never reported back (e.g. cancelled) expires after open_seconds
+        now = time.monotonic()
+        if self.probe_started is not None and now - self.probe_started < self.open_seconds:
+            return False
+        self.probe_started = now
+        return True
+
+    def record(self, succeeded: bool):
+        now = time.monotonic()
+        if self.state == "half_open":
+            self.probe_started = None
+            if succeeded:
+                self.outcomes.clear()
+                self.failures = 0
+                self._set_state("closed")
+            else:
+                self.opened_at = now
+                self._set_state("open")
+            return
+
+        self.outcomes.append((now, succeeded))
+        if not succeeded:
+            self.failures += 1
+        self._trim(now)
+        total = len(self.outcomes)
+        if (
+            self.state == "closed"
+            and total >= self.min_requests
+            and self.failures / total >= self.failure_rate
+        ):
+            self.opened_at = now
+            self._set_state("open")
+
+
+class RetryBudget:
+    """
+    Retries are allowed only while they stay under `ratio` of the recent
+    request volume: every request deposits `ratio` tokens, every retry spends
+    one. This keeps retries from multiplying load on a struggling dependency.
+    """
+
+    def __init__(self, ratio: float = None, min_tokens: float = 5.0, max_tokens: float = 50.0):
+        self.ratio = ratio if ratio is not None else settings.RAG_RETRY_BUDGET_RATIO
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class RagClient:
+    """
+    Long-lived HTTP client for rag-service: keep-alive connection pool
+    (HTTP/2 when the endpoint negotiates it), circuit breaker and retry budget.
+    """
+
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url or settings.RAG_SERVICE_URL
+        self.breaker = CircuitBreaker("rag-service")
+        self.retry_budget = RetryBudget()
+        self.client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                timeout=httpx.Timeout(
+                    settings.RAG_TIMEOUT_SECONDS,
+                    connect=settings.RAG_CONNECT_TIMEOUT_SECONDS,
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.RAG_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.RAG_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=30.0,
+                ),
+            )
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return isinstance(error, httpx.TransportError)
+
+    async def search(self, payload: dict, request_id: str = None) -> list:
+        """
+        POST /search. Raises CircuitOpenError without calling rag-service when
+        the breaker is open.
+        """
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                raise CircuitOpenError("rag-service circuit breaker is open")
+            timeout = deadline.timeout(settings.RAG_TIMEOUT_SECONDS)
+            try:
+                resp = await self._get_client().post(
+                    "/search",
+                    json=payload,
+                    headers={"X-Request-ID": request_id or "", **deadline.headers()},
+                    timeout=httpx.Timeout(
+                        timeout,
+                        connect=min(timeout, settings.RAG_CONNECT_TIMEOUT_SECONDS),
+                    ),
+                )
+                resp.raise_for_status()
+                results = resp.json()
+            except Exception as e:
+                retryable = self._is_retryable(e)
+                # Client errors say nothing about the health of rag-service
+                self.breaker.record(succeeded=not retryable)
+                if (
+                    not retryable
+                    or self.breaker.state != "closed"
+                    or attempt >= settings.RAG_MAX_RETRIES
+                    or not deadline.has_budget("rag_retry", settings.RAG_CONNECT_TIMEOUT_SECONDS)
+                    or not self.retry_budget.try_spend()
+                ):
+                    raise
+                attempt += 1
+                RAG_RETRIES_TOTAL.inc()
+                logger.warning(f"Retrying rag-service search after error: {e}")
+                await asyncio.sleep(random.uniform(0.05, 0.15) * attempt)
+                continue
+            self.breaker.record(succeeded=True)
+            return results
+
+
+# Singleton instance
+rag_client = RagClient()
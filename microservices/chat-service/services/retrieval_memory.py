@@ -0,0 +1,68 @@
+import json
+import logging
+
+import redis.asyncio as aioredis
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalMemory:
+    """
+    The retrieval of the last turn that searched the book, per session:
+      chat_retrieval:{session_id}  JSON {"query", "max_score", "chunks"}
+    The chunks are the RAG results the prompt was built from (text, source,
+    page, book_id and score), so a follow-up question on the same topic can
+    be answered from them without another embedding call or Qdrant query.
+    """
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or settings.CHAT_HISTORY_BUFFER_TTL_SECONDS
+        self.redis = None
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    @staticmethod
+    def _key(session_id) -> str:
+        return f"chat_retrieval:{session_id}"
+
+    async def get(self, session_id) -> dict | None:
+        try:
+            redis = await self._get_redis()
+            raw = await redis.get(self._key(session_id))
+        except Exception as e:
+            logger.error(f"Failed to read retrieval memory: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def save(self, session_id, query: str, chunks: list, max_score: float):
+        """
+        Replaces the session's retrieval. A turn that found nothing is saved
+        too, so a later follow-up does not reuse the chunks of an older topic.
+        """
+        payload = {"query": query, "max_score": max_score, "chunks": chunks}
+        try:
+            redis = await self._get_redis()
+            await redis.set(
+                self._key(session_id),
+                json.dumps(payload, ensure_ascii=False),
+                ex=self.ttl,
+            )
+        except Exception as e:
+            logger.error(f"Failed to save retrieval memory: {e}")
+
+    async def clear(self, session_id):
+        try:
+            redis = await self._get_redis()
+            await redis.delete(self._key(session_id))
+        except Exception as e:
+            logger.error(f"Failed to clear retrieval memory: {e}")
+
+
+# Singleton instance
+retrieval_memory = RetrievalMemory()
@@ -0,0 +1,238 @@
+import logging
+import time
+
+import redis.asyncio as aioredis
+from core.config import settings
+from core.metrics import ROLLUP_DRIFT_TOTAL, ROLLUP_READS_TOTAL
+from models.chat import AnswerAuditLog
+from repository import async_chat_repository as chat_repository
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = "rollup:{scope}:{id}"  # HASH of the counters below
+COURSE_STUDENTS_KEY = "rollup:course:{id}:students"  # HyperLogLog of user ids
+RECONCILED_KEY = "rollup:reconciled_at"  # absent until the first reconciliation
+ALL_FACULTIES = "_all"
+
+COUNTERS = ("answers", "confidence_sum", "confidence_n", "correct", "incorrect")
+
+
+def _to_stats(values: dict) -> dict:
+    stats = {field: float(values.get(field, 0)) for field in COUNTERS}
+    return {
+        "answers": int(stats["answers"]),
+        "avg_confidence": (
+            stats["confidence_sum"] / stats["confidence_n"] if stats["confidence_n"] else 0.0
+        ),
+        "correct": int(stats["correct"]),
+        "incorrect": int(stats["incorrect"]),
+    }
+
+
+class Rollups:
+    """
+    AI-quality counters for the teacher dashboards, maintained at write time:
+      rollup:faculty:{faculty_id}   (and rollup:faculty:_all for admins)
+      rollup:student:{user_id}
+      rollup:course:{book_id}       + a HyperLogLog of the course's students
+    Each hash holds answers, confidence_sum, confidence_n, correct and
+    incorrect, so a dashboard read is one HGETALL. Counters are incremented
+    after an audit log is committed and when students give feedback; the
+    reconciliation job (rollup_reconciler.py) rewrites them from the audit
+    log table to fix drift (lost updates, Redis restarts).
+    """
+
+    def __init__(self):
+        self.redis = None
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    @staticmethod
+    def _key(scope: str, id) -> str:
+        return ROLLUP_KEY.format(scope=scope, id=id)
+
+    def _answer_keys(self, faculty_id: str, user_id, book_id) -> list[str]:
+        """The rollups an answer counts in."""
+        keys = [self._key("faculty", ALL_FACULTIES)]
+        if faculty_id:
+            keys.append(self._key("faculty", faculty_id))
+        keys.append(self._key("student", user_id))
+        if book_id:
+            keys.append(self._key("course", book_id))
+        return keys
+
+    async def record_answers(self, turns: list[dict]):
+        """
+        Counts persisted turns (chat_repository.persist_chat_turns rows).
+        """
+        if not turns:
+            return
+        try:
+            redis = await self._get_redis()
+            pipe = redis.pipeline(transaction=False)
+            for turn in turns:
+                keys = self._answer_keys(
+                    turn.get("faculty_id"), turn["user_id"], turn.get("book_id")
+                )
+                if turn.get("book_id"):
+                    pipe.pfadd(
+                        COURSE_STUDENTS_KEY.format(id=turn["book_id"]), str(turn["user_id"])
+                    )
+                score = turn.get("rag_confidence_score")
+                for key in keys:
+                    pipe.hincrby(key, "answers", 1)
+                    if score is not None:
+                        pipe.hincrbyfloat(key, "confidence_sum", score)
+                        pipe.hincrby(key, "confidence_n", 1)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to update answer rollups: {e}")
+
+    async def record_feedback(
+        self, log_entry: AnswerAuditLog, previous: bool | None, is_correct: bool
+    ):
+        """
+        Moves an answer between the correct/incorrect counters of every rollup
+        it counts in when a student gives (or changes) feedback.
+        """
+        correct = int(is_correct is True) - int(previous is True)
+        incorrect = int(is_correct is False) - int(previous is False)
+        if not correct and not incorrect:
+            return
+        try:
+            redis = await self._get_redis()
+            pipe = redis.pipeline(transaction=False)
+            keys = self._answer_keys(
+                log_entry.faculty_id, log_entry.user_id, log_entry.book_id
+            )
+            for key in keys:
+                pipe.hincrby(key, "correct", correct)
+                pipe.hincrby(key, "incorrect", incorrect)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to update feedback rollups: {e}")
+
+    async def _read(self, scope: str, id, *extra) -> tuple | None:
+        """
+        HGETALL of the rollup (plus extra commands), or None when the rollups
+        are unavailable or have not been built yet and the caller must
+        aggregate in the database.
+        """
+        try:
+            redis = await self._get_redis()
+            pipe = redis.pipeline(transaction=False)
+            pipe.exists(RECONCILED_KEY)
+            pipe.hgetall(self._key(scope, id))
+            for command, *args in extra:
+                getattr(pipe, command)(*args)
+            reconciled, values, *rest = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to read {scope} rollup: {e}")
+            reconciled = False
+        if not reconciled:
+            ROLLUP_READS_TOTAL.labels(scope=scope, source="db").inc()
+            return None
+        ROLLUP_READS_TOTAL.labels(scope=scope, source="rollup").inc()
+        return (_to_stats(values), *rest)
+
+    async def get_performance(self, faculty_id: str = None) -> dict | None:
+        read = await self._read("faculty", faculty_id or ALL_FACULTIES)
+        if read is None:
+            return None
+        stats = read[0]
+        return {
+            "avg_confidence": stats["avg_confidence"],
+            "total_answers": stats["answers"],
+            "positive_feedback_rate": (
+                stats["correct"] / stats["answers"] if stats["answers"] else 0.0
+            ),
+        }
+
+    async def get_student_confidence(self, student_id) -> float | None:
+        read = await self._read("student", student_id)
+        return None if read is None else read[0]["avg_confidence"]
+
+    async def get_course_progress(self, course_id: str) -> dict | None:
+        read = await self._read(
+            "course",
+            course_id,
+            ("pfcount", COURSE_STUDENTS_KEY.format(id=course_id)),
+        )
+        if read is None:
+            return None
+        stats, unique_students = read
+        return {
+            "total_interactions": stats["answers"],
+            "avg_confidence": stats["avg_confidence"],
+            "unique_students": unique_students,
+        }
+
+    async def reconcile(self, db: AsyncSession, batch_size: int = 500) -> int:
+        """
+        Rewrites every rollup from the audit log table and returns the number
+        of rollups whose answer count had drifted. Increments landing between
+        the aggregate query and the rewrite can be lost; the next run fixes
+        them.
+        """
+        redis = await self._get_redis()
+        groups = [
+            ("faculty", None),
+            ("faculty", AnswerAuditLog.faculty_id),
+            ("student", AnswerAuditLog.user_id),
+            ("course", AnswerAuditLog.book_id),
+        ]
+        drifted = 0
+        for scope, column in groups:
+            rows = await chat_repository.get_answer_stats(db, column)
+            if column is not None:
+                rows = [row for row in rows if row.key is not None]
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start : start + batch_size]
+                keys = [
+                    self._key(scope, ALL_FACULTIES if column is None else row.key)
+                    for row in batch
+                ]
+                pipe = redis.pipeline(transaction=False)
+                for key in keys:
+                    pipe.hget(key, "answers")
+                current = await pipe.execute()
+                pipe = redis.pipeline(transaction=False)
+                for key, row, answers in zip(keys, batch, current):
+                    if int(answers or 0) != row.answers:
+                        drifted += 1
+                        ROLLUP_DRIFT_TOTAL.labels(scope=scope).inc()
+                    pipe.hset(
+                        key,
+                        mapping={
+                            "answers": row.answers,
+                            "confidence_sum": float(row.confidence_sum or 0),
+                            "confidence_n": row.confidence_n,
+                            "correct": row.correct,
+                            "incorrect": row.incorrect,
+                        },
+                    )
+                await pipe.execute()
+
+        students = {}
+        for book_id, user_id in await chat_repository.get_course_students(db):
+            students.setdefault(book_id, []).append(str(user_id))
+        for book_id, user_ids in students.items():
+            key = COURSE_STUDENTS_KEY.format(id=book_id)
+            pipe = redis.pipeline()
+            pipe.delete(key)
+            for start in range(0, len(user_ids), batch_size):
+                pipe.pfadd(key, *user_ids[start : start + batch_size])
+            await pipe.execute()
+
+        await redis.set(RECONCILED_KEY, int(time.time()))
+        return drifted
+
+
+# Singleton instance
+rollups = Rollups()
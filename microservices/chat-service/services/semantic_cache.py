@@ -0,0 +1,208 @@
+import logging
+import time
+from uuid import uuid4
+
+import numpy as np
+import redis.asyncio as aioredis
+from core.config import settings
+from core.metrics import SEMANTIC_CACHE_LOOKUPS_TOTAL, SEMANTIC_CACHE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by question embeddings, scoped per (faculty, semester).
+
+    Each scope is a small vector index kept in Redis:
+      {prefix}:{faculty}:{semester}:vecs      HASH  entry_id -> float16 unit vector
+      {prefix}:{faculty}:{semester}:lru       ZSET  entry_id -> last access time
+      {prefix}:{faculty}:{semester}:ans:{id}  STRING payload (expires after ttl)
+      {prefix}:{faculty}:{semester}:ver       INCR on every insert/eviction
+    Every process mirrors a scope's vectors as a NumPy matrix and reloads it only
+    when the scope version changed, so a lookup costs one GET plus a dot product.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "sem_cache",
+        threshold: float = None,
+        near_miss_margin: float = None,
+        max_entries: int = None,
+        ttl: int = None,
+        refresh_interval: float = 5.0,
+        metric_label: str = "answer",
+    ):
+        self.prefix = prefix
+        self.threshold = threshold or settings.SEMANTIC_CACHE_THRESHOLD
+        self.near_miss_margin = (
+            near_miss_margin
+            if near_miss_margin is not None
+            else settings.SEMANTIC_CACHE_NEAR_MISS_MARGIN
+        )
+        self.max_entries = max_entries or settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else settings.SEMANTIC_CACHE_TTL_SECONDS
+        self.refresh_interval = refresh_interval
+        self.metric_label = metric_label
+        self.redis = None
+        # scope -> (version, loaded_at, ids, matrix)
+        self._mirrors = {}
+
+    async def _get_redis(self):
+        if self.redis is None:
+            # Vectors are stored as raw bytes, so responses must not be decoded
+            self.redis = await aioredis.from_url(settings.REDIS_URL)
+        return self.redis
+
+    def _scope_key(self, faculty: str, semester: str) -> str:
+        return f"{self.prefix}:{faculty}:{semester}"
+
+    @staticmethod
+    def _to_unit_vector(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def _load_scope(self, scope: str):
+        redis = await self._get_redis()
+        version = await redis.get(f"{scope}:ver")
+        version = int(version or 0)
+        mirror = self._mirrors.get(scope)
+        now = time.monotonic()
+        if mirror and (
+            mirror[0] == version or now - mirror[1] < self.refresh_interval
+        ):
+            return mirror
+
+        raw = await redis.hgetall(f"{scope}:vecs")
+        ids = [key.decode() for key in raw]
+        if ids:
+            matrix = np.vstack(
+                [np.frombuffer(value, dtype=np.float16) for value in raw.values()]
+            ).astype(np.float32)
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        mirror = (version, now, ids, matrix)
+        self._mirrors[scope] = mirror
+        return mirror
+
+    async def _purge_expired(self, scope: str):
+        if not self.ttl:
+            return
+        redis = await self._get_redis()
+        expired = await redis.zrangebyscore(f"{scope}:lru", 0, time.time() - self.ttl)
+        if expired:
+            await self._remove_entries(scope, [e.decode() for e in expired])
+
+    async def _remove_entries(self, scope: str, entry_ids: list[str]):
+        redis = await self._get_redis()
+        pipe = redis.pipeline()
+        pipe.hdel(f"{scope}:vecs", *entry_ids)
+        pipe.zrem(f"{scope}:lru", *entry_ids)
+        pipe.delete(*[f"{scope}:ans:{entry_id}" for entry_id in entry_ids])
+        pipe.incr(f"{scope}:ver")
+        await pipe.execute()
+
+    async def search(self, faculty: str, semester: str, embedding) -> tuple:
+        """
+        Returns (entry_id, similarity) of the closest entry in the scope,
+        or (None, 0.0) when the scope is empty.
+        """
+        scope = self._scope_key(faculty, semester)
+        _, _, ids, matrix = await self._load_scope(scope)
+        if not ids:
+            return None, 0.0
+        query = self._to_unit_vector(embedding)
+        if matrix.shape[1] != query.shape[0]:
+            return None, 0.0
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        return ids[best], float(similarities[best])
+
+    async def lookup(self, faculty: str, semester: str, embedding) -> str | None:
+        """
+        Returns the stored payload of the most similar previously answered
+        question when its cosine similarity passes the threshold.
+        """
+        scope = self._scope_key(faculty, semester)
+        try:
+            await self._purge_expired(scope)
+            entry_id, similarity = await self.search(faculty, semester, embedding)
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {e}")
+            return None
+
+        if entry_id is None:
+            SEMANTIC_CACHE_LOOKUPS_TOTAL.labels(
+                cache=self.metric_label, result="miss"
+            ).inc()
+            return None
+
+        SEMANTIC_CACHE_SIMILARITY.labels(cache=self.metric_label).observe(similarity)
+        if similarity < self.threshold:
+            result = (
+                "near_miss"
+                if similarity >= self.threshold - self.near_miss_margin
+                else "miss"
+            )
+            SEMANTIC_CACHE_LOOKUPS_TOTAL.labels(
+                cache=self.metric_label, result=result
+            ).inc()
+            return None
+
+        redis = await self._get_redis()
+        pipe = redis.pipeline()
+        pipe.get(f"{scope}:ans:{entry_id}")
+        pipe.zadd(f"{scope}:lru", {entry_id: time.time()})
+        payload, _ = await pipe.execute()
+        if payload is None:
+            # Payload expired before the index entry was purged
+            await self._remove_entries(scope, [entry_id])
+            SEMANTIC_CACHE_LOOKUPS_TOTAL.labels(
+                cache=self.metric_label, result="miss"
+            ).inc()
+            return None
+
+        SEMANTIC_CACHE_LOOKUPS_TOTAL.labels(cache=self.metric_label, result="hit").inc()
+        return payload.decode()
+
+    async def store(
+        self,
+        faculty: str,
+        semester: str,
+        embedding,
+        payload: str,
+        entry_id: str = None,
+    ) -> str:
+        """
+        Adds an answered question to the scope index, evicting the least
+        recently used entries beyond the per-scope size cap.
+        """
+        scope = self._scope_key(faculty, semester)
+        entry_id = entry_id or uuid4().hex
+        vector = self._to_unit_vector(embedding).astype(np.float16)
+
+        redis = await self._get_redis()
+        pipe = redis.pipeline()
+        pipe.hset(f"{scope}:vecs", entry_id, vector.tobytes())
+        pipe.zadd(f"{scope}:lru", {entry_id: time.time()})
+        if self.ttl:
+            pipe.setex(f"{scope}:ans:{entry_id}", self.ttl, payload)
+        else:
+            pipe.set(f"{scope}:ans:{entry_id}", payload)
+        pipe.incr(f"{scope}:ver")
+        pipe.zcard(f"{scope}:lru")
+        *_, size = await pipe.execute()
+
+        excess = size - self.max_entries
+        if excess > 0:
+            evicted = await redis.zpopmin(f"{scope}:lru", excess)
+            await self._remove_entries(scope, [e.decode() for e, _ in evicted])
+        return entry_id
+
+    async def remove(self, faculty: str, semester: str, entry_id: str):
+        await self._remove_entries(self._scope_key(faculty, semester), [entry_id])
+
+
+# Singleton instance
+semantic_cache = SemanticCache()
@@ -0,0 +1,90 @@
+import json
+import re
+
+# Answer schema enforced by the teacher prompt, in order
+SECTION_HEADINGS = ["التعريف", "الشرح", "مثال", "ملخص"]
+
+_HEADING_PATTERN = re.compile(
+    r"\n[\s*#\-]*(" + "|".join(SECTION_HEADINGS) + r")[\s*]*[:：]"
+)
+_MAX_HEADING_LEN = max(len(h) for h in SECTION_HEADINGS) + 8
+
+
+def sse_event(event: str, data: dict) -> str:
+    """
+    Formats a single Server-Sent-Event frame.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def split_sections(text: str) -> list[tuple[str | None, str]]:
+    """
+    Splits a complete answer into (section, text) pairs.
+    Text before the first heading is returned with section None.
+    """
+    text = "\n" + text
+    parts = []
+    section = None
+    pos = 0
+    for match in _HEADING_PATTERN.finditer(text):
+        parts.append((section, text[pos : match.start()]))
+        section = match.group(1)
+        pos = match.end()
+    parts.append((section, text[pos:]))
+    return [(s, t.strip()) for s, t in parts if t.strip()]
+
+
+class SectionStreamParser:
+    """
+    Incrementally detects section headings in a token stream.
+    A heading can be split across tokens, so the tail of the buffer that may
+    still grow into a heading is held back until the next token arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.section = None
+        self.line_start = True
+        self.section_start = False
+
+    def _emit_text(self, text: str) -> list[tuple[str, dict]]:
+        if self.section_start:
+            text = text.lstrip(" ")
+        if not text:
+            return []
+        self.section_start = False
+        return [("delta", {"section": self.section, "text": text})]
+
+    def feed(self, token: str) -> list[tuple[str, dict]]:
+        self.buffer += token
+        events = []
+        while True:
+            # Headings only count at the start of a line
+            offset = 1 if self.line_start else 0
+            match = _HEADING_PATTERN.search("\n" * offset + self.buffer)
+            if not match:
+                break
+            events += self._emit_text(self.buffer[: max(match.start() - offset, 0)])
+            self.section = match.group(1)
+            self.section_start = True
+            events.append(("section", {"section": self.section}))
+            self.buffer = self.buffer[match.end() - offset :]
+            self.line_start = False
+
+        # Hold back a possible partial heading after the last line break
+        cut = self.buffer.rfind("\n")
+        if cut == -1 and self.line_start:
+            cut = 0
+        if cut != -1 and len(self.buffer) - cut <= _MAX_HEADING_LEN:
+            events += self._emit_text(self.buffer[:cut])
+            self.buffer = self.buffer[cut:]
+        elif self.buffer:
+            events += self._emit_text(self.buffer)
+            self.line_start = self.buffer.endswith("\n")
+            self.buffer = ""
+        return events
+
+    def flush(self) -> list[tuple[str, dict]]:
+        events = self._emit_text(self.buffer)
+        self.buffer = ""
+        return events
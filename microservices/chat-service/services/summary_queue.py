@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from uuid import UUID
+
+import redis.asyncio as aioredis
+from core.config import settings
+from core.llm_scheduler import set_priority
+from core.metrics import (
+    SUMMARY_EVENTS_TOTAL,
+    SUMMARY_TURNS_PER_UPDATE,
+    SUMMARY_UPDATES_TOTAL,
+)
+from db.session import AsyncSessionLocal
+from repository import async_chat_repository as chat_repository
+from services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "learning_summary:events"
+GROUP = "summary-workers"
+PENDING_KEY = "learning_summary:pending:{session_id}"  # LIST of history deltas
+ACTIVE_KEY = "learning_summary:active"  # ZSET session_id -> last event time
+LOCK_KEY = "learning_summary:lock:{session_id}"
+
+# Releases the lock only if it is still ours
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+async def _redis():
+    return await aioredis.from_url(
+        settings.REDIS_URL, encoding="utf-8", decode_responses=True
+    )
+
+
+class SummaryQueue:
+    """
+    Producer side: the API publishes each turn's history delta to a Redis
+    stream instead of summarizing on the request process.
+    """
+
+    def __init__(self):
+        self.redis = None
+
+    async def enqueue(self, session_id, history_delta: str):
+        try:
+            if self.redis is None:
+                self.redis = await _redis()
+            await self.redis.xadd(
+                STREAM_KEY,
+                {"session_id": str(session_id), "delta": history_delta},
+                maxlen=settings.SUMMARY_STREAM_MAXLEN,
+                approximate=True,
+            )
+        except Exception as e:
+            logger.error(f"Failed to enqueue learning summary update: {e}")
+
+
+class SummaryWorker:
+    """
+    Consumer side (summary_worker.py). Stream events are moved to a per-session
+    pending list and acknowledged; a session is summarized once it has
+    SUMMARY_EVERY_N_TURNS pending turns or has been idle for
+    SUMMARY_IDLE_SECONDS. All pending turns go into a single LLM call, and a
+    per-session lock coalesces concurrent triggers across worker replicas.
+    """
+
+    def __init__(self, every_n_turns: int = None, idle_seconds: float = None):
+        self.every_n_turns = every_n_turns or settings.SUMMARY_EVERY_N_TURNS
+        self.idle_seconds = idle_seconds or settings.SUMMARY_IDLE_SECONDS
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.redis = None
+        self.running = True
+        self.semaphore = asyncio.Semaphore(settings.SUMMARY_WORKER_CONCURRENCY)
+
+    async def setup(self):
+        self.redis = await _redis()
+        try:
+            await self.redis.xgroup_create(STREAM_KEY, GROUP, id="0", mkstream=True)
+        except aioredis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run(self):
+        await self.setup()
+        logger.info(f"Learning summary worker {self.consumer} started")
+        # Entries delivered to us before a restart and never acknowledged
+        await self._consume(await self._read("0"))
+        last_scan = 0.0
+        while self.running:
+            try:
+                await self._consume(await self._read(">"))
+                if time.monotonic() - last_scan >= min(self.idle_seconds, 30):
+                    last_scan = time.monotonic()
+                    await self._claim_abandoned()
+                    await self.flush_idle()
+            except Exception as e:
+                logger.error(f"Learning summary worker iteration failed: {e}")
+                await asyncio.sleep(1)
+
+    async def _read(self, stream_id: str) -> list:
+        response = await self.redis.xreadgroup(
+            GROUP, self.consumer, {STREAM_KEY: stream_id}, count=100, block=1000
+        )
+        return response[0][1] if response else []
+
+    async def _claim_abandoned(self):
+        """
+        Takes over entries read by a worker that died before acknowledging them.
+        """
+        _, entries, *_ = await self.redis.xautoclaim(
+            STREAM_KEY, GROUP, self.consumer, min_idle_time=60000, count=100
+        )
+        await self._consume(entries)
+
+    async def _consume(self, entries: list):
+        due = set()
+        for entry_id, fields in entries:
+            session_id = fields["session_id"]
+            pending_key = PENDING_KEY.format(session_id=session_id)
+            pipe = self.redis.pipeline()
+            pipe.rpush(pending_key, fields["delta"])
+            pipe.zadd(ACTIVE_KEY, {session_id: time.time()})
+            pipe.xack(STREAM_KEY, GROUP, entry_id)
+            pending, *_ = await pipe.execute()
+            SUMMARY_EVENTS_TOTAL.inc()
+            if pending >= self.every_n_turns:
+                due.add(session_id)
+        await asyncio.gather(*(self.summarize(s, trigger="turns") for s in due))
+
+    async def flush_idle(self):
+        idle = await self.redis.zrangebyscore(
+            ACTIVE_KEY, 0, time.time() - self.idle_seconds
+        )
+        await asyncio.gather(*(self.summarize(s, trigger="idle") for s in idle))
+
+    async def summarize(self, session_id: str, trigger: str):
+        async with self.semaphore:
+            await self._summarize(session_id, trigger)
+
+    async def _summarize(self, session_id: str, trigger: str):
+        lock_key = LOCK_KEY.format(session_id=session_id)
+        token = self.consumer
+        # Another worker is already summarizing this session: its run picks up
+        # our turns or the next trigger will
+        if not await self.redis.set(lock_key, token, nx=True, ex=120):
+            return
+        try:
+            pending_key = PENDING_KEY.format(session_id=session_id)
+            deltas = await self.redis.lrange(pending_key, 0, -1)
+            if deltas:
+                await self._update_summary(session_id, deltas)
+                SUMMARY_UPDATES_TOTAL.labels(trigger=trigger).inc()
+                SUMMARY_TURNS_PER_UPDATE.observe(len(deltas))
+            pipe = self.redis.pipeline()
+            pipe.ltrim(pending_key, len(deltas), -1)
+            pipe.llen(pending_key)
+            _, remaining = await pipe.execute()
+            if not remaining:
+                await self.redis.zrem(ACTIVE_KEY, session_id)
+        except Exception as e:
+            logger.error(f"Failed to update learning summary for session {session_id}: {e}")
+        finally:
+            await self.redis.eval(RELEASE_LOCK, 1, lock_key, token)
+
+    @staticmethod
+    async def _update_summary(session_id: str, deltas: list[str]):
+        async with AsyncSessionLocal() as db:
+            chat_session = await chat_repository.get_chat_session(db, UUID(session_id))
+            if not chat_session:
+                return
+            current_summary = (
+                chat_session.learning_summary
+                or await chat_repository.get_latest_learning_summary(
+                    db, chat_session.user_id, chat_session.collection_name
+                )
+            )
+            await db.commit()  # do not hold the connection during the LLM call
+            set_priority("background", chat_session.faculty_id, str(chat_session.user_id))
+            updated_summary = await llm_service.summarize_learning_state(
+                current_summary or "", "\n".join(deltas)
+            )
+            await chat_repository.update_session_summary(
+                db, chat_session.id, updated_summary
+            )
+
+
+# Singleton instance
+summary_queue = SummaryQueue()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from uuid import UUID, uuid4
+
+from core.config import settings
+from core.metrics import TURN_FLUSH_BATCH_SIZE, TURN_FLUSH_LATENCY, TURN_WRITE_QUEUE_DEPTH
+from db.session import AsyncSessionLocal
+from repository import async_chat_repository as chat_repository
+from services.rollups import rollups
+
+logger = logging.getLogger(__name__)
+
+
+class TurnWriter:
+    """
+    Persists chat turns (user message, assistant message, answer audit log).
+
+    In write-behind mode turns are queued with a pre-generated audit log id
+    and a background task flushes them in batches, one transaction per batch,
+    using its own async database session. When write-behind is off or the queue is
+    full the caller writes the turn on the request path instead, so memory
+    stays bounded under load.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_queue: int = None,
+    ):
+        self.enabled = (
+            enabled if enabled is not None else settings.CHAT_WRITE_BEHIND_ENABLED
+        )
+        self.batch_size = batch_size or settings.CHAT_WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = (
+            flush_interval or settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL_MS / 1000
+        )
+        self.max_queue = max_queue or settings.CHAT_WRITE_BEHIND_MAX_QUEUE
+        self.queue = None
+        self.task = None
+
+    async def start(self):
+        if not self.enabled or self.task is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.task = asyncio.create_task(self._run())
+        logger.info("Chat turn write-behind worker started")
+
+    async def stop(self):
+        """
+        Stops the worker after flushing every queued turn.
+        """
+        if self.task is None:
+            return
+        task, self.task = self.task, None
+        await self.queue.put(None)
+        await task
+
+    def enqueue(self, turn: dict) -> UUID | None:
+        """
+        Queues a turn for the write-behind worker and returns its audit log id,
+        or None when write-behind is off or the queue is full and the caller
+        must persist the turn itself.
+        """
+        if self.task is None:
+            return None
+        turn = {**turn, "audit_log_id": turn.get("audit_log_id") or uuid4()}
+        try:
+            self.queue.put_nowait(turn)
+        except asyncio.QueueFull:
+            logger.warning("Chat turn write-behind queue full, writing synchronously")
+            return None
+        TURN_WRITE_QUEUE_DEPTH.set(self.queue.qsize())
+        return turn["audit_log_id"]
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            turn = await self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while turn is not None:
+                batch.append(turn)
+                timeout = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    turn = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            # None is the stop sentinel queued by stop()
+            stopping = turn is None
+            TURN_WRITE_QUEUE_DEPTH.set(self.queue.qsize())
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list[dict]):
+        TURN_FLUSH_BATCH_SIZE.observe(len(batch))
+        async with AsyncSessionLocal() as db:
+            try:
+                with TURN_FLUSH_LATENCY.labels(mode="write_behind").time():
+                    await chat_repository.persist_chat_turns(db, batch)
+                persisted = batch
+            except Exception as e:
+                logger.error(f"Batch flush of {len(batch)} chat turns failed: {e}")
+                # Retry turn by turn so one bad row does not lose the whole batch
+                persisted = []
+                for turn in batch:
+                    try:
+                        await chat_repository.persist_chat_turn(db, **turn)
+                        persisted.append(turn)
+                    except Exception as e:
+                        logger.error(
+                            f"Failed to persist chat turn for session {turn['session_id']}: {e}"
+                        )
+        await rollups.record_answers(persisted)
+
+
+# Singleton instance
+turn_writer = TurnWriter()
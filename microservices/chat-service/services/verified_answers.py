@@ -0,0 +1,139 @@
+import json
+import logging
+from uuid import UUID
+
+from core.config import settings
+from core.metrics import VERIFIED_ANSWERS_SERVED_TOTAL
+from rag.normalize import normalize_question
+from repository import async_chat_repository as chat_repository
+from services.llm_service import llm_service
+from services.semantic_cache import SemanticCache
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedAnswerLibrary(SemanticCache):
+    """
+    Answers approved by teachers (verified_by_teacher), per (faculty, semester)
+    scope, served before the answer cache and any LLM call. On top of the
+    semantic index of SemanticCache (entry id = audit log id, no expiry):
+      verified_answers:{faculty}:{semester}:text  HASH normalized question -> entry id
+    The library follows the teacher verify/reject endpoints (refresh) and can
+    be rebuilt from answer_audit_logs (scripts/build_verified_answers.py).
+    """
+
+    def __init__(self):
+        super().__init__(
+            prefix="verified_answers",
+            threshold=settings.VERIFIED_ANSWERS_THRESHOLD,
+            near_miss_margin=0.0,
+            max_entries=settings.VERIFIED_ANSWERS_MAX_ENTRIES,
+            ttl=0,
+            metric_label="verified",
+        )
+
+    @staticmethod
+    def _payload(log_entry) -> str:
+        try:
+            source = json.loads(log_entry.source_reference or "{}")
+        except ValueError:
+            source = {}
+        return json.dumps(
+            {
+                "answer": log_entry.ai_answer,
+                "source": source or {"book": "N/A", "page": "N/A"},
+                "intent": "VERIFIED",
+                "mode": "UNDERSTANDING",
+                "rag_score": log_entry.rag_confidence_score or 0.0,
+                "book_id": log_entry.book_id,
+                "verified_answer_id": str(log_entry.id),
+            },
+            ensure_ascii=False,
+        )
+
+    async def add(self, faculty: str, semester: str, log_entry):
+        scope = self._scope_key(faculty, semester)
+        entry_id = str(log_entry.id)
+        payload = self._payload(log_entry)
+        redis = await self._get_redis()
+        pipe = redis.pipeline()
+        pipe.set(f"{scope}:ans:{entry_id}", payload)
+        pipe.hset(f"{scope}:text", normalize_question(log_entry.question_text), entry_id)
+        await pipe.execute()
+        try:
+            embedding = await llm_service.get_embedding(log_entry.question_text)
+        except Exception as e:
+            # Still served on exact (normalized) matches
+            logger.error(f"Verified answer embedding failed: {e}")
+            return
+        await self.store(faculty, semester, embedding, payload, entry_id=entry_id)
+
+    async def discard(self, faculty: str, semester: str, log_entry):
+        scope = self._scope_key(faculty, semester)
+        entry_id = str(log_entry.id)
+        text_key = normalize_question(log_entry.question_text)
+        redis = await self._get_redis()
+        current = await redis.hget(f"{scope}:text", text_key)
+        if current is not None and current.decode() == entry_id:
+            await redis.hdel(f"{scope}:text", text_key)
+        await self.remove(faculty, semester, entry_id)
+
+    async def refresh(self, db: AsyncSession, log_id: UUID):
+        """
+        Adds or removes one answer after a teacher verified or rejected it.
+        """
+        try:
+            row = await chat_repository.get_verified_answer(db, log_id)
+            if row is None:
+                return
+            log_entry, faculty, semester = row
+            if log_entry.verified_by_teacher:
+                await self.add(faculty, semester, log_entry)
+            else:
+                await self.discard(faculty, semester, log_entry)
+        except Exception as e:
+            logger.error(f"Failed to refresh verified answer {log_id}: {e}")
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """
+        Rewrites the library from every teacher-verified audit log. Returns
+        the number of answers indexed.
+        """
+        redis = await self._get_redis()
+        async for key in redis.scan_iter(match=f"{self.prefix}:*"):
+            await redis.delete(key)
+        self._mirrors.clear()
+        rows = await chat_repository.get_verified_answers(db)
+        for log_entry, faculty, semester in rows:
+            await self.add(faculty, semester, log_entry)
+        return len(rows)
+
+    async def lookup_text(self, faculty: str, semester: str, question: str) -> str | None:
+        """
+        Payload of the verified answer to the same normalized question.
+        """
+        scope = self._scope_key(faculty, semester)
+        try:
+            redis = await self._get_redis()
+            entry_id = await redis.hget(f"{scope}:text", normalize_question(question))
+            payload = (
+                await redis.get(f"{scope}:ans:{entry_id.decode()}") if entry_id else None
+            )
+        except Exception as e:
+            logger.error(f"Verified answer lookup failed: {e}")
+            return None
+        if payload is None:
+            return None
+        VERIFIED_ANSWERS_SERVED_TOTAL.labels(match="text").inc()
+        return payload.decode()
+
+    async def lookup(self, faculty: str, semester: str, embedding) -> str | None:
+        payload = await super().lookup(faculty, semester, embedding)
+        if payload is not None:
+            VERIFIED_ANSWERS_SERVED_TOTAL.labels(match="semantic").inc()
+        return payload
+
+
+# Singleton instance
+verified_answers = VerifiedAnswerLibrary()
@@ -0,0 +1,30 @@
+"""
+Learning summary worker: consumes the learning_summary:events Redis stream
+published by the chat API and updates ChatSession.learning_summary in batches.
+
+    python summary_worker.py
+"""
+
+import asyncio
+import signal
+
+from core.config import settings
+from core.observability import setup_logging
+from prometheus_client import start_http_server
+from services.summary_queue import SummaryWorker
+
+logger = setup_logging("chat-summary-worker")
+
+
+async def main():
+    worker = SummaryWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: setattr(worker, "running", False))
+    await worker.run()
+
+
+if __name__ == "__main__":
+    if settings.SUMMARY_WORKER_METRICS_PORT:
+        start_http_server(settings.SUMMARY_WORKER_METRICS_PORT)
+    asyncio.run(main())
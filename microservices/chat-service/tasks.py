@@ -0,0 +1,86 @@
+import asyncio
+import logging
+
+from api.chat import ChatRequest, run_chat_turn
+from core.celery_app import celery_app
+from core.config import settings
+from db.session import AsyncSessionLocal
+from fastapi.encoders import jsonable_encoder
+from services.chat_jobs import chat_jobs
+
+logger = logging.getLogger(__name__)
+
+# One loop per worker process: the service singletons keep Redis connections
+# bound to the loop that opened them
+_loop = asyncio.new_event_loop()
+
+
+async def _finish(job_id: str, **result) -> bool:
+    """
+    Settles the job, retrying Redis errors: a job left pending is only
+    answered by its TTL.
+    """
+    for attempt in range(1, settings.CHAT_JOB_FINISH_ATTEMPTS + 1):
+        try:
+            await chat_jobs.finish(job_id, **result)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to settle chat job {job_id} (attempt {attempt}): {e}")
+            if attempt < settings.CHAT_JOB_FINISH_ATTEMPTS:
+                await asyncio.sleep(0.5 * attempt)
+    return False
+
+
+async def _answer(
+    job_id: str,
+    user_id: str,
+    session_id: str,
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str,
+):
+    request = ChatRequest(
+        message=user_message,
+        session_id=session_id,
+        collection_name=collection_name,
+        faculty_id=faculty_id,
+        semester_id=semester_id,
+    )
+    try:
+        async with AsyncSessionLocal() as db:
+            response = await run_chat_turn(
+                db, request, user_id, faculty_id, semester_id, request_id
+            )
+    except Exception as e:
+        logger.error(f"Chat job {job_id} failed: {e}")
+        await _finish(job_id, detail="عذراً، حدث خطأ في معالجة طلبك. يرجى المحاولة مرة أخرى.")
+        return
+    if await _finish(job_id, response=jsonable_encoder(response)):
+        await chat_jobs.notify(user_id)
+
+
+@celery_app.task(name="tasks.answer_chat_task")
+def answer_chat_task(
+    job_id: str,
+    user_id: str,
+    session_id: str,
+    user_message: str,
+    collection_name: str,
+    faculty_id: str,
+    semester_id: str,
+    request_id: str,
+):
+    _loop.run_until_complete(
+        _answer(
+            job_id,
+            user_id,
+            session_id,
+            user_message,
+            collection_name,
+            faculty_id,
+            semester_id,
+            request_id,
+        )
+    )
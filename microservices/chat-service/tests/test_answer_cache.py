@@ -0,0 +1,59 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core import cache as cache_module
+from core.cache import TwoTierCache
+from rag.normalize import normalize_question
+from services import chat_service
+from services.llm_service import llm_service
+
+QUESTION = "ما هو التحليل العددي؟"
+VARIANTS = [
+    "ما هُوَ التَّحْلِيلُ العَدَدِيُّ؟",  # diacritics
+    "ما هو   التحليل العددي",  # whitespace, no question mark
+    "ما هو التحليل العددي ؟!",  # punctuation
+    "ما هو التحـــليل العددي؟",  # tatweel
+]
+ANSWER = json.dumps(
+    {"answer": "التعريف: التحليل العددي فرع من الرياضيات يهتم بالحلول التقريبية."},
+    ensure_ascii=False,
+)
+
+
+def test_question_variants_share_the_normalized_cache_key():
+    key = llm_service._answer_cache_key("eng", "1", normalize_question(QUESTION))
+    for variant in VARIANTS:
+        assert llm_service._answer_cache_key("eng", "1", normalize_question(variant)) == key
+    # Alef forms and taa marbuta fold as well
+    assert normalize_question("إحصاء أسئلة المرحلة") == normalize_question("احصاء اسئله المرحله")
+
+
+def test_question_variant_is_served_from_the_answer_cache():
+    redis = MagicMock()
+    redis.set = AsyncMock()
+    redis.mget = AsyncMock(side_effect=lambda keys: [None] * len(keys))
+    library = AsyncMock()
+    library.lookup_text.return_value = None
+    with patch.object(cache_module, "get_redis", AsyncMock(return_value=redis)), \
+         patch.object(llm_service, "answer_cache", TwoTierCache("ans_cache_test", ttl=60)), \
+         patch.object(llm_service, "get_embedding", AsyncMock()) as embed, \
+         patch.object(chat_service, "verified_answers", library), \
+         patch.object(chat_service, "chat_repository", new_callable=AsyncMock), \
+         patch.object(chat_service, "_plan_generation", new_callable=AsyncMock) as plan:
+
+        async def run():
+            await llm_service.cache_response("eng", "1", QUESTION, ANSWER)
+            return [
+                await chat_service._prepare_turn(
+                    AsyncMock(), "u1", None, variant, "c", "eng", "1"
+                )
+                for variant in VARIANTS
+            ]
+
+        turns = asyncio.run(run())
+
+    plan.assert_not_called()
+    embed.assert_not_called()
+    assert all(turn["stages"]["answer_cache"] == "hit" for turn in turns)
+    assert all(turn["answer"] == json.loads(ANSWER)["answer"] for turn in turns)
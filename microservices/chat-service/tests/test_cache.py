@@ -0,0 +1,72 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+from core.cache import LocalLRU, TwoTierCache, decode, encode
+
+
+def test_vectors_round_trip_as_compact_bytes():
+    vector = np.random.default_rng(0).standard_normal(1536).tolist()
+    raw = encode(vector, vector_dtype="float32")
+    assert len(raw) == 1 + 1536 * 4
+    assert len(raw) < len(json.dumps(vector)) / 4
+    assert np.allclose(decode(raw), vector, atol=1e-6)
+    assert len(encode(vector, vector_dtype="float16")) == 1 + 1536 * 2
+
+
+def test_large_documents_are_compressed():
+    answer = json.dumps({"answer": "التعريف: التحليل العددي فرع من الرياضيات. " * 50})
+    raw = encode(answer, compress_min_bytes=1024)
+    assert len(raw) < len(answer.encode()) / 4
+    assert decode(raw) == answer
+    assert decode(encode({"intent": "DEFINITION"}, compress_min_bytes=1024)) == {
+        "intent": "DEFINITION"
+    }
+
+
+def test_values_written_before_the_binary_encoding_are_readable():
+    assert decode(b'{"intent": "EXAMPLE"}') == {"intent": "EXAMPLE"}
+    assert decode("نص".encode(), legacy_decoder=bytes.decode) == "نص"
+
+
+def test_local_lru_evicts_least_recently_used_and_expired():
+    lru = LocalLRU(max_entries=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+    lru.set("d", 4, ttl=-1)
+    assert lru.get("d") is None
+
+
+def test_two_tier_lookup_reads_redis_once_then_serves_locally():
+    redis = AsyncMock()
+    redis.mget.return_value = [None, encode({"intent": "EXAMPLE"})]
+    cache = TwoTierCache("intent", ttl=3600, local_max_entries=10)
+
+    async def run():
+        first = await cache.get_first("exact", "normalized")
+        second = await cache.get("normalized")
+        return first, second
+
+    with patch("core.cache.get_redis", AsyncMock(return_value=redis)):
+        first, second = asyncio.run(run())
+
+    assert first == second == {"intent": "EXAMPLE"}
+    redis.mget.assert_awaited_once_with(["intent:exact", "intent:normalized"])
+
+
+def test_redis_errors_are_treated_as_misses():
+    redis = AsyncMock()
+    redis.mget.side_effect = ConnectionError("redis down")
+    redis.set.side_effect = ConnectionError("redis down")
+    cache = TwoTierCache("rag_cache", ttl=60, local_max_entries=0)
+
+    async def run():
+        await cache.set("k", [{"text": "x"}])
+        return await cache.get("k")
+
+    with patch("core.cache.get_redis", AsyncMock(return_value=redis)):
+        assert asyncio.run(run()) is None
@@ -0,0 +1,57 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+from services.llm_service import HALLUCINATION_MESSAGE, llm_service
+
+ANSWER = json.dumps(
+    {"answer": "التعريف: التحليل العددي فرع من الرياضيات.", "source": {"book": "b", "page": 1}}
+)
+
+
+def _generate(replies, verdicts=None):
+    completion = AsyncMock(side_effect=replies)
+    verify = AsyncMock(
+        side_effect=verdicts or [{"grounded": True, "score": 0.9, "source": "local"}] * 2
+    )
+    with patch.object(llm_service, "get_chat_completion", completion), \
+         patch.object(llm_service, "verify_groundedness", verify):
+        result = asyncio.run(
+            llm_service.get_chat_completion_with_validation(
+                [{"role": "user", "content": "ما هو التحليل العددي؟"}],
+                context="السياق",
+                route=llm_service.choose_route("DEFINITION", "UNDERSTANDING", 0.92, 400),
+            )
+        )
+    return result, [c.kwargs["model"] for c in completion.await_args_list]
+
+
+def test_routing_policy():
+    assert llm_service.choose_route("DEFINITION", "UNDERSTANDING", 0.92, 400) == "small"
+    assert llm_service.choose_route("DEFINITION", "UNDERSTANDING", 0.7, 400) == "large"
+    assert llm_service.choose_route("DEFINITION", "EXAM", 0.92, 400) == "large"
+    assert llm_service.choose_route("EXAMPLE", "UNDERSTANDING", 0.92, 400) == "large"
+    assert llm_service.choose_route("DEFINITION", "UNDERSTANDING", 0.92, 5000) == "large"
+
+
+def test_small_model_answer_is_accepted():
+    result, models = _generate([ANSWER])
+    assert models == ["gpt-4o-mini"]
+    assert result["model"] == "gpt-4o-mini"
+    assert result["escalation"] is None
+
+
+def test_invalid_json_escalates_to_the_large_model():
+    result, models = _generate(["not json", ANSWER])
+    assert models == ["gpt-4o-mini", "gpt-4o"]
+    assert result["escalation"] == "json"
+    assert result["answer"].startswith("التعريف")
+
+
+def test_ungrounded_answer_escalates_then_is_blocked():
+    ungrounded = {"grounded": False, "score": 0.1, "source": "local"}
+    result, models = _generate([ANSWER, ANSWER], [ungrounded, ungrounded])
+    assert models == ["gpt-4o-mini", "gpt-4o"]
+    assert result["escalation"] == "ungrounded"
+    assert result["hallucination"] is True
+    assert result["answer"] == HALLUCINATION_MESSAGE
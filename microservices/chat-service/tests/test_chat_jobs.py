@@ -0,0 +1,105 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import tasks
+from api import chat as chat_api
+from services.chat_jobs import JOB_CHANNEL, JOB_KEY, ChatJobs
+
+PENDING = {"status": "pending", "user_id": "u1", "session_id": "s1"}
+DONE = {**PENDING, "status": "done", "response": {"answer": "..."}, "detail": None}
+
+
+def _jobs(*records) -> ChatJobs:
+    jobs = ChatJobs()
+    jobs.redis = MagicMock()
+    jobs.redis.get = AsyncMock(
+        side_effect=[None if r is None else json.dumps(r) for r in records]
+    )
+    jobs.redis.pubsub.return_value = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    jobs.redis.pipeline.return_value = pipe
+    return jobs
+
+
+def test_finish_stores_the_answer_and_wakes_the_listeners():
+    jobs = _jobs(PENDING)
+    asyncio.run(jobs.finish("j1", response={"answer": "..."}))
+
+    pipe = jobs.redis.pipeline.return_value
+    key, value = pipe.set.call_args.args
+    assert key == JOB_KEY.format(job_id="j1")
+    assert json.loads(value) == DONE
+    pipe.publish.assert_called_once_with(JOB_CHANNEL.format(job_id="j1"), "done")
+
+
+def test_wait_returns_the_record_once_the_job_settles():
+    jobs = _jobs(PENDING, DONE)
+    assert asyncio.run(jobs.wait("j1", timeout=5)) == DONE
+    pubsub = jobs.redis.pubsub.return_value
+    pubsub.get_message.assert_awaited_once()
+    pubsub.aclose.assert_awaited_once()
+
+
+def test_wait_gives_up_on_a_pending_job_after_the_timeout():
+    jobs = _jobs(PENDING)
+    assert asyncio.run(jobs.wait("j1", timeout=0)) == PENDING
+    jobs.redis.pubsub.return_value.get_message.assert_not_called()
+
+
+def _answer(run_chat_turn, finish):
+    jobs = AsyncMock()
+    jobs.finish = finish
+    with patch.object(tasks, "run_chat_turn", run_chat_turn), \
+         patch.object(tasks, "chat_jobs", jobs), \
+         patch.object(tasks, "AsyncSessionLocal", MagicMock()), \
+         patch.object(tasks.asyncio, "sleep", AsyncMock()):
+        asyncio.run(tasks._answer("j1", "u1", None, "سؤال", "c", "eng", "1", "r1"))
+    return jobs
+
+
+def test_worker_stores_the_answer_and_notifies_the_student():
+    jobs = _answer(AsyncMock(return_value={"answer": "..."}), AsyncMock())
+
+    jobs.finish.assert_awaited_once_with("j1", response={"answer": "..."})
+    jobs.notify.assert_awaited_once_with("u1")
+
+
+def test_worker_marks_a_failed_turn_as_failed():
+    jobs = _answer(AsyncMock(side_effect=RuntimeError("boom")), AsyncMock())
+
+    assert set(jobs.finish.await_args.kwargs) == {"detail"}
+    jobs.notify.assert_not_called()
+
+
+def test_worker_retries_settling_the_job_after_a_redis_error():
+    finish = AsyncMock(side_effect=[ConnectionError(), None])
+    jobs = _answer(AsyncMock(return_value={"answer": "..."}), finish)
+
+    assert finish.await_count == 2
+    jobs.notify.assert_awaited_once_with("u1")
+
+
+def test_worker_gives_up_without_notifying_when_redis_stays_down():
+    finish = AsyncMock(side_effect=ConnectionError())
+    jobs = _answer(AsyncMock(return_value={"answer": "..."}), finish)
+
+    assert finish.await_count == tasks.settings.CHAT_JOB_FINISH_ATTEMPTS
+    jobs.notify.assert_not_called()
+
+
+def test_job_events_end_with_failed_when_waiting_fails():
+    jobs = AsyncMock()
+    jobs.get.return_value = PENDING
+    jobs.wait.side_effect = ConnectionError()
+
+    async def run():
+        response = await chat_api.chat_job_events("j1", x_user_id="u1")
+        return [event async for event in response.body_iterator]
+
+    with patch.object(chat_api, "chat_jobs", jobs):
+        events = asyncio.run(run())
+
+    assert len(events) == 1
+    assert events[0].startswith("event: failed\n")
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from core import deadline
+from core.stage_timer import stage
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.llm_service import llm_service
+
+
+def _app():
+    app = FastAPI()
+    deadline.install(app)
+
+    @app.get("/budget")
+    async def budget():
+        return {"remaining": deadline.remaining(), "headers": deadline.headers()}
+
+    @app.get("/expires")
+    async def expires():
+        deadline.set_deadline(time.time() - 1)
+        with stage("retrieval", check_deadline=True):
+            return {}
+
+    return TestClient(app)
+
+
+def _header(seconds_from_now):
+    return {deadline.DEADLINE_HEADER: str(int((time.time() + seconds_from_now) * 1000))}
+
+
+def _client_get(path, headers):
+    response = _app().get(path, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_deadline_is_read_from_the_header_and_forwarded():
+    body = _client_get("/budget", _header(10))
+    assert 0 < body["remaining"] <= 10
+    assert deadline.DEADLINE_HEADER in body["headers"]
+    assert _client_get("/budget", {})["remaining"] is None
+
+
+def test_expired_requests_are_rejected():
+    client = _app()
+    assert client.get("/budget", headers=_header(-1)).status_code == 504
+    response = client.get("/expires")
+    assert response.status_code == 504
+    assert "retrieval" in response.json()["detail"]
+
+
+def test_timeouts_are_capped_by_the_time_left():
+    deadline.set_deadline(time.time() + 2)
+    try:
+        assert deadline.timeout(30) <= 2
+        assert deadline.timeout(1) == 1
+        assert not deadline.has_budget("escalation", 5)
+        deadline.set_deadline(time.time() - 1)
+        assert deadline.timeout(30) == 0
+        with pytest.raises(deadline.DeadlineExceeded):
+            with stage("intent", check_deadline=True):
+                pass
+        # Stages after generation always run: the answer must be delivered
+        ran = []
+        for name in ("groundedness", "cache_write", "persist"):
+            with stage(name):
+                ran.append(name)
+        assert ran == ["groundedness", "cache_write", "persist"]
+    finally:
+        deadline.set_deadline(None)
+    assert deadline.timeout(30) == 30
+
+
+def test_groundedness_auditor_is_skipped_when_time_is_short():
+    auditor = AsyncMock(return_value=True)
+    with patch.object(llm_service, "check_groundedness", auditor), \
+         patch("services.llm_service.score_groundedness", return_value={"score": 0.6}):
+        deadline.set_deadline(time.time() + 1)
+        try:
+            verdict = asyncio.run(llm_service.verify_groundedness("answer", "context"))
+        finally:
+            deadline.set_deadline(None)
+        auditor.assert_not_awaited()
+        assert verdict == {"grounded": True, "score": 0.6, "source": "deadline"}
+
+        verdict = asyncio.run(llm_service.verify_groundedness("answer", "context"))
+        auditor.assert_awaited_once()
+        assert verdict["source"] == "llm"
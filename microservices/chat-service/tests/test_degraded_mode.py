@@ -0,0 +1,85 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from api import chat as chat_api
+from services import chat_service
+from services.degraded_mode import DegradedMode
+
+
+def _median_of(mode: DegradedMode, latencies: list[float]) -> bool:
+    redis = MagicMock()
+    redis.zrangebyscore = AsyncMock(
+        return_value=[f"{latency}:{i}" for i, latency in enumerate(latencies)]
+    )
+    mode.checked_at = 0.0
+    with patch.object(mode, "_get_redis", AsyncMock(return_value=redis)):
+        return asyncio.run(mode.is_active())
+
+
+def test_degraded_mode_switches_with_hysteresis():
+    mode = DegradedMode()
+    assert not _median_of(mode, [20.0] * 3)  # too few calls to decide
+    assert _median_of(mode, [2.0, 18.0, 20.0, 25.0, 30.0])
+    # Between the exit and enter thresholds: stays on
+    assert _median_of(mode, [9.0, 10.0, 11.0, 12.0, 13.0])
+    assert not _median_of(mode, [2.0, 3.0, 4.0, 5.0, 30.0])
+
+
+def test_cached_only_defers_a_cache_miss():
+    with patch.object(chat_service, "chat_repository", new_callable=AsyncMock), \
+         patch.object(chat_service, "_lookup_cached_answer", AsyncMock(return_value=None)), \
+         patch.object(chat_service, "_plan_generation", new_callable=AsyncMock) as plan:
+        turn = asyncio.run(
+            chat_service._prepare_turn(
+                AsyncMock(), "u1", None, "ما هو التحليل العددي", "c", "eng", "1",
+                cached_only=True,
+            )
+        )
+
+    plan.assert_not_called()
+    assert turn["deferred"]
+    assert turn["answer"] is None
+
+
+def test_deferred_turn_returns_202_with_its_job():
+    session_id = uuid4()
+    request = chat_api.ChatRequest(message="ما هو التحليل العددي", collection_name="c")
+    jobs = AsyncMock()
+    jobs.submit.return_value = "job-1"
+    deferred = (None, session_id, None, "", {}, {}, None)
+    with patch.object(chat_api, "chat_jobs", jobs), \
+         patch.object(
+             chat_api.chat_service,
+             "handle_chat_message",
+             AsyncMock(return_value=deferred),
+         ) as handle:
+        response = asyncio.run(
+            chat_api.run_chat_turn(
+                AsyncMock(), request, "u1", "eng", "1", "r1", cached_only=True
+            )
+        )
+
+    assert handle.call_args.kwargs["cached_only"] is True
+    jobs.submit.assert_awaited_once_with(
+        "u1", session_id, request.message, "c", "eng", "1", "r1"
+    )
+    assert response.status_code == 202
+    assert json.loads(response.body) == {
+        "job_id": "job-1",
+        "status": "pending",
+        "session_id": str(session_id),
+        "result": None,
+        "detail": None,
+    }
+
+
+def test_job_of_another_user_is_not_found():
+    jobs = AsyncMock()
+    jobs.get.return_value = {"status": "done", "user_id": "u2"}
+    with patch.object(chat_api, "chat_jobs", jobs), \
+         pytest.raises(chat_api.HTTPException) as error:
+        asyncio.run(chat_api.get_chat_job("job-1", x_user_id="u1"))
+    assert error.value.status_code == 404
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services import chat_service
+from services.intent_classifier import intent_classifier, topic_overlap
+
+PREVIOUS = {
+    "query": "ما هي طريقة نيوتن رافسون",
+    "max_score": 0.88,
+    "chunks": [
+        {
+            "text": "طريقة نيوتن رافسون تقرب جذر الداله باستخدام المماس عند كل تكرار.",
+            "score": 0.88,
+            "source": "numerical.pdf",
+            "page": 41,
+            "book_id": "b1",
+        }
+    ],
+}
+
+
+def test_followup_without_topical_words_continues_the_topic():
+    assert topic_overlap("اعطني مثال اخر", PREVIOUS["query"]) == 1.0
+    assert topic_overlap("explain that again please", PREVIOUS["query"]) == 1.0
+
+
+def test_followup_on_another_topic_does_not_overlap():
+    assert topic_overlap("اعطني مثال على التكامل بشبه المنحرف", PREVIOUS["query"]) == 0.0
+
+
+def test_confused_is_matched_by_rules():
+    result = intent_classifier.classify("لم افهم، اشرح مرة أخرى")
+    assert result["intent"] == "CONFUSED"
+    assert result["source"] == "rules"
+
+
+def _run_turn(message, previous):
+    session = SimpleNamespace(id="s1", user_id="u1", learning_summary=None)
+    repository = AsyncMock()
+    repository.get_chat_session.return_value = session
+    memory = AsyncMock()
+    memory.get.return_value = previous
+    llm = AsyncMock()
+    llm.get_cached_response.return_value = None
+    llm.get_cached_rag_results.return_value = None
+    llm.detect_intent_and_rewrite_query.return_value = {
+        "intent": "EXAMPLE",
+        "mode": "UNDERSTANDING",
+        "rewritten_query": message,
+    }
+    llm.acquire_flight.return_value = (True, "token")
+    llm.flight_key = MagicMock(return_value="k")
+    with patch.object(chat_service, "llm_service", llm), \
+         patch.object(chat_service, "chat_repository", repository), \
+         patch.object(chat_service, "retrieval_memory", memory), \
+         patch.object(chat_service, "history_buffer", AsyncMock(get=AsyncMock(return_value=[]))), \
+         patch.object(chat_service, "call_rag_search", new_callable=AsyncMock) as rag, \
+         patch.object(chat_service.settings, "SEMANTIC_CACHE_ENABLED", False):
+        rag.return_value = []
+        turn = asyncio.run(
+            chat_service._prepare_turn(
+                AsyncMock(), "u1", "s1", message, "c", "eng", "1"
+            )
+        )
+    return turn, llm, rag, memory
+
+
+def test_followup_reuses_the_previous_chunks():
+    turn, llm, rag, memory = _run_turn("اعطني مثال اخر", PREVIOUS)
+
+    rag.assert_not_called()
+    llm.get_embedding.assert_not_called()
+    llm.detect_intent_and_rewrite_query.assert_not_called()
+    llm.get_cached_response.assert_not_called()
+    llm.acquire_flight.assert_not_called()
+    memory.save.assert_not_called()
+    assert turn["stages"]["retrieval"] == "reused"
+    assert turn["intent"] == "EXAMPLE"
+    assert turn["relevant_chunks"] == PREVIOUS["chunks"]
+    assert turn["max_score"] == 0.88
+    assert turn["book_id"] == "b1"
+    assert "نيوتن" in turn["context_text"]
+
+
+def test_followup_on_a_new_topic_is_retrieved_afresh():
+    turn, llm, rag, memory = _run_turn("اعطني مثال على التكامل بشبه المنحرف", PREVIOUS)
+
+    rag.assert_awaited_once()
+    assert turn["stages"]["retrieval"] == "rag"
+    assert turn["followup"] is None
+    memory.save.assert_awaited_once()
+
+
+def test_followup_without_previous_retrieval_is_retrieved_afresh():
+    turn, llm, rag, memory = _run_turn("اعطني مثال اخر", None)
+
+    rag.assert_awaited_once()
+    assert turn["stages"]["answer_cache"] == "miss"
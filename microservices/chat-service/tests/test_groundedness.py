@@ -0,0 +1,41 @@
+from services.groundedness import score_groundedness
+
+CONTEXT = (
+    "التحليل العددي هو فرع من فروع الرياضيات يهتم بإيجاد حلول تقريبية للمسائل الرياضية. "
+    "من أمثلة طرقه طريقة نيوتن رافسون لإيجاد جذور المعادلات غير الخطية."
+)
+
+
+def test_supported_answer_scores_high():
+    answer = (
+        "التعريف: التحليل العددي فرع من الرياضيات يهتم بإيجاد حلول تقريبية للمسائل.\n"
+        "الشرح: كما ورد في المحتوى المرجعي، يهتم بالحلول التقريبية للمسائل الرياضية.\n"
+        "مثال: طريقة نيوتن رافسون لإيجاد جذور المعادلات.\n"
+    )
+    result = score_groundedness(answer, CONTEXT)
+    assert result["score"] > 0.75
+    assert result["supported_ratio"] == 1.0
+
+
+def test_unrelated_answer_scores_low():
+    answer = "التعريف: الكيمياء العضوية تدرس مركبات الكربون والتفاعلات الحيوية في الخلايا."
+    assert score_groundedness(answer, CONTEXT)["score"] < 0.2
+
+
+def test_partially_supported_answer_falls_in_between():
+    answer = (
+        "التعريف: التحليل العددي فرع من الرياضيات.\n"
+        "الشرح: اخترعه نيوتن في القرن السابع عشر في جامعة كامبريدج البريطانية الشهيرة."
+    )
+    score = score_groundedness(answer, CONTEXT)["score"]
+    assert 0.2 < score < 0.75
+
+
+def test_normalization_ignores_diacritics_and_article():
+    answer = "التَّحليلُ العدديُّ يهتمُّ بإيجادِ حلولٍ تقريبيةٍ"
+    assert score_groundedness(answer, CONTEXT)["token_coverage"] == 1.0
+
+
+def test_empty_inputs():
+    assert score_groundedness("", CONTEXT)["score"] == 0.0
+    assert score_groundedness("إجابة", "")["score"] == 0.0
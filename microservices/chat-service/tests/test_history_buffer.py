@@ -0,0 +1,94 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services import chat_service
+from services.history_buffer import FILL_IF_ABSENT, HistoryBuffer
+
+MESSAGES = [
+    {"role": "user", "content": "ما هو التحليل العددي؟"},
+    {"role": "assistant", "content": "فرع من الرياضيات..."},
+]
+
+
+def _buffer(execute_result=None) -> HistoryBuffer:
+    buffer = HistoryBuffer(max_turns=2, ttl=600)
+    buffer.redis = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=execute_result)
+    buffer.redis.pipeline.return_value = pipe
+    buffer.redis.eval = AsyncMock()
+    return buffer
+
+
+def test_append_trims_the_buffer_to_the_window():
+    buffer = _buffer()
+    asyncio.run(buffer.append("s1", *MESSAGES))
+
+    pipe = buffer.redis.pipeline.return_value
+    pipe.rpush.assert_called_once_with(
+        "chat_history:s1", *[json.dumps(m, ensure_ascii=False) for m in MESSAGES]
+    )
+    pipe.ltrim.assert_called_once_with("chat_history:s1", -4, -1)
+    pipe.expire.assert_called_once_with("chat_history:s1", 600)
+
+
+def test_append_without_create_does_not_start_a_cold_buffer():
+    buffer = _buffer()
+    asyncio.run(buffer.append("s1", *MESSAGES, create=False))
+
+    pipe = buffer.redis.pipeline.return_value
+    pipe.rpush.assert_not_called()
+    pipe.rpushx.assert_called_once()
+
+
+def test_get_returns_none_for_a_cold_buffer():
+    assert asyncio.run(_buffer([0, []]).get("s1", 6)) is None
+    warm = _buffer([1, [json.dumps(m) for m in MESSAGES]])
+    assert asyncio.run(warm.get("s1", 6)) == MESSAGES
+
+
+def test_fill_pushes_only_the_last_window_of_messages():
+    buffer = _buffer()
+    messages = [{"role": "user", "content": str(i)} for i in range(6)]
+    asyncio.run(buffer.fill("s1", messages))
+
+    args = buffer.redis.eval.await_args.args
+    assert args[:4] == (FILL_IF_ABSENT, 1, "chat_history:s1", 600)
+    assert [json.loads(item)["content"] for item in args[4:]] == ["2", "3", "4", "5"]
+
+
+def test_cold_buffer_is_filled_from_the_database():
+    buffer = _buffer([0, []])
+    rows = [SimpleNamespace(**m) for m in MESSAGES]
+    repository = MagicMock()
+    repository.get_recent_chat_messages = AsyncMock(return_value=rows)
+    stages = {}
+    with patch.object(chat_service, "history_buffer", buffer), \
+         patch.object(chat_service, "chat_repository", repository):
+        history = asyncio.run(chat_service._load_recent_history(AsyncMock(), "s1", stages))
+
+    assert history == MESSAGES
+    assert stages["history"] == "db"
+    assert repository.get_recent_chat_messages.await_args.args[2] == buffer.max_messages
+    buffer.redis.eval.assert_awaited_once()
+
+
+def test_redis_failure_falls_back_to_the_database():
+    buffer = _buffer()
+    buffer.redis.pipeline.return_value.execute = AsyncMock(side_effect=ConnectionError())
+    buffer.redis.eval = AsyncMock(side_effect=ConnectionError())
+    repository = MagicMock()
+    repository.get_recent_chat_messages = AsyncMock(
+        return_value=[SimpleNamespace(**m) for m in MESSAGES]
+    )
+    stages = {}
+    with patch.object(chat_service, "history_buffer", buffer), \
+         patch.object(chat_service, "chat_repository", repository):
+        history = asyncio.run(chat_service._load_recent_history(AsyncMock(), "s1", stages))
+
+    assert history == MESSAGES
+    assert stages["history"] == "db"
+    # Appending does not raise either: the turn is still persisted
+    asyncio.run(buffer.append("s1", *MESSAGES))
@@ -0,0 +1,122 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from core import idempotency as idempotency_module
+from core.idempotency import RELEASE_MARKER, IdempotencyStore, fingerprint
+from fastapi import HTTPException
+
+BODY = {"message": "ما هو التحليل العددي؟", "faculty_id": "eng", "semester_id": "1"}
+
+
+def _redis(claimed: bool, record: dict | None = None):
+    redis = MagicMock()
+    redis.set = AsyncMock(return_value=claimed)
+    redis.get = AsyncMock(return_value=None if record is None else json.dumps(record))
+    redis.pubsub.return_value = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis.pipeline.return_value = pipe
+    return redis
+
+
+def _run(store, redis, body, handler):
+    with patch.object(store, "_get_redis", AsyncMock(return_value=redis)):
+        return asyncio.run(store.run("chat:u1", "key-1", body, handler))
+
+
+def test_first_request_runs_and_stores_its_response():
+    store = IdempotencyStore()
+    redis = _redis(claimed=True)
+    handler = AsyncMock(return_value={"answer": "..."})
+
+    assert _run(store, redis, BODY, handler) == {"answer": "..."}
+    handler.assert_awaited_once()
+    stored = json.loads(redis.pipeline.return_value.set.call_args.args[1])
+    assert stored == {
+        "fingerprint": fingerprint(BODY),
+        "status_code": 200,
+        "response": {"answer": "..."},
+    }
+
+
+def test_retry_replays_the_stored_response():
+    store = IdempotencyStore()
+    record = {
+        "fingerprint": fingerprint(BODY),
+        "status_code": 202,
+        "response": {"job_id": "j1", "status": "pending"},
+    }
+    handler = AsyncMock()
+
+    response = _run(store, _redis(claimed=False, record=record), BODY, handler)
+
+    handler.assert_not_called()
+    assert response.status_code == 202
+    assert json.loads(response.body) == {"job_id": "j1", "status": "pending"}
+    assert response.headers["Idempotent-Replayed"] == "true"
+
+
+def test_key_reused_for_another_request_is_refused():
+    store = IdempotencyStore()
+    record = {"fingerprint": fingerprint(BODY), "status_code": 200, "response": {}}
+    other = {**BODY, "message": "ما هو التكامل؟"}
+
+    with pytest.raises(HTTPException) as error:
+        _run(store, _redis(claimed=False, record=record), other, AsyncMock())
+    assert error.value.status_code == 422
+
+
+def test_duplicate_in_flight_waits_for_the_first_response():
+    store = IdempotencyStore()
+    in_flight = {"token": "t", "fingerprint": fingerprint(BODY)}
+    done = {"fingerprint": fingerprint(BODY), "status_code": 200, "response": {"answer": "..."}}
+    redis = _redis(claimed=False)
+    redis.get = AsyncMock(side_effect=[json.dumps(in_flight), json.dumps(done)])
+    handler = AsyncMock()
+
+    response = _run(store, redis, BODY, handler)
+
+    handler.assert_not_called()
+    redis.pubsub.return_value.get_message.assert_awaited_once()
+    assert json.loads(response.body) == {"answer": "..."}
+    assert response.headers["Idempotent-Replayed"] == "true"
+
+
+def test_duplicate_gets_409_when_the_first_request_outlasts_the_wait():
+    store = IdempotencyStore()
+    in_flight = {"token": "t", "fingerprint": fingerprint(BODY)}
+    with patch.object(idempotency_module.settings, "IDEMPOTENCY_WAIT_SECONDS", 0), \
+         pytest.raises(HTTPException) as error:
+        _run(store, _redis(claimed=False, record=in_flight), BODY, AsyncMock())
+    assert error.value.status_code == 409
+
+
+def test_failed_handler_releases_the_key():
+    store = IdempotencyStore()
+    redis = _redis(claimed=True)
+    handler = AsyncMock(side_effect=RuntimeError("boom"))
+
+    with pytest.raises(RuntimeError):
+        _run(store, redis, BODY, handler)
+
+    pipe = redis.pipeline.return_value
+    assert pipe.eval.call_args.args[:3] == (RELEASE_MARKER, 1, "idempotency:chat:u1:key-1")
+    pipe.set.assert_not_called()
+    pipe.publish.assert_called_once()
+
+
+def test_retry_runs_again_after_the_first_request_failed():
+    store = IdempotencyStore()
+    in_flight = {"token": "t", "fingerprint": fingerprint(BODY)}
+    redis = _redis(claimed=False)
+    # First claim loses to the in-flight request, which then fails and
+    # releases the key; the second claim wins
+    redis.set = AsyncMock(side_effect=[False, True])
+    redis.get = AsyncMock(side_effect=[json.dumps(in_flight), None])
+    handler = AsyncMock(return_value={"answer": "..."})
+
+    assert _run(store, redis, BODY, handler) == {"answer": "..."}
+    handler.assert_awaited_once()
+    assert redis.set.await_count == 2
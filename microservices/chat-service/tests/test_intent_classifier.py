@@ -0,0 +1,84 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services.intent_classifier import (
+    IntentClassifier,
+    calibrate_threshold,
+    fit_centroids,
+    needs_rewrite,
+)
+from services.llm_service import LLMService
+
+
+def _classifier():
+    classifier = IntentClassifier()
+    classifier.set_model(
+        {
+            "intent_centroids": fit_centroids(
+                [[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0, 0.9, 0.1]],
+                ["REVISION", "REVISION", "CONFUSED", "CONFUSED"],
+            ),
+            "mode_centroids": fit_centroids([[1, 0, 0], [0, 1, 0]], ["EXAM", "UNDERSTANDING"]),
+            "threshold": 0.8,
+        }
+    )
+    return classifier
+
+
+def test_keyword_rules_take_precedence():
+    result = _classifier().classify("ما هو التحليل العددي؟", [0, 1, 0])
+    assert result == {
+        "intent": "DEFINITION",
+        "mode": "UNDERSTANDING",
+        "confidence": 1.0,
+        "source": "rules",
+    }
+    assert _classifier().classify("أعطني أسئلة امتحان متوقعة")["intent"] == "EXAM_STYLE"
+
+
+def test_centroid_classification_and_fallback():
+    classifier = _classifier()
+    result = classifier.classify("راجع معي الفصل الثالث", [0.95, 0.05, 0])
+    assert result["intent"] == "REVISION"
+    assert result["mode"] == "EXAM"
+    assert result["source"] == "centroid"
+    # Between the centroids: not confident, falls back to the LLM
+    assert classifier.classify("راجع معي الفصل الثالث", [1, 1, 0]) is None
+    # No embedding and no rule match
+    assert classifier.classify("راجع معي الفصل الثالث") is None
+
+
+def test_needs_rewrite():
+    assert not needs_rewrite("اشرح طريقة نيوتن", "")
+    assert not needs_rewrite("اشرح طريقة نيوتن", "student: ...")
+    assert needs_rewrite("اشرح هذا مجدداً", "student: ...")
+    assert not needs_rewrite("اشرح هذا مجدداً", "")
+    assert needs_rewrite(" ".join(["كلمة"] * 20), "")
+
+
+def test_topic_free_followups_need_a_rewrite_with_history():
+    for message in ("أعطني مثالاً", "اشرح أكثر", "give me an example"):
+        assert needs_rewrite(message, "student: ما هي طريقة نيوتن؟")
+        assert not needs_rewrite(message, "")
+
+
+def test_calibrate_threshold():
+    similarities = [0.95, 0.9, 0.85, 0.8, 0.7]
+    correct = [True, True, True, False, False]
+    assert calibrate_threshold(similarities, correct, target_precision=0.9) == 0.85
+    assert calibrate_threshold(similarities, [False] * 5) > 1.0
+
+
+def test_failed_sample_logging_keeps_the_llm_intent():
+    service = LLMService()
+    result = {"intent": "EXAM_STYLE", "mode": "EXAM", "rewritten_query": "اسئلة امتحان"}
+    redis = MagicMock()
+    redis.pipeline.return_value.execute = AsyncMock(side_effect=ConnectionError())
+    with patch.object(service, "intent_cache", AsyncMock(get=AsyncMock(return_value=None))), \
+         patch.object(service, "get_chat_completion", AsyncMock(return_value=json.dumps(result))), \
+         patch.object(service, "_get_redis", AsyncMock(return_value=redis)):
+        detected = asyncio.run(service.detect_intent_and_rewrite_query("اعطني اسئلة", "..."))
+
+    assert detected == result
+    redis.pipeline.return_value.lpush.assert_called_once()
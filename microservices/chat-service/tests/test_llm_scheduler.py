@@ -0,0 +1,105 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from core import llm_scheduler as scheduler_module
+from core.llm_scheduler import LLMScheduler, set_priority
+from openai import RateLimitError
+
+
+def _run_queued(calls: list[tuple]) -> list[str]:
+    """
+    Queues `calls` (name, priority, faculty) behind a call holding the only
+    slot and returns the order they were served in.
+    """
+    order = []
+
+    async def main():
+        scheduler = LLMScheduler()
+        scheduler.limit = 1.0
+        release = asyncio.Event()
+
+        async def call(name, priority, faculty, hold=False):
+            set_priority(priority, faculty)
+            async with scheduler.slot("gpt-4o", 10):
+                order.append(name)
+                if hold:
+                    await release.wait()
+
+        holder = asyncio.create_task(call("holder", "background", "x", hold=True))
+        await asyncio.sleep(0)
+        tasks = []
+        for name, priority, faculty in calls:
+            tasks.append(asyncio.create_task(call(name, priority, faculty)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+
+    with patch.object(scheduler_module.settings, "LLM_RATE_LIMITS", {}):
+        asyncio.run(main())
+    return order[1:]
+
+
+def test_interactive_calls_are_weighted_over_background():
+    calls = [(f"bg{i}", "background", "eng") for i in range(3)]
+    calls += [(f"chat{i}", "interactive", "eng") for i in range(5)]
+    # 4:1 weights: one background call per four interactive ones
+    assert _run_queued(calls) == [
+        "chat0", "chat1", "bg0", "chat2", "chat3", "chat4", "bg1", "bg2"
+    ]
+
+
+def test_faculties_are_served_round_robin():
+    calls = [(f"eng{i}", "interactive", "eng") for i in range(3)]
+    calls += [("med0", "interactive", "med")]
+    assert _run_queued(calls) == ["eng0", "med0", "eng1", "eng2"]
+
+
+def test_rate_limit_error_halves_the_concurrency_limit():
+    scheduler = LLMScheduler()
+    scheduler.limit = 8.0
+    response = httpx.Response(429, request=httpx.Request("POST", "http://x"))
+    error = RateLimitError("rate limited", response=response, body=None)
+
+    async def main():
+        with patch.object(scheduler, "_pause", MagicMock(return_value=asyncio.sleep(0))):
+            try:
+                async with scheduler.slot("gpt-4o", 10):
+                    raise error
+            except RateLimitError:
+                pass
+
+    with patch.object(scheduler_module.settings, "LLM_RATE_LIMITS", {}):
+        asyncio.run(main())
+    assert scheduler.limit == 4.0
+    assert scheduler.in_flight == 0
+
+
+def test_background_call_waiting_on_tokens_does_not_hold_a_slot():
+    order = []
+
+    async def main():
+        scheduler = LLMScheduler()
+        scheduler.limit = 1.0
+        refilled = asyncio.Event()
+
+        async def take_tokens(model, tokens, priority):
+            # The buckets are down to the interactive reserve
+            if priority == "background":
+                await refilled.wait()
+
+        async def call(name, priority):
+            set_priority(priority, "eng")
+            async with scheduler.slot("gpt-4o", 10):
+                order.append(name)
+
+        with patch.object(scheduler, "_take_tokens", AsyncMock(side_effect=take_tokens)):
+            background = asyncio.create_task(call("bg", "background"))
+            await asyncio.sleep(0)
+            await asyncio.wait_for(call("chat", "interactive"), timeout=1)
+            assert scheduler.in_flight == 0
+            refilled.set()
+            await background
+
+    asyncio.run(main())
+    assert order == ["chat", "bg"]
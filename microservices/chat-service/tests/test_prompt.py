@@ -0,0 +1,74 @@
+from rag.prompt import build_teacher_prompt, count_tokens, merge_chunks, pack_context
+
+PAGE_TEXT = (
+    "التحليل العددي هو فرع من فروع الرياضيات يهتم بإيجاد حلول تقريبية للمسائل الرياضية. "
+    "من أمثلة طرقه طريقة نيوتن رافسون لإيجاد جذور المعادلات غير الخطية. "
+    "وتعتمد هذه الطريقة على المشتقة الأولى للدالة وعلى تخمين ابتدائي قريب من الجذر."
+)
+
+
+def _chunk(text, score, page=12, source="numerical.pdf"):
+    return {"text": text, "score": score, "source": source, "page": page, "book_id": "b1"}
+
+
+def test_overlapping_chunks_of_a_page_are_merged_once():
+    first = PAGE_TEXT[:120]
+    second = PAGE_TEXT[70:]  # 50 characters of overlap, as produced by the chunker
+    blocks = merge_chunks([_chunk(second, 0.8), _chunk(first, 0.9)])
+    assert len(blocks) == 1
+    assert blocks[0]["text"] == PAGE_TEXT
+    assert blocks[0]["score"] == 0.9
+    assert blocks[0]["merged_from"] == 2
+
+
+def test_contained_and_duplicate_chunks_are_dropped():
+    chunks = [
+        _chunk(PAGE_TEXT, 0.9),
+        _chunk(PAGE_TEXT[:80], 0.85),
+        _chunk(PAGE_TEXT, 0.7, page=40, source="numerical-v2.pdf"),
+        _chunk("مقدمة في الجبر الخطي والمصفوفات", 0.75, page=3),
+    ]
+    packed = pack_context(chunks, budget=2000)
+    assert [b["page"] for b in packed] == [12, 3]
+    assert packed[0]["text"] == PAGE_TEXT
+
+
+def test_context_is_packed_by_score_within_budget():
+    chunks = [
+        _chunk(PAGE_TEXT, 0.6, page=1),
+        _chunk("المصفوفة هي ترتيب مستطيل من الأعداد. " * 3, 0.95, page=2),
+    ]
+    budget = count_tokens(chunks[1]["text"]) + 30
+    packed = pack_context(chunks, budget=budget)
+    assert [b["page"] for b in packed] == [2]
+
+
+def test_best_chunk_is_truncated_rather_than_omitted():
+    packed = pack_context([_chunk(PAGE_TEXT * 4, 0.9)], budget=60)
+    assert packed
+    assert count_tokens(packed[0]["text"]) < 60
+
+
+def test_prompt_respects_history_and_summary_budgets():
+    history = [
+        {"role": "user", "content": "سؤال قديم " * 100},
+        {"role": "assistant", "content": "جواب قديم " * 100},
+        {"role": "user", "content": "ما هي طريقة نيوتن؟"},
+        {"role": "assistant", "content": "طريقة لإيجاد الجذور."},
+    ]
+    prompt = build_teacher_prompt(
+        [_chunk(PAGE_TEXT, 0.9)],
+        "اشرح التحليل العددي",
+        history,
+        learning_summary="ملخص " * 500,
+        context_budget=500,
+        history_budget=100,
+        summary_budget=50,
+    )
+    roles = [m["role"] for m in prompt["messages"]]
+    assert roles == ["system", "user", "assistant", "user"]
+    counts = prompt["token_counts"]
+    assert counts["history"] <= 100
+    assert counts["summary"] <= 50
+    assert 0 < counts["context"] <= 500
+    assert counts["total"] > counts["context"] + counts["history"] + counts["summary"]
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+from services.rag_client import CircuitBreaker, CircuitOpenError, RagClient, RetryBudget
+
+
+def _client(handler, **breaker_kwargs):
+    client = RagClient(base_url="http://rag")
+    client.breaker = CircuitBreaker("test", **breaker_kwargs)
+    client.client = httpx.AsyncClient(
+        base_url="http://rag", transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+def test_breaker_opens_on_error_rate_and_recovers_after_probe():
+    breaker = CircuitBreaker(
+        "test", failure_rate=0.5, min_requests=4, window_seconds=60, open_seconds=0.05
+    )
+    for succeeded in (True, False, True, False):
+        assert breaker.allow_request()
+        breaker.record(succeeded)
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow_request()  # single half-open probe
+    assert not breaker.allow_request()
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_retry_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, min_tokens=1.0)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_spend()
+
+
+def test_search_retries_server_errors_within_budget():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json=[{"text": "chunk", "score": 0.9}])
+
+    client = _client(handler, min_requests=100)
+    assert asyncio.run(client.search({"query": "q"})) == [{"text": "chunk", "score": 0.9}]
+    assert len(calls) == 2
+
+
+def test_search_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(422)
+
+    client = _client(handler, min_requests=1)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.search({"query": "q"}))
+    assert len(calls) == 1
+    assert client.breaker.state == "closed"
+
+
+def test_open_breaker_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = _client(handler, failure_rate=0.5, min_requests=1, open_seconds=60)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.search({"query": "q"}))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.search({"query": "q"}))
+    assert len(calls) == 1
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from db.base import Base
+from models.chat import AnswerAuditLog
+from repository import chat_repository
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def _db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def _seed(db):
+    start = datetime(2026, 1, 1)
+    for i in range(7):
+        db.add(
+            AnswerAuditLog(
+                id=uuid4(),
+                user_id=uuid4(),
+                faculty_id="engineering" if i != 3 else "medicine",
+                question_text=f"q{i}",
+                ai_answer="a",
+                verified_by_teacher=i % 2 == 0,
+                is_correct=False if i == 5 else None,
+                rag_confidence_score=0.75 if i in (1, 6) else 0.9,
+                # Two answers share a timestamp: the id breaks the tie
+                created_at=start + timedelta(minutes=min(i, 5)),
+            )
+        )
+    db.commit()
+
+
+def test_pages_follow_the_cursor_without_gaps_or_repeats():
+    db = _db()
+    _seed(db)
+    seen, after = [], None
+    while True:
+        page = chat_repository.get_answers_for_review(
+            db, faculty_id="engineering", after=after, limit=2
+        )
+        seen += [e.question_text for e in page["items"]]
+        if not page["next_cursor"]:
+            break
+        after = chat_repository.decode_review_cursor(page["next_cursor"])
+
+    assert sorted(seen) == ["q0", "q1", "q2", "q4", "q5", "q6"]
+    assert len(seen) == len(set(seen))
+    assert seen[-4:] == ["q4", "q2", "q1", "q0"]
+
+
+def test_review_filters():
+    db = _db()
+    _seed(db)
+
+    def questions(**filters):
+        page = chat_repository.get_answers_for_review(db, faculty_id="engineering", **filters)
+        return sorted(e.question_text for e in page["items"])
+
+    assert questions(unverified=True) == ["q1", "q5"]
+    assert questions(incorrect=True) == ["q5"]
+    assert questions(low_confidence=True) == ["q1", "q6"]
+    assert questions(unverified=True, low_confidence=True) == ["q1"]
@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services import rollups as rollups_module
+from services.rollups import RECONCILED_KEY, Rollups
+
+ANSWER = SimpleNamespace(faculty_id="engineering", user_id="u1", book_id="b1")
+
+
+def _rollups(results=None):
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=results)
+    rollups = Rollups()
+    rollups.redis = MagicMock()
+    rollups.redis.pipeline.return_value = pipe
+    return rollups, pipe
+
+
+def test_changed_feedback_moves_the_answer_between_counters():
+    rollups, pipe = _rollups()
+    asyncio.run(rollups.record_feedback(ANSWER, True, False))
+
+    calls = {(c.args[0], c.args[1]): c.args[2] for c in pipe.hincrby.call_args_list}
+    keys = (
+        "rollup:faculty:_all",
+        "rollup:faculty:engineering",
+        "rollup:student:u1",
+        "rollup:course:b1",
+    )
+    assert calls == {
+        **{(key, "correct"): -1 for key in keys},
+        **{(key, "incorrect"): 1 for key in keys},
+    }
+
+
+def test_repeated_feedback_is_not_counted_twice():
+    rollups, pipe = _rollups()
+    asyncio.run(rollups.record_feedback(ANSWER, True, True))
+    pipe.execute.assert_not_called()
+
+
+def test_performance_is_read_from_the_rollup_once_reconciled():
+    values = {"answers": "4", "confidence_sum": "3.2", "confidence_n": "4", "correct": "3"}
+    rollups, _ = _rollups([1, values])
+    assert asyncio.run(rollups.get_performance("engineering")) == {
+        "avg_confidence": 0.8,
+        "total_answers": 4,
+        "positive_feedback_rate": 0.75,
+    }
+
+
+def test_cold_rollups_fall_back_to_the_database():
+    rollups, _ = _rollups([0, {}])
+    assert asyncio.run(rollups.get_performance("engineering")) is None
+
+
+def test_answers_are_counted_in_every_rollup_they_belong_to():
+    rollups, pipe = _rollups()
+    turns = [
+        {"faculty_id": "engineering", "user_id": "u1", "book_id": "b1", "rag_confidence_score": 0.8},
+        {"faculty_id": None, "user_id": "u2", "book_id": None, "rag_confidence_score": None},
+    ]
+    asyncio.run(rollups.record_answers(turns))
+
+    answers = [c.args[0] for c in pipe.hincrby.call_args_list if c.args[1] == "answers"]
+    assert answers == [
+        "rollup:faculty:_all",
+        "rollup:faculty:engineering",
+        "rollup:student:u1",
+        "rollup:course:b1",
+        "rollup:faculty:_all",
+        "rollup:student:u2",
+    ]
+    # Only the scored answer adds to the confidence average
+    assert {c.args[0] for c in pipe.hincrbyfloat.call_args_list} == set(answers[:4])
+    pipe.pfadd.assert_called_once_with("rollup:course:b1:students", "u1")
+    pipe.execute.assert_awaited_once()
+
+
+def _stats(key, answers):
+    return SimpleNamespace(
+        key=key, answers=answers, confidence_sum=answers * 0.5,
+        confidence_n=answers, correct=1, incorrect=0,
+    )
+
+
+def test_reconcile_rewrites_the_rollups_and_counts_drift():
+    rollups, pipe = _rollups()
+    stats = {
+        None: [_stats(None, 3)],
+        "faculty_id": [_stats("engineering", 3), _stats(None, 1)],
+        "user_id": [_stats("u1", 3)],
+        "book_id": [_stats("b1", 3)],
+    }
+    # hget then hset results per group: the student and course rollups drifted
+    pipe.execute = AsyncMock(side_effect=[["3"], [], ["3"], [], ["2"], [], [None], [], []])
+    repository = MagicMock()
+    repository.get_answer_stats = AsyncMock(
+        side_effect=lambda db, column: stats[None if column is None else column.key]
+    )
+    repository.get_course_students = AsyncMock(return_value=[("b1", "u1")])
+    rollups.redis.set = AsyncMock()
+
+    with patch.object(rollups_module, "chat_repository", repository):
+        drifted = asyncio.run(rollups.reconcile(AsyncMock()))
+
+    assert drifted == 2
+    written = {c.args[0]: c.kwargs["mapping"] for c in pipe.hset.call_args_list}
+    # Rows without a faculty are not written to a faculty rollup
+    assert set(written) == {
+        "rollup:faculty:_all",
+        "rollup:faculty:engineering",
+        "rollup:student:u1",
+        "rollup:course:b1",
+    }
+    assert written["rollup:student:u1"]["answers"] == 3
+    pipe.delete.assert_called_once_with("rollup:course:b1:students")
+    pipe.pfadd.assert_called_once_with("rollup:course:b1:students", "u1")
+    assert rollups.redis.set.await_args.args[0] == RECONCILED_KEY
@@ -0,0 +1,181 @@
+import asyncio
+import time
+
+import numpy as np
+from services.semantic_cache import SemanticCache
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the Redis commands SemanticCache uses, returning
+    bytes like a client without decode_responses.
+    """
+
+    def __init__(self):
+        self.strings, self.hashes, self.zsets = {}, {}, {}
+        self.hgetall_calls = 0
+
+    @staticmethod
+    def _b(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+    async def set(self, key, value):
+        self.strings[key] = self._b(value)
+
+    async def setex(self, key, ttl, value):
+        self.strings[key] = self._b(value)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.strings.pop(key, None)
+
+    async def incr(self, key):
+        self.strings[key] = self._b(int(self.strings.get(key, b"0")) + 1)
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[self._b(field)] = value
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(self._b(field), None)
+
+    async def hgetall(self, key):
+        self.hgetall_calls += 1
+        return dict(self.hashes.get(key, {}))
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(
+            {self._b(member): score for member, score in mapping.items()}
+        )
+
+    async def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(self._b(member), None)
+
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    async def zrangebyscore(self, key, low, high):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        return [member for member, score in items if low <= score <= high]
+
+    async def zpopmin(self, key, count):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])[:count]
+        for member, _ in items:
+            del self.zsets[key][member]
+        return items
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(
+            getattr(self.redis, name)(*args, **kwargs)
+        )
+
+    async def execute(self):
+        return [await call for call in self.calls]
+
+
+def _cache(**kwargs) -> SemanticCache:
+    cache = SemanticCache(
+        threshold=0.9, near_miss_margin=0.05, max_entries=10, ttl=3600, **kwargs
+    )
+    cache.redis = FakeRedis()
+    return cache
+
+
+def _vector(angle: float) -> list[float]:
+    # Cosine similarity between _vector(a) and _vector(b) is cos(a - b)
+    return [np.cos(angle), np.sin(angle), 0.0]
+
+
+def test_hit_at_threshold_and_near_miss_below_it():
+    cache = _cache(refresh_interval=0)
+
+    async def run():
+        await cache.store("eng", "1", _vector(0.0), "answer")
+        hit = await cache.lookup("eng", "1", _vector(np.arccos(0.91)))
+        near_miss = await cache.lookup("eng", "1", _vector(np.arccos(0.87)))
+        _, similarity = await cache.search("eng", "1", _vector(np.arccos(0.87)))
+        return hit, near_miss, similarity
+
+    hit, near_miss, similarity = asyncio.run(run())
+    assert hit == "answer"
+    assert near_miss is None
+    assert 0.85 <= similarity < 0.9
+
+
+def test_scopes_are_isolated_per_faculty_and_semester():
+    cache = _cache()
+
+    async def run():
+        await cache.store("eng", "1", _vector(0.0), "engineering answer")
+        return [
+            await cache.lookup(faculty, semester, _vector(0.0))
+            for faculty, semester in (("eng", "1"), ("eng", "2"), ("med", "1"))
+        ]
+
+    assert asyncio.run(run()) == ["engineering answer", None, None]
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_entries():
+    cache = _cache(refresh_interval=0)
+    cache.max_entries = 2
+
+    async def run():
+        first = await cache.store("eng", "1", _vector(0.0), "first")
+        await cache.store("eng", "1", _vector(1.0), "second")
+        # Touch the first entry so the second one is the least recently used
+        assert await cache.lookup("eng", "1", _vector(0.0)) == "first"
+        await cache.store("eng", "1", _vector(2.0), "third")
+        _, _, ids, _ = await cache._load_scope(cache._scope_key("eng", "1"))
+        return first, ids
+
+    first, ids = asyncio.run(run())
+    assert len(ids) == 2
+    assert first in ids
+    assert b"second" not in cache.redis.strings.values()
+
+
+def test_expired_entries_are_purged_on_lookup():
+    cache = _cache(refresh_interval=0)
+
+    async def run():
+        entry_id = await cache.store("eng", "1", _vector(0.0), "stale")
+        cache.redis.zsets["sem_cache:eng:1:lru"][entry_id.encode()] = time.time() - 7200
+        return entry_id, await cache.lookup("eng", "1", _vector(0.0))
+
+    entry_id, payload = asyncio.run(run())
+    assert payload is None
+    assert entry_id.encode() not in cache.redis.hashes["sem_cache:eng:1:vecs"]
+    assert f"sem_cache:eng:1:ans:{entry_id}" not in cache.redis.strings
+
+
+def test_local_mirror_reloads_only_when_the_version_changes():
+    cache = _cache(refresh_interval=0)
+    redis = cache.redis
+
+    async def run():
+        await cache.store("eng", "1", _vector(0.0), "answer")
+        await cache.lookup("eng", "1", _vector(0.0))
+        await cache.lookup("eng", "1", _vector(0.0))
+        loads_before_insert = redis.hgetall_calls
+        # An insert bumps the version, which triggers exactly one reload
+        await cache.store("eng", "1", _vector(1.0), "other")
+        await cache.lookup("eng", "1", _vector(1.0))
+        await cache.lookup("eng", "1", _vector(1.0))
+        return loads_before_insert, redis.hgetall_calls
+
+    loads_before_insert, loads_after = asyncio.run(run())
+    assert loads_before_insert == 1
+    assert loads_after == 2
@@ -0,0 +1,76 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from services import chat_service
+
+SHARED = json.dumps(
+    {
+        "answer": "التعريف: التحليل العددي فرع من الرياضيات يهتم بالحلول التقريبية.",
+        "source": {"book": "numerical.pdf", "page": 12},
+        "intent": "DEFINITION",
+        "mode": "UNDERSTANDING",
+        "rag_score": 0.91,
+        "book_id": "b1",
+    }
+)
+
+
+def _prepare(llm):
+    llm.flight_key = MagicMock(return_value="k")
+    llm.get_cached_response.return_value = None
+    with patch.object(chat_service, "llm_service", llm), \
+         patch.object(chat_service, "chat_repository", new_callable=AsyncMock), \
+         patch.object(chat_service.settings, "SEMANTIC_CACHE_ENABLED", False), \
+         patch.object(chat_service, "_plan_generation", new_callable=AsyncMock) as plan:
+        turn = asyncio.run(
+            chat_service._prepare_turn(
+                AsyncMock(), "u1", None, "ما هو التحليل العددي؟", "c", "eng", "1"
+            )
+        )
+    return turn, plan
+
+
+def test_waiter_reuses_the_leaders_answer():
+    llm = AsyncMock()
+    llm.acquire_flight.return_value = (False, None)
+    llm.wait_for_flight.return_value = SHARED
+    turn, plan = _prepare(llm)
+
+    plan.assert_not_called()
+    assert turn["stages"]["generation"] == "singleflight"
+    assert turn["answer"].startswith("التعريف")
+    assert turn["source_info"] == {"book": "numerical.pdf", "page": 12}
+    assert turn["flight"] is None
+
+
+def test_waiter_computes_its_own_answer_when_the_leader_fails():
+    llm = AsyncMock()
+    llm.acquire_flight.return_value = (False, None)
+    llm.wait_for_flight.return_value = None
+    turn, plan = _prepare(llm)
+
+    plan.assert_awaited_once()
+    assert turn["flight"] is None
+
+
+def test_leader_lands_the_flight_when_planning_fails():
+    llm = AsyncMock()
+    llm.acquire_flight.return_value = (True, "token")
+    llm.flight_key = MagicMock(return_value="k")
+    llm.get_cached_response.return_value = None
+    with patch.object(chat_service, "llm_service", llm), \
+         patch.object(chat_service, "chat_repository", new_callable=AsyncMock), \
+         patch.object(chat_service.settings, "SEMANTIC_CACHE_ENABLED", False), \
+         patch.object(
+             chat_service, "_plan_generation", AsyncMock(side_effect=RuntimeError("rag down"))
+         ), \
+         pytest.raises(RuntimeError, match="rag down"):
+        asyncio.run(
+            chat_service._prepare_turn(
+                AsyncMock(), "u1", None, "ما هو التحليل العددي؟", "c", "eng", "1"
+            )
+        )
+
+    llm.land_flight.assert_awaited_once_with("k", "token", None)
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from services import chat_service
+
+QUESTION = "ما هي طريقة نيوتن رافسون في التحليل العددي"
+CHUNK = {
+    "text": "طريقة نيوتن رافسون تقرب جذر الداله باستخدام المماس.",
+    "score": 0.9,
+    "source": "numerical.pdf",
+    "page": 41,
+    "book_id": "b1",
+}
+
+
+def _plan(analysis):
+    session = SimpleNamespace(id="s1", learning_summary="summary")
+    turn = {
+        "session": session,
+        "stages": {},
+        "followup": None,
+        "question_embedding": None,
+    }
+    llm = AsyncMock()
+    llm.get_cached_rag_results.return_value = None
+
+    async def detect(message, history):
+        await asyncio.sleep(0.05)
+        return analysis
+
+    llm.detect_intent_and_rewrite_query.side_effect = detect
+    with patch.object(chat_service, "llm_service", llm), \
+         patch.object(chat_service, "chat_repository", AsyncMock()), \
+         patch.object(chat_service, "retrieval_memory", AsyncMock()), \
+         patch.object(chat_service, "history_buffer", AsyncMock(get=AsyncMock(return_value=[]))), \
+         patch.object(chat_service, "needs_rewrite", return_value=True), \
+         patch.object(chat_service, "call_rag_search", new_callable=AsyncMock) as rag:
+        rag.return_value = [CHUNK]
+        asyncio.run(
+            chat_service._plan_generation(
+                AsyncMock(), turn, "u1", QUESTION, "c", "eng", "1"
+            )
+        )
+    return turn, rag
+
+
+def test_speculative_results_are_kept_for_a_close_rewrite():
+    turn, rag = _plan(
+        {"intent": "DEFINITION", "mode": "UNDERSTANDING", "rewritten_query": f"{QUESTION}؟"}
+    )
+
+    rag.assert_awaited_once()
+    assert rag.await_args.args[0] == QUESTION
+    assert turn["stages"]["speculation"] == "hit"
+    assert turn["stages"]["retrieval"] == "rag"
+    assert turn["relevant_chunks"] == [CHUNK]
+
+
+def test_distant_rewrite_is_retrieved_again():
+    turn, rag = _plan(
+        {"intent": "DEFINITION", "mode": "UNDERSTANDING", "rewritten_query": "تعريف طريقة التنصيف"}
+    )
+
+    assert turn["stages"]["speculation"] == "miss"
+    assert rag.await_args.args[0] == "تعريف طريقة التنصيف"
+
+
+def test_speculation_is_cancelled_for_general_messages():
+    turn, rag = _plan(
+        {"intent": "GENERAL", "mode": "UNDERSTANDING", "rewritten_query": QUESTION}
+    )
+
+    assert turn["stages"]["speculation"] == "cancelled"
+    assert turn["stages"]["retrieval"] == "skipped"
@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.stage_timer import StageTimer, estimate_cost, record_stage, record_usage, stage
+from prometheus_client import REGISTRY
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stages_are_timed_per_answer():
+    before = _sample("ai_teacher_stage_latency_seconds_count", stage="intent")
+
+    async def answer():
+        with StageTimer("eng") as timer:
+            with stage("intent"):
+                await asyncio.sleep(0.01)
+            with stage("intent"):
+                pass
+            record_stage("generation", 0.5)
+        return timer
+
+    timer = asyncio.run(answer())
+    assert set(timer.durations) == {"intent", "generation"}
+    assert timer.durations["intent"] >= 0.01
+    assert timer.summary()["generation"] == 500
+    assert _sample("ai_teacher_stage_latency_seconds_count", stage="intent") == before + 2
+
+
+def test_usage_is_counted_by_model_and_costed_per_faculty():
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=200)
+    before = _sample("ai_teacher_llm_tokens_total", model="gpt-4o", kind="completion")
+    cost_before = _sample("ai_teacher_llm_cost_usd_total", faculty_id="med")
+
+    with StageTimer("med") as timer:
+        record_usage("gpt-4o", usage)
+        record_usage("gpt-4o", None)
+    record_usage("gpt-4o", usage)  # outside an answer: not added to the timer
+
+    assert timer.tokens == {"prompt": 1000, "completion": 200}
+    assert timer.cost == estimate_cost("gpt-4o", 1000, 200) > 0
+    assert _sample("ai_teacher_llm_tokens_total", model="gpt-4o", kind="completion") == before + 400
+    assert _sample("ai_teacher_llm_cost_usd_total", faculty_id="med") == cost_before + timer.cost
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
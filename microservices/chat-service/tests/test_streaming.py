@@ -0,0 +1,134 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from core.deadline import DeadlineExceeded
+from openai import APIError
+from services import chat_service
+from services.streaming import SectionStreamParser, split_sections, sse_event
+
+ANSWER = "التعريف: التحليل العددي فرع من الرياضيات.\nالشرح: يدرس الطرق التقريبية.\nمثال: طريقة نيوتن.\nملخص: أدوات للحل التقريبي."
+
+
+def _collect(events):
+    sections = []
+    for event, data in events:
+        if event == "section":
+            sections.append([data["section"], ""])
+        else:
+            sections[-1][1] += data["text"]
+    return [(name, text.strip()) for name, text in sections]
+
+
+def test_stream_parser_handles_headings_split_across_tokens():
+    expected = [
+        ("التعريف", "التحليل العددي فرع من الرياضيات."),
+        ("الشرح", "يدرس الطرق التقريبية."),
+        ("مثال", "طريقة نيوتن."),
+        ("ملخص", "أدوات للحل التقريبي."),
+    ]
+    for step in (1, 2, 5, len(ANSWER)):
+        parser = SectionStreamParser()
+        events = []
+        for i in range(0, len(ANSWER), step):
+            events += parser.feed(ANSWER[i : i + step])
+        events += parser.flush()
+        assert _collect(events) == expected
+
+
+def test_stream_parser_ignores_headings_mid_sentence():
+    parser = SectionStreamParser()
+    events = parser.feed("الشرح: انظر مثال: المعادلة الأولى\n") + parser.flush()
+    assert [d["section"] for e, d in events if e == "section"] == ["الشرح"]
+
+
+def test_split_sections_keeps_preamble_without_section():
+    assert split_sections("نص بلا عناوين") == [(None, "نص بلا عناوين")]
+    assert [s for s, _ in split_sections(ANSWER)] == ["التعريف", "الشرح", "مثال", "ملخص"]
+
+
+def test_sse_event_format():
+    assert sse_event("done", {"grounded": True}) == 'event: done\ndata: {"grounded": true}\n\n'
+
+
+def test_generation_error_ends_the_stream_without_persisting():
+    async def failing_stream(messages):
+        yield "التعريف: "
+        raise APIError("boom", httpx.Request("POST", "http://x"), body=None)
+
+    turn = {
+        "session": MagicMock(),
+        "stages": {},
+        "refusal": False,
+        "answer": None,
+        "prompt_messages": [],
+        "flight": None,
+    }
+    llm = MagicMock(stream_chat_completion=failing_stream)
+
+    async def run():
+        return [item async for item in chat_service._stream_chat_message(
+            AsyncMock(), "u1", None, "q", "c", "eng", "1"
+        )]
+
+    with patch.object(chat_service, "_prepare_turn", AsyncMock(return_value=turn)), \
+         patch.object(chat_service, "llm_service", llm), \
+         patch.object(chat_service, "_cache_generated_answer", new_callable=AsyncMock) as cache, \
+         patch.object(chat_service, "_finalize_turn", new_callable=AsyncMock) as finalize:
+        items = asyncio.run(run())
+
+    assert items[-1].startswith("event: error\n")
+    assert all(isinstance(item, str) for item in items)
+    assert not any(item.startswith("event: done") for item in items)
+    cache.assert_not_called()
+    finalize.assert_not_called()
+
+
+def _stream(**patches):
+    async def run():
+        return [item async for item in chat_service.stream_chat_message(
+            AsyncMock(), "u1", "s1", "ما هو التحليل العددي", "c", "eng", "1"
+        )]
+
+    with patch.multiple(chat_service, **patches):
+        return asyncio.run(run())
+
+
+def _error(item: str) -> dict:
+    event, data = item.strip().split("\n")
+    assert event == "event: error"
+    return json.loads(data.removeprefix("data: "))
+
+
+def test_retrieval_failure_ends_the_stream_with_an_error_event():
+    llm = AsyncMock()
+    llm.get_cached_response.return_value = None
+    llm.acquire_flight.return_value = (True, "token")
+    llm.flight_key = MagicMock(return_value="k")
+    finalize = AsyncMock()
+
+    with patch.object(chat_service.settings, "SEMANTIC_CACHE_ENABLED", False):
+        items = _stream(
+            llm_service=llm,
+            chat_repository=AsyncMock(),
+            _plan_generation=AsyncMock(side_effect=ConnectionError("rag down")),
+            _finalize_turn=finalize,
+        )
+
+    assert len(items) == 1
+    assert _error(items[0]) == {
+        "session_id": "s1",
+        "status_code": 500,
+        "detail": chat_service.STREAM_ERROR_MESSAGE,
+    }
+    finalize.assert_not_called()
+    # The single-flight is still landed for the followers
+    llm.land_flight.assert_awaited_once_with("k", "token", None)
+
+
+def test_deadline_ends_the_stream_with_a_504_error_event():
+    items = _stream(_prepare_turn=AsyncMock(side_effect=DeadlineExceeded("retrieval")))
+
+    assert len(items) == 1
+    assert _error(items[0])["status_code"] == 504
@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services.summary_queue import ACTIVE_KEY, PENDING_KEY, SummaryWorker
+
+
+def _worker(pending_counts=(), deltas=(), remaining=0) -> SummaryWorker:
+    worker = SummaryWorker(every_n_turns=3, idle_seconds=60)
+    worker.redis = MagicMock()
+    pipe = MagicMock()
+    # _consume's pipelines return the pending list length first; the trim
+    # pipeline of _summarize returns (ltrim, llen)
+    pipe.execute = AsyncMock(
+        side_effect=[[count, 1, 1] for count in pending_counts] + [[True, remaining]]
+    )
+    worker.redis.pipeline.return_value = pipe
+    worker.redis.set = AsyncMock(return_value=True)
+    worker.redis.lrange = AsyncMock(return_value=list(deltas))
+    worker.redis.zrem = AsyncMock()
+    worker.redis.eval = AsyncMock()
+    return worker
+
+
+def _events(*session_ids):
+    return [
+        (f"1-{i}", {"session_id": session_id, "delta": f"turn {i}"})
+        for i, session_id in enumerate(session_ids)
+    ]
+
+
+def test_session_is_summarized_once_it_has_enough_turns():
+    worker = _worker(pending_counts=(2, 3, 1))
+    with patch.object(worker, "summarize", AsyncMock()) as summarize:
+        asyncio.run(worker._consume(_events("s1", "s1", "s2")))
+
+    summarize.assert_awaited_once_with("s1", trigger="turns")
+
+
+def test_idle_sessions_are_flushed():
+    worker = _worker()
+    worker.redis.zrangebyscore = AsyncMock(return_value=["s1", "s2"])
+    with patch.object(worker, "summarize", AsyncMock()) as summarize:
+        asyncio.run(worker.flush_idle())
+
+    assert [c.args for c in summarize.await_args_list] == [("s1",), ("s2",)]
+    assert all(c.kwargs == {"trigger": "idle"} for c in summarize.await_args_list)
+    assert worker.redis.zrangebyscore.await_args.args[:2] == (ACTIVE_KEY, 0)
+
+
+def test_summarizing_trims_only_the_consumed_turns():
+    worker = _worker(deltas=["turn 1", "turn 2"], remaining=1)
+    with patch.object(worker, "_update_summary", AsyncMock()) as update:
+        asyncio.run(worker.summarize("s1", trigger="turns"))
+
+    pending_key = PENDING_KEY.format(session_id="s1")
+    update.assert_awaited_once_with("s1", ["turn 1", "turn 2"])
+    # A turn appended during the LLM call survives the trim
+    worker.redis.pipeline.return_value.ltrim.assert_called_once_with(pending_key, 2, -1)
+    worker.redis.zrem.assert_not_called()
+    worker.redis.eval.assert_awaited_once()
+
+
+def test_drained_session_leaves_the_active_set():
+    worker = _worker(deltas=["turn 1"], remaining=0)
+    with patch.object(worker, "_update_summary", AsyncMock()):
+        asyncio.run(worker.summarize("s1", trigger="idle"))
+
+    worker.redis.zrem.assert_awaited_once_with(ACTIVE_KEY, "s1")
+
+
+def test_locked_session_is_left_to_the_other_worker():
+    worker = _worker(deltas=["turn 1"])
+    worker.redis.set = AsyncMock(return_value=None)
+    with patch.object(worker, "_update_summary", AsyncMock()) as update:
+        asyncio.run(worker.summarize("s1", trigger="turns"))
+
+    update.assert_not_called()
+    worker.redis.lrange.assert_not_called()
+
+
+def test_entries_of_a_dead_consumer_are_reclaimed():
+    worker = _worker(pending_counts=(3,))
+    entries = _events("s1")
+    worker.redis.xautoclaim = AsyncMock(return_value=["0-0", entries, []])
+    with patch.object(worker, "summarize", AsyncMock()) as summarize:
+        asyncio.run(worker._claim_abandoned())
+
+    assert worker.redis.xautoclaim.await_args.args[2] == worker.consumer
+    pipe = worker.redis.pipeline.return_value
+    pipe.rpush.assert_called_once_with(PENDING_KEY.format(session_id="s1"), "turn 0")
+    pipe.xack.assert_called_once()
+    summarize.assert_awaited_once_with("s1", trigger="turns")
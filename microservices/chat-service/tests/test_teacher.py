@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, MagicMock, ANY
+from unittest.mock import patch, AsyncMock, MagicMock, ANY
 from uuid import uuid4
 from fastapi.testclient import TestClient
 
@@ -36,14 +36,34 @@ def test_get_teacher_answers_success():
     ]
 
     with patch("api.chat.get_db"), \
-         patch("repository.chat_repository.get_answers_for_review") as mock_get:
-        mock_get.return_value = mock_answers
-        response = client.get("/teacher/answers", headers=headers)
+         patch("repository.async_chat_repository.get_answers_for_review", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = {"items": mock_answers, "next_cursor": None}
+        response = client.get("/teacher/answers?unverified=true&limit=20", headers=headers)
 
     assert response.status_code == 200
-    assert len(response.json()) == 1
-    assert response.json()[0]["question_text"] == "What is math?"
-    mock_get.assert_called_once_with(ANY, faculty_id=faculty_id)
+    assert len(response.json()["items"]) == 1
+    assert response.json()["items"][0]["question_text"] == "What is math?"
+    assert response.json()["next_cursor"] is None
+    mock_get.assert_called_once_with(
+        ANY,
+        faculty_id=faculty_id,
+        after=None,
+        limit=20,
+        unverified=True,
+        low_confidence=False,
+        incorrect=False,
+    )
+
+def test_get_teacher_answers_rejects_invalid_cursor():
+    headers = {
+        "X-User-Id": str(uuid4()),
+        "X-User-Role": "teacher",
+        "X-User-Faculty-Id": "engineering"
+    }
+
+    with patch("api.chat.get_db"):
+        response = client.get("/teacher/answers?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400
 
 def test_get_teacher_answers_unauthorized():
     headers = {
@@ -70,7 +90,7 @@ def test_teacher_verify_success():
     }
 
     with patch("api.chat.get_db"), \
-         patch("repository.chat_repository.verify_answer_by_teacher") as mock_verify, \
+         patch("repository.async_chat_repository.verify_answer_by_teacher", new_callable=AsyncMock) as mock_verify, \
          patch("api.chat.log_audit"):
         mock_verify.return_value = True
         response = client.post(f"/teacher/verify/{log_id}", json=payload, headers=headers)
@@ -95,7 +115,7 @@ def test_get_teacher_performance_success():
     }
 
     with patch("api.chat.get_db"), \
-         patch("repository.chat_repository.get_performance_stats") as mock_stats_repo:
+         patch("repository.async_chat_repository.get_performance_stats", new_callable=AsyncMock) as mock_stats_repo:
         mock_stats_repo.return_value = mock_stats
         response = client.get("/teacher/performance", headers=headers)
 
@@ -0,0 +1,39 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from services.turn_writer import TurnWriter
+
+
+def _turn(i):
+    return {"session_id": uuid4(), "user_id": uuid4(), "question_text": f"q{i}", "ai_answer": "a"}
+
+
+def test_enqueue_is_disabled_by_default():
+    assert TurnWriter(enabled=False).enqueue(_turn(0)) is None
+
+
+def test_write_behind_flushes_in_batches_and_drains_on_stop():
+    async def run():
+        writer = TurnWriter(enabled=True, batch_size=3, flush_interval=0.05)
+        await writer.start()
+        ids = [writer.enqueue(_turn(i)) for i in range(7)]
+        await writer.stop()
+        return ids
+
+    with patch("services.turn_writer.AsyncSessionLocal", MagicMock()), \
+         patch("services.turn_writer.chat_repository", new_callable=AsyncMock) as mock_repo:
+        ids = asyncio.run(run())
+
+    batches = [c.args[1] for c in mock_repo.persist_chat_turns.call_args_list]
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [t["audit_log_id"] for b in batches for t in b] == ids
+
+
+def test_failed_batch_is_retried_turn_by_turn():
+    with patch("services.turn_writer.AsyncSessionLocal", MagicMock()), \
+         patch("services.turn_writer.chat_repository", new_callable=AsyncMock) as mock_repo:
+        mock_repo.persist_chat_turns.side_effect = Exception("deadlock")
+        asyncio.run(TurnWriter(enabled=True)._flush([_turn(0), _turn(1)]))
+
+    assert mock_repo.persist_chat_turn.call_count == 2
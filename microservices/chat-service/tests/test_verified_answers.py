@@ -0,0 +1,56 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from services import chat_service
+from services.verified_answers import VerifiedAnswerLibrary
+
+LOG = SimpleNamespace(
+    id=uuid4(),
+    question_text="ما هو التحليل العددي؟",
+    ai_answer="التعريف: التحليل العددي فرع من الرياضيات يهتم بالحلول التقريبية.",
+    source_reference=json.dumps({"book": "numerical.pdf", "page": 12}),
+    rag_confidence_score=0.93,
+    book_id="b1",
+    verified_by_teacher=True,
+)
+
+
+def test_verified_answer_is_served_without_generation():
+    library = AsyncMock()
+    library.lookup_text.return_value = VerifiedAnswerLibrary._payload(LOG)
+    llm = AsyncMock()
+    with patch.object(chat_service, "verified_answers", library), \
+         patch.object(chat_service, "llm_service", llm), \
+         patch.object(chat_service, "chat_repository", new_callable=AsyncMock), \
+         patch.object(chat_service, "_plan_generation", new_callable=AsyncMock) as plan:
+        turn = asyncio.run(
+            chat_service._prepare_turn(
+                AsyncMock(), "u1", None, "ما هو التحليل العددي", "c", "eng", "1"
+            )
+        )
+
+    plan.assert_not_called()
+    llm.get_cached_response.assert_not_called()
+    llm.get_embedding.assert_not_called()
+    assert turn["stages"]["generation"] == "verified"
+    assert turn["answer"] == LOG.ai_answer
+    assert turn["source_info"] == {"book": "numerical.pdf", "page": 12}
+    assert turn["book_id"] == "b1"
+
+
+def test_refresh_follows_the_teacher_decision():
+    library = VerifiedAnswerLibrary()
+    rejected = SimpleNamespace(**{**vars(LOG), "verified_by_teacher": False})
+    for log_entry, method in ((LOG, "add"), (rejected, "discard")):
+        repository = AsyncMock()
+        repository.get_verified_answer.return_value = (log_entry, "eng", "1")
+        with patch("services.verified_answers.chat_repository", repository), \
+             patch.object(library, "add", new_callable=AsyncMock) as add, \
+             patch.object(library, "discard", new_callable=AsyncMock) as discard:
+            asyncio.run(library.refresh(AsyncMock(), log_entry.id))
+        called = {"add": add, "discard": discard}
+        called.pop(method).assert_awaited_once_with("eng", "1", log_entry)
+        called.popitem()[1].assert_not_called()
@@ -3,6 +3,7 @@ from uuid import UUID
 
 from core.audit import log_audit
 from core.cache import cache_result
+from core.idempotency import idempotency
 from db.session import get_db, get_read_db
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from pydantic import BaseModel
@@ -36,9 +37,23 @@ async def generate_exam(
     fastapi_req: Request,
     db: Session = Depends(get_db),
     x_user_id: str = Header(...),
+    idempotency_key: Optional[str] = Header(None),
 ):
     request_id = getattr(fastapi_req.state, "request_id", None)
 
+    # A retried request with the same Idempotency-Key gets the first task
+    # instead of generating the exam twice
+    return await idempotency.run(
+        f"exam_generate:{x_user_id}",
+        idempotency_key,
+        request,
+        lambda: _start_generation(request, x_user_id, request_id),
+    )
+
+
+async def _start_generation(
+    request: ExamCreateRequest, x_user_id: str, request_id: Optional[str]
+) -> ExamResponse:
     # Trigger async task
     task = generate_exam_task.delay(
         x_user_id,
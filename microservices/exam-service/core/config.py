@@ -4,8 +4,37 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     DATABASE_URL: str
     OPENAI_API_KEY: str
+    # OpenAI-compatible endpoint, e.g. loadtest/fake_openai.py (None: api.openai.com)
+    OPENAI_BASE_URL: str | None = None
+    REDIS_URL: str = "redis://redis:6379/0"
     RAG_SERVICE_URL: str = "http://rag-service:8000"
 
+    # Shared LLM scheduler (core/llm_scheduler.py): requests and tokens per
+    # minute per model, enforced across all services through Redis (keep
+    # them identical in every service)
+    LLM_RATE_LIMITS: dict[str, tuple[int, int]] = {
+        "gpt-4o": (5000, 800000),
+        "gpt-4o-mini": (10000, 4000000),
+        "text-embedding-3-small": (10000, 5000000),
+    }
+    # Share of each bucket that only interactive calls may use
+    LLM_BACKGROUND_RESERVE: float = 0.2
+    LLM_PRIORITY_WEIGHTS: dict[str, int] = {"interactive": 4, "background": 1}
+    LLM_RATE_LIMIT_PAUSE_SECONDS: float = 2.0
+    # Per-process concurrency, adapted AIMD between the min and the max
+    LLM_MIN_CONCURRENCY: int = 2
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_MAX_CONCURRENCY_PER_FACULTY: int = 16
+    LLM_MAX_CONCURRENCY_PER_USER: int = 2
+    LLM_LATENCY_TARGET_SECONDS: float = 20.0
+    LLM_BACKOFF_COOLDOWN_SECONDS: float = 5.0
+
+    # Idempotency-Key on POST /generate (core/idempotency.py): responses
+    # are replayed for the TTL; duplicates of an in-flight request wait for it
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_TTL_SECONDS: int = 60
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+
     class Config:
         extra = "ignore"
 
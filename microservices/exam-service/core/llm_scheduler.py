@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+import redis.asyncio as aioredis
+from core import deadline
+from core.config import settings
+from core.metrics import LLM_BACKOFFS_TOTAL, LLM_CONCURRENCY_LIMIT, LLM_QUEUE_WAIT
+from openai import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+# Served in this order of preference, weighted by LLM_PRIORITY_WEIGHTS
+PRIORITIES = ("interactive", "background")
+
+BUCKET_KEY = "llm_scheduler:{model}:{kind}"  # HASH level, ts
+PAUSE_KEY = "llm_scheduler:{model}:paused_until"  # set after an OpenAI 429
+
+# Token buckets refilled continuously to their per-minute limit. Takes one
+# request and ARGV[4] tokens when both buckets keep more than the reserve
+# share of their capacity afterwards (0 for interactive calls), else returns
+# the seconds to wait. Returned as a string: Lua numbers become integers.
+# KEYS: request bucket, token bucket, pause key
+# ARGV: now, requests per minute, tokens per minute, tokens, reserve share
+TAKE_TOKENS = """
+local now = tonumber(ARGV[1])
+local paused_until = tonumber(redis.call('GET', KEYS[3]) or '0')
+if paused_until > now then
+    return tostring(paused_until - now)
+end
+local limits = {tonumber(ARGV[2]), tonumber(ARGV[3])}
+local costs = {1, tonumber(ARGV[4])}
+local reserve = tonumber(ARGV[5])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+    local state = redis.call('HMGET', KEYS[i], 'level', 'ts')
+    local rate = limits[i] / 60
+    local level = tonumber(state[1]) or limits[i]
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    level = math.min(limits[i], level + elapsed * rate)
+    levels[i] = level
+    -- A cost above what the bucket can ever hold is let through into debt
+    local needed = math.min(costs[i], limits[i] * (1 - reserve)) + limits[i] * reserve
+    if level < needed then
+        wait = math.max(wait, (needed - level) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i = 1, 2 do
+    redis.call('HSET', KEYS[i], 'level', levels[i] - costs[i], 'ts', now)
+    redis.call('EXPIRE', KEYS[i], 120)
+end
+return '0'
+"""
+
+# Completion tokens reserved in the TPM bucket for a chat completion
+COMPLETION_TOKENS = 500
+
+# (priority, faculty_id, user_id) of the LLM calls made in this context
+_context = ContextVar("llm_scheduler_context", default=("background", None, None))
+
+
+def set_priority(priority: str, faculty_id: str = None, user_id: str = None):
+    """
+    Declares who the LLM calls of the current request or job are made for.
+    Calls made without it are background calls of no faculty.
+    """
+    _context.set((priority, faculty_id, user_id))
+
+
+def estimate_tokens(*texts: str, completion: int = 0) -> int:
+    """
+    Rough token count of a call for the TPM bucket: ~3 characters per token
+    of prompt plus the expected completion.
+    """
+    return sum(len(text or "") for text in texts) // 3 + completion
+
+
+class _Waiter:
+    __slots__ = ("future", "priority", "faculty", "user", "granted")
+
+    def __init__(self, future, priority, faculty, user):
+        self.future = future
+        self.priority = priority
+        self.faculty = faculty
+        self.user = user
+        self.granted = False
+
+
+class LLMScheduler:
+    """
+    Admission control for the OpenAI calls of a service process:
+    - global per-model RPM/TPM token buckets in Redis, shared by every service,
+      where background calls cannot take the LLM_BACKGROUND_RESERVE share of
+      capacity kept for interactive chat, and where an OpenAI 429 pauses
+      everyone for its Retry-After;
+    - a local concurrency limit adapted AIMD (+1 per limit successful calls,
+      halved on a 429 or a call slower than LLM_LATENCY_TARGET_SECONDS);
+    - waiting calls are picked by smooth weighted round robin across priority
+      classes, then round robin across faculties, skipping faculties and users
+      at their in-flight cap.
+
+        async with llm_scheduler.slot(model, estimate_tokens(prompt, completion=COMPLETION_TOKENS)):
+            response = await client.chat.completions.create(...)
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.limit = float(settings.LLM_MAX_CONCURRENCY)
+        self.in_flight = 0
+        self.faculty_in_flight = Counter()
+        self.user_in_flight = Counter()
+        # priority -> faculty -> waiters, the faculty served last at the end
+        self.queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self.credits = {priority: 0 for priority in PRIORITIES}
+        self.last_decrease = 0.0
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    async def _get_redis(self):
+        if self.redis is None:
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        return self.redis
+
+    @asynccontextmanager
+    async def slot(self, model: str, tokens: int, latency_signal: bool = True):
+        """
+        Waits for rate-limit capacity and a concurrency slot, then runs the
+        block. Streaming calls pass latency_signal=False: their duration says
+        little about OpenAI load.
+        """
+        priority, faculty, user = _context.get()
+        if priority not in self.queues:
+            priority = "background"
+        start = time.perf_counter()
+        # Tokens first: a call sleeping on the buckets (mostly background
+        # calls, held back by the reserve) must not hold a concurrency slot
+        await self._take_tokens(model, tokens, priority)
+        waiter = await self._acquire(priority, faculty, user)
+        try:
+            LLM_QUEUE_WAIT.labels(priority=priority).observe(time.perf_counter() - start)
+            call_start = time.perf_counter()
+            try:
+                yield
+            except RateLimitError as e:
+                await self._pause(model, e)
+                self._decrease("rate_limited")
+                raise
+            latency = time.perf_counter() - call_start
+            if latency_signal and latency > settings.LLM_LATENCY_TARGET_SECONDS:
+                self._decrease("latency")
+            else:
+                self._increase()
+        finally:
+            self._release(waiter)
+
+    async def _acquire(self, priority: str, faculty: str, user: str) -> _Waiter:
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority, faculty, user)
+        self.queues[priority].setdefault(faculty, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(waiter.future, timeout=deadline.timeout(None))
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            deadline.check("llm_queue")
+            raise
+        except asyncio.CancelledError:
+            if waiter.granted:
+                self._release(waiter)
+            else:
+                self._discard(waiter)
+            raise
+        return waiter
+
+    def _eligible(self, waiter: _Waiter) -> bool:
+        if self.faculty_in_flight[waiter.faculty] >= settings.LLM_MAX_CONCURRENCY_PER_FACULTY:
+            return False
+        return (
+            waiter.user is None
+            or self.user_in_flight[waiter.user] < settings.LLM_MAX_CONCURRENCY_PER_USER
+        )
+
+    def _next_waiter(self, priority: str) -> _Waiter | None:
+        queue = self.queues[priority]
+        for faculty in list(queue):
+            waiters = queue[faculty]
+            for waiter in waiters:
+                if self._eligible(waiter):
+                    waiters.remove(waiter)
+                    if waiters:
+                        queue.move_to_end(faculty)
+                    else:
+                        del queue[faculty]
+                    return waiter
+        return None
+
+    def _pick(self) -> _Waiter | None:
+        classes = [priority for priority in PRIORITIES if self.queues[priority]]
+        while classes:
+            weights = {p: settings.LLM_PRIORITY_WEIGHTS.get(p, 1) for p in classes}
+            for priority in classes:
+                self.credits[priority] += weights[priority]
+            chosen = max(classes, key=self.credits.get)
+            self.credits[chosen] -= sum(weights.values())
+            waiter = self._next_waiter(chosen)
+            if waiter is not None:
+                return waiter
+            classes.remove(chosen)
+        return None
+
+    def _dispatch(self):
+        while self.in_flight < int(self.limit):
+            waiter = self._pick()
+            if waiter is None:
+                return
+            if waiter.future.done():
+                # Cancelled while queued, before its task could discard it
+                continue
+            waiter.granted = True
+            self.in_flight += 1
+            self.faculty_in_flight[waiter.faculty] += 1
+            if waiter.user is not None:
+                self.user_in_flight[waiter.user] += 1
+            waiter.future.set_result(None)
+
+    def _discard(self, waiter: _Waiter):
+        waiters = self.queues[waiter.priority].get(waiter.faculty)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self.queues[waiter.priority][waiter.faculty]
+
+    def _release(self, waiter: _Waiter):
+        self.in_flight -= 1
+        self.faculty_in_flight[waiter.faculty] -= 1
+        if not self.faculty_in_flight[waiter.faculty]:
+            del self.faculty_in_flight[waiter.faculty]
+        if waiter.user is not None:
+            self.user_in_flight[waiter.user] -= 1
+            if not self.user_in_flight[waiter.user]:
+                del self.user_in_flight[waiter.user]
+        self._dispatch()
+
+    def _increase(self):
+        self.limit = min(settings.LLM_MAX_CONCURRENCY, self.limit + 1 / self.limit)
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+        self._dispatch()
+
+    def _decrease(self, reason: str):
+        LLM_BACKOFFS_TOTAL.labels(reason=reason).inc()
+        now = time.monotonic()
+        # One decrease per burst of failures
+        if now - self.last_decrease < settings.LLM_BACKOFF_COOLDOWN_SECONDS:
+            return
+        self.last_decrease = now
+        self.limit = max(settings.LLM_MIN_CONCURRENCY, self.limit / 2)
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    async def _take_tokens(self, model: str, tokens: int, priority: str):
+        limits = settings.LLM_RATE_LIMITS.get(model)
+        if not limits:
+            return
+        reserve = 0.0 if priority == "interactive" else settings.LLM_BACKGROUND_RESERVE
+        keys = [
+            BUCKET_KEY.format(model=model, kind="requests"),
+            BUCKET_KEY.format(model=model, kind="tokens"),
+            PAUSE_KEY.format(model=model),
+        ]
+        while True:
+            deadline.check("llm_rate_limit")
+            try:
+                redis = await self._get_redis()
+                wait = float(
+                    await redis.eval(
+                        TAKE_TOKENS, 3, *keys, time.time(), *limits, tokens, reserve
+                    )
+                )
+            except Exception as e:
+                # Fail open: OpenAI's own limits still apply
+                logger.error(f"LLM rate limiter unavailable: {e}")
+                return
+            if wait <= 0:
+                return
+            await asyncio.sleep(deadline.timeout(wait))
+
+    async def _pause(self, model: str, error: RateLimitError):
+        try:
+            retry_after = float(error.response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            retry_after = settings.LLM_RATE_LIMIT_PAUSE_SECONDS
+        try:
+            redis = await self._get_redis()
+            await redis.set(
+                PAUSE_KEY.format(model=model),
+                time.time() + retry_after,
+                ex=max(1, int(retry_after) + 1),
+            )
+        except Exception as e:
+            logger.error(f"Failed to pause LLM calls after a 429: {e}")
+
+
+# Singleton instance
+llm_scheduler = LLMScheduler()
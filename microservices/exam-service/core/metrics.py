@@ -0,0 +1,31 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+DEADLINE_EXCEEDED_TOTAL = Counter(
+    "ai_teacher_deadline_exceeded_total",
+    "Stages cancelled or skipped because of the request deadline (X-Request-Deadline)",
+    ["stage", "action"]
+)
+
+LLM_QUEUE_WAIT = Histogram(
+    "ai_teacher_llm_queue_wait_seconds",
+    "Time an OpenAI call waited for the LLM scheduler (concurrency slot and rate limits), by priority class",
+    ["priority"],
+    buckets=[0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+)
+
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "ai_teacher_llm_concurrency_limit",
+    "Current AIMD limit on concurrent OpenAI calls of this process"
+)
+
+LLM_BACKOFFS_TOTAL = Counter(
+    "ai_teacher_llm_backoffs_total",
+    "LLM scheduler backoff signals by reason (rate_limited, latency)",
+    ["reason"]
+)
+
+IDEMPOTENCY_REQUESTS_TOTAL = Counter(
+    "ai_teacher_idempotency_requests_total",
+    "Requests carrying an Idempotency-Key by outcome (executed, replayed, waited, in_progress, mismatch)",
+    ["result"]
+)
@@ -4,6 +4,7 @@ import logging
 import httpx
 from core.audit import log_audit
 from core.config import settings
+from core.llm_scheduler import set_priority
 from repository import exam_repository
 from services.llm_service import llm_service
 from sqlalchemy.orm import Session
@@ -68,6 +69,7 @@ async def generate_and_store_exam(
     theory_count: int,
     request_id: str = None,
 ):
+    set_priority("background", faculty_id, user_id)
     relevant_chunks = []
     try:
         results = await call_rag_search(
@@ -0,0 +1,120 @@
+"""
+Drives chat-service's /chat endpoint with N concurrent simulated students and
+reports latency percentiles and throughput.
+
+    python chat_load.py --url http://localhost:8000 --users 50 --duration 60
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+from course import COLLECTION, FACULTY_ID, QUESTIONS, SEMESTER_ID
+
+# chat-service rate-limits each user to 20 requests per minute
+REQUESTS_PER_USER_ID = 15
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.latencies = []
+        self.statuses = Counter()
+        self.deadline = None
+
+    async def student(self, client: httpx.AsyncClient, index: int):
+        session_id = None
+        sent = 0
+        user_id = None
+        while time.monotonic() < self.deadline:
+            if sent % REQUESTS_PER_USER_ID == 0:
+                # A new student (and session) before the rate limit kicks in
+                user_id, session_id = f"loadtest-{index}-{uuid.uuid4().hex[:8]}", None
+            question = random.choice(QUESTIONS)
+            if self.args.unique:
+                question = f"{question} ({uuid.uuid4().hex[:6]})"
+            body = {
+                "message": question,
+                "collection_name": COLLECTION,
+                "faculty_id": FACULTY_ID,
+                "semester_id": SEMESTER_ID,
+            }
+            if session_id:
+                body["session_id"] = session_id
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/chat", json=body, headers={"X-User-Id": user_id}
+                )
+                status = response.status_code
+                if status == 200:
+                    session_id = response.json().get("session_id")
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            self.statuses[status] += 1
+            if status == 200:
+                self.latencies.append(elapsed)
+            sent += 1
+            if self.args.think_ms:
+                await asyncio.sleep(random.uniform(0, 2 * self.args.think_ms) / 1000)
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.users)
+        async with httpx.AsyncClient(
+            base_url=self.args.url, timeout=self.args.timeout, limits=limits
+        ) as client:
+            if self.args.warmup:
+                self.deadline = time.monotonic() + self.args.warmup
+                await asyncio.gather(*(self.student(client, i) for i in range(self.args.users)))
+                self.latencies.clear()
+                self.statuses.clear()
+            started = time.monotonic()
+            self.deadline = started + self.args.duration
+            await asyncio.gather(*(self.student(client, i) for i in range(self.args.users)))
+            return time.monotonic() - started
+
+    def report(self, elapsed: float):
+        total = sum(self.statuses.values())
+        ok = len(self.latencies)
+        print(f"users={self.args.users} duration={elapsed:.1f}s requests={total} ok={ok}")
+        print(f"throughput={ok / elapsed:.2f} req/s")
+        for p in (50, 95, 99):
+            print(f"p{p}={percentile(self.latencies, p) * 1000:.0f} ms")
+        if self.latencies:
+            print(f"max={max(self.latencies) * 1000:.0f} ms")
+        print("status: " + ", ".join(f"{k}={v}" for k, v in sorted(self.statuses.items(), key=str)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="chat-service base URL")
+    parser.add_argument("--users", type=int, default=20, help="concurrent students")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to measure")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds before measuring")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between questions")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument(
+        "--unique",
+        action="store_true",
+        help="make every question unique so it misses the exact-match answer cache",
+    )
+    args = parser.parse_args()
+    test = LoadTest(args)
+    test.report(asyncio.run(test.run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Sample course shared by the load-test tools: the pages seeded into the
+in-memory Qdrant and the questions students ask about them.
+"""
+
+COLLECTION = "loadtest"
+FACULTY_ID = "loadtest"
+SEMESTER_ID = "1"
+BOOK_ID = "numerical-analysis"
+SOURCE = "numerical_analysis.pdf"
+
+SAMPLE_PAGES = [
+    "التحليل العددي هو فرع من فروع الرياضيات يهتم بإيجاد حلول تقريبية للمسائل الرياضية التي يصعب حلها تحليلياً. ويستخدم الحاسوب لتنفيذ الخوارزميات العددية بدقة محددة.",
+    "طريقة نيوتن رافسون طريقة تكرارية لإيجاد جذور المعادلات غير الخطية. تعتمد الطريقة على المشتقة الأولى للدالة وعلى تخمين ابتدائي قريب من الجذر، وتتقارب تربيعياً عند بساطة الجذر.",
+    "طريقة التنصيف طريقة لإيجاد جذر المعادلة في فترة تتغير فيها إشارة الدالة. في كل خطوة تقسم الفترة إلى نصفين ويختار النصف الذي يحتوي على الجذر، وهي طريقة مضمونة التقارب لكنها بطيئة.",
+    "الخطأ المطلق هو الفرق بين القيمة الحقيقية والقيمة التقريبية، أما الخطأ النسبي فهو الخطأ المطلق مقسوماً على القيمة الحقيقية. وخطأ القطع ينتج عن إيقاف العملية التكرارية بعد عدد محدود من الخطوات.",
+    "الاستكمال الداخلي هو تقدير قيمة الدالة عند نقطة تقع بين نقاط معلومة. ومن أشهر طرقه كثيرة حدود لاغرانج وطريقة الفروق المقسومة لنيوتن.",
+    "التكامل العددي يقرب قيمة التكامل المحدد عندما يصعب إيجاد الدالة الأصلية. قاعدة شبه المنحرف تقرب المساحة بشبه منحرفات، وقاعدة سمبسون تستخدم قطعاً مكافئة لدقة أعلى.",
+    "حل أنظمة المعادلات الخطية عددياً يتم بطرق مباشرة مثل طريقة حذف جاوس، أو بطرق تكرارية مثل طريقة جاكوبي وطريقة جاوس سايدل التي تستخدم أحدث القيم المحسوبة.",
+    "المعادلات التفاضلية العادية تحل عددياً بطريقة أويلر التي تتقدم بخطوات ثابتة باستخدام الميل عند بداية الخطوة، وبطرق رونج كوتا التي تحسن الدقة بحساب الميل عند عدة نقاط.",
+]
+
+QUESTIONS = [
+    "ما هو التحليل العددي؟",
+    "اشرح طريقة نيوتن رافسون لإيجاد جذور المعادلات",
+    "ما هي طريقة التنصيف وهل هي مضمونة التقارب؟",
+    "ما الفرق بين الخطأ المطلق والخطأ النسبي؟",
+    "عرف الاستكمال الداخلي وأشهر طرقه",
+    "كيف تعمل قاعدة شبه المنحرف في التكامل العددي؟",
+    "ما الفرق بين طريقة جاكوبي وطريقة جاوس سايدل؟",
+    "اشرح طريقة أويلر لحل المعادلات التفاضلية العادية",
+]
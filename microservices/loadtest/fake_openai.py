@@ -0,0 +1,306 @@
+"""
+OpenAI-compatible stand-in for load tests: /v1/chat/completions (plain and
+streamed) and /v1/embeddings, with deterministic answers in the shapes the
+services parse and simulated latency. Point a service at it with
+OPENAI_BASE_URL=http://localhost:8090/v1.
+
+    python fake_openai.py --port 8090 --latency-ms 400 --tokens-per-second 60
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+EMBEDDING_DIMENSIONS = 1536
+# Share of every embedding common to all texts: unrelated texts score
+# EMBEDDING_BASELINE, texts sharing words score higher (see embed)
+EMBEDDING_BASELINE = 0.65
+
+WORD = re.compile(r"\w+")
+CHUNK_HEADER = re.compile(r"Chunk \[\d+\] \(Source: (?P<source>.*?), Page: (?P<page>.*?)\):")
+
+
+class Settings:
+    latency_ms = float(os.getenv("FAKE_OPENAI_LATENCY_MS", "300"))
+    tokens_per_second = float(os.getenv("FAKE_OPENAI_TOKENS_PER_SECOND", "80"))
+    embedding_latency_ms = float(os.getenv("FAKE_OPENAI_EMBEDDING_LATENCY_MS", "30"))
+    # Uniform +/- fraction applied to every simulated delay
+    jitter = float(os.getenv("FAKE_OPENAI_JITTER", "0.2"))
+
+
+settings = Settings()
+app = FastAPI(title="Fake OpenAI")
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+
+def _delay(ms: float) -> float:
+    return max(0.0, ms / 1000 * (1 + random.uniform(-settings.jitter, settings.jitter)))
+
+
+def embed(text: str) -> list[float]:
+    """
+    Feature-hashed bag of words plus a constant component, so the cosine
+    similarity of two texts is EMBEDDING_BASELINE + (1 - EMBEDDING_BASELINE)
+    times the cosine of their word counts.
+    """
+    words = np.zeros(EMBEDDING_DIMENSIONS - 1)
+    for word in WORD.findall(text.lower()):
+        digest = hashlib.md5(word.encode()).digest()
+        words[int.from_bytes(digest[:4], "little") % len(words)] += 1
+    norm = np.linalg.norm(words)
+    if norm:
+        words /= norm
+    vector = np.concatenate(
+        ([np.sqrt(EMBEDDING_BASELINE)], words * np.sqrt(1 - EMBEDDING_BASELINE))
+    )
+    return vector.tolist()
+
+
+def _context(prompt: str) -> tuple[list[str], dict]:
+    """
+    Sentences of the reference chunks in a tutor/exam prompt, and the source
+    of the first chunk.
+    """
+    match = CHUNK_HEADER.search(prompt)
+    source = {"book": match["source"], "page": match["page"]} if match else {"book": "N/A", "page": "N/A"}
+    body = prompt.split("المحتوى المرجعي:")[-1].split("سؤال الطالب:")[0]
+    body = body.split("Academic Text:")[-1]
+    body = CHUNK_HEADER.sub("", body).replace("---", "")
+    sentences = [s.strip() for s in re.split(r"[.\n]", body) if len(s.strip()) > 20]
+    return sentences or ["المحتوى المرجعي غير متاح"], source
+
+
+def _sectioned_answer(sentences: list[str]) -> str:
+    pick = [sentences[i % len(sentences)] for i in range(3)]
+    return (
+        f"التعريف: {pick[0]}.\nالشرح: {pick[1]}.\nمثال: {pick[2]}.\nملخص: {pick[0]}."
+    )
+
+
+def _exam(sentences: list[str], mcq: int, theory: int) -> dict:
+    def sentence(i):
+        return sentences[i % len(sentences)]
+
+    questions = [
+        {
+            "question_type": "mcq",
+            "question": f"أي العبارات التالية صحيحة؟ ({i + 1})",
+            "options": [sentence(i), sentence(i + 1), sentence(i + 2), sentence(i + 3)],
+            "correct_answer": sentence(i),
+        }
+        for i in range(mcq)
+    ] + [
+        {
+            "question_type": "theory",
+            "question": f"اشرح: {sentence(i)}",
+            "correct_answer": sentence(i + 1),
+        }
+        for i in range(theory)
+    ]
+    return {"questions": questions}
+
+
+def _pro_exam(sentences: list[str], page: str) -> dict:
+    def sentence(i):
+        return sentences[i % len(sentences)]
+
+    def matching(section_id, title, offset):
+        return {
+            "section_id": section_id,
+            "type": "matching",
+            "title": title,
+            "questions": [
+                {
+                    "pair_id": i + 1,
+                    "item_a": sentence(offset + i)[:40],
+                    "item_b": sentence(offset + i)[40:80] or sentence(offset + i),
+                    "source_page": page,
+                }
+                for i in range(5)
+            ],
+        }
+
+    return {
+        "sections": [
+            matching("matching_1", "Matching Question 1", 0),
+            matching("matching_2", "Matching Question 2", 5),
+            {
+                "section_id": "tf",
+                "type": "tf",
+                "title": "True/False Statements",
+                "questions": [
+                    {"id": i + 1, "statement": sentence(i), "correct_answer": i % 2 == 0, "source_page": page}
+                    for i in range(10)
+                ],
+            },
+            {
+                "section_id": "mcq",
+                "type": "mcq",
+                "title": "Multiple Choice Questions",
+                "questions": [
+                    {
+                        "id": i + 1,
+                        "question": f"أي العبارات التالية صحيحة؟ ({i + 1})",
+                        "options": [sentence(i + k) for k in range(4)],
+                        "correct_answer": sentence(i),
+                        "source_page": page,
+                    }
+                    for i in range(10)
+                ],
+            },
+        ]
+    }
+
+
+def respond(messages: list[dict]) -> str:
+    """
+    The reply for a conversation, recognized by the prompts of the services'
+    LLM calls.
+    """
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    last = str(messages[-1].get("content", "")) if messages else ""
+
+    if "Identify intent" in prompt:
+        question = prompt.split("Student Message:")[-1].strip()
+        return json.dumps(
+            {"intent": "DEFINITION", "mode": "UNDERSTANDING", "rewritten_query": question},
+            ensure_ascii=False,
+        )
+    if "strict academic auditor" in prompt:
+        return "TRUE"
+    if "academic reranker" in prompt:
+        return "0, 1, 2"
+    if "learning state summary" in prompt:
+        return "الطالب يراجع المفاهيم الأساسية في المقرر."
+
+    sentences, source = _context(prompt)
+    if "You MUST return a JSON object with 'answer'" in last:
+        return json.dumps(
+            {"answer": _sectioned_answer(sentences), "source": source}, ensure_ascii=False
+        )
+    if "Return ONLY the answer text" in last:
+        return _sectioned_answer(sentences)
+    if "professional university-level exam" in prompt:
+        return json.dumps(_pro_exam(sentences, str(source["page"])), ensure_ascii=False)
+    if "university-level exam" in prompt:
+        counts = re.search(r"exactly (\d+) multiple-choice questions and (\d+) theory", prompt)
+        mcq, theory = (int(counts[1]), int(counts[2])) if counts else (5, 2)
+        return json.dumps(_exam(sentences, mcq, theory), ensure_ascii=False)
+    return sentences[0]
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "gpt-4o")
+    content = respond(messages)
+    prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in messages)
+    completion_tokens = count_tokens(content)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(
+            _delay(settings.latency_ms)
+            + _delay(completion_tokens / settings.tokens_per_second * 1000)
+        )
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": _usage(prompt_tokens, completion_tokens),
+        }
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+    def chunk(delta: dict, finish_reason=None, usage=None) -> str:
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            data["usage"] = usage
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def events():
+        await asyncio.sleep(_delay(settings.latency_ms))
+        yield chunk({"role": "assistant", "content": ""})
+        # Pieces of about 3 characters, i.e. one token each
+        for start in range(0, len(content), 3):
+            await asyncio.sleep(_delay(1000 / settings.tokens_per_second))
+            yield chunk({"content": content[start : start + 3]})
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, usage=_usage(prompt_tokens, completion_tokens))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    await asyncio.sleep(_delay(settings.embedding_latency_ms))
+    return {
+        "object": "list",
+        "model": body.get("model", "text-embedding-3-small"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": embed(text)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {
+            "prompt_tokens": sum(count_tokens(t) for t in inputs),
+            "total_tokens": sum(count_tokens(t) for t in inputs),
+        },
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=settings.latency_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=settings.tokens_per_second)
+    parser.add_argument("--embedding-latency-ms", type=float, default=settings.embedding_latency_ms)
+    parser.add_argument("--jitter", type=float, default=settings.jitter)
+    args = parser.parse_args()
+    settings.latency_ms = args.latency_ms
+    settings.tokens_per_second = args.tokens_per_second
+    settings.embedding_latency_ms = args.embedding_latency_ms
+    settings.jitter = args.jitter
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
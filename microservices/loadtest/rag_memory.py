@@ -0,0 +1,57 @@
+"""
+Runs rag-service in-process on an in-memory Qdrant (QDRANT_URL=":memory:")
+seeded with the sample course of course.py, for load tests without a Qdrant server.
+Embeddings come from OPENAI_BASE_URL, normally fake_openai.py.
+
+    OPENAI_BASE_URL=http://localhost:8090/v1 python rag_memory.py --port 8001
+"""
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+
+os.environ.setdefault("QDRANT_URL", ":memory:")
+os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest")
+os.environ.setdefault("OPENAI_BASE_URL", "http://localhost:8090/v1")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./rag_loadtest.db")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rag-service"))
+
+from course import BOOK_ID, COLLECTION, FACULTY_ID, SAMPLE_PAGES, SEMESTER_ID, SOURCE  # noqa: E402
+from main import app  # noqa: E402
+from qdrant_client import models  # noqa: E402
+from rag.embeddings import generate_embedding  # noqa: E402
+from services.qdrant_service import QdrantService  # noqa: E402
+
+
+async def seed():
+    qs = QdrantService(collection_name=COLLECTION)
+    points = []
+    for page, text in enumerate(SAMPLE_PAGES, start=1):
+        points.append(
+            models.PointStruct(
+                id=str(uuid.uuid4()),
+                vector=await generate_embedding(text),
+                payload={
+                    "text": text,
+                    "source": SOURCE,
+                    "page": page,
+                    "book_id": BOOK_ID,
+                    "faculty_id": FACULTY_ID,
+                    "semester_id": SEMESTER_ID,
+                },
+            )
+        )
+    qs.create_collection_if_not_exists(vector_size=len(points[0].vector))
+    qs.upsert_points(points)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    asyncio.run(seed())
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session
+from core.idempotency import idempotency
 from db.session import get_db
 from models.exam import ProExam
 from models.submission import ProExamSubmission
@@ -23,7 +24,21 @@ class SessionStartRequest(BaseModel):
     exam_id: UUID4
 
 @router.post("/generate")
-async def generate_exam(request: ExamGenerateRequest, x_request_id: Optional[str] = Header(None)):
+async def generate_exam(
+    request: ExamGenerateRequest,
+    x_user_id: str = Header(...),
+    x_request_id: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
+):
+    # A retry with the same Idempotency-Key gets the first task back
+    return await idempotency.run(
+        f"pro_exam_generate:{x_user_id}",
+        idempotency_key,
+        request,
+        lambda: _start_generation(request, x_request_id),
+    )
+
+async def _start_generation(request: ExamGenerateRequest, x_request_id: Optional[str]):
     task = generate_pro_exam_task.delay(
         str(request.book_id),
         str(request.faculty_id),
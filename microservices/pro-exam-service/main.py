@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
+from core import deadline
 from core.config import settings
 from api.v1.router import router as api_router
 import logging
@@ -10,6 +11,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Professional Exam Service", version="1.0.0")
+deadline.install(app)
 
 # Include API Router
 app.include_router(api_router, prefix="/api/v1")
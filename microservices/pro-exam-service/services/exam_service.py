@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from models.exam import ProExam
 from services.llm_service import llm_service
 from core.config import settings
+from core.llm_scheduler import set_priority
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 logger = logging.getLogger(__name__)
@@ -34,6 +35,7 @@ class ExamService:
 
     async def generate_exam(self, db: Session, book_id: str, faculty_id: str, department_id: str, semester_id: str, title: str, request_id: str = None) -> ProExam:
         logger.info(f"Generating professional exam for book {book_id}")
+        set_priority("background", faculty_id)
 
         context = await self._fetch_book_context(book_id, faculty_id, semester_id, department_id, request_id)
         if not context:
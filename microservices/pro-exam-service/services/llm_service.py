@@ -1,13 +1,16 @@
 import json
 import logging
 from core.config import settings
+from core.llm_scheduler import COMPLETION_TOKENS, estimate_tokens, llm_scheduler
 from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
 class LLMService:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL
+        )
 
     async def generate_pro_exam(self, context: list[dict]) -> dict:
         formatted_chunks = []
@@ -74,12 +77,15 @@ Academic Text:
 {context_str}
 """
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                response_format={ "type": "json_object" }
-            )
+            # A full four-section exam is a long completion
+            tokens = estimate_tokens(prompt, completion=4 * COMPLETION_TOKENS)
+            async with llm_scheduler.slot("gpt-4o", tokens):
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1,
+                    response_format={ "type": "json_object" }
+                )
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Error in LLM generation: {e}")
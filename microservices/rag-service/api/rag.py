@@ -1,4 +1,6 @@
 from typing import Optional
+from core import deadline
+from core.llm_scheduler import set_priority
 from core.audit import log_audit
 from core.cache import cache_result
 from fastapi import APIRouter, File, HTTPException, UploadFile
@@ -42,7 +44,11 @@ async def search(request: SearchRequest):
 
 async def _do_search(request: SearchRequest):
     qs = QdrantService(collection_name=request.collection_name)
+    # Searches are mostly made for a student waiting on a chat answer
+    set_priority("interactive", request.faculty_id)
+    deadline.check("embedding")
     query_vector = await generate_embedding(request.query)
+    deadline.check("search")
     try:
         # Enforce Faculty + Semester isolation
         must_conditions = [
@@ -6,6 +6,30 @@ class Settings(BaseSettings):
     QDRANT_URL: str = "http://qdrant:6333"
     REDIS_URL: str = "redis://redis:6379/0"
     OPENAI_API_KEY: str
+    # OpenAI-compatible endpoint, e.g. loadtest/fake_openai.py (None: api.openai.com)
+    OPENAI_BASE_URL: str | None = None
+    # Per-call cap, shortened to the time left before the request deadline
+    LLM_TIMEOUT_SECONDS: float = 30.0
+
+    # Shared LLM scheduler (core/llm_scheduler.py): requests and tokens per
+    # minute per model, enforced across all services through Redis (keep
+    # them identical in every service)
+    LLM_RATE_LIMITS: dict[str, tuple[int, int]] = {
+        "gpt-4o": (5000, 800000),
+        "gpt-4o-mini": (10000, 4000000),
+        "text-embedding-3-small": (10000, 5000000),
+    }
+    # Share of each bucket that only interactive calls may use
+    LLM_BACKGROUND_RESERVE: float = 0.2
+    LLM_PRIORITY_WEIGHTS: dict[str, int] = {"interactive": 4, "background": 1}
+    LLM_RATE_LIMIT_PAUSE_SECONDS: float = 2.0
+    # Per-process concurrency, adapted AIMD between the min and the max
+    LLM_MIN_CONCURRENCY: int = 2
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_MAX_CONCURRENCY_PER_FACULTY: int = 16
+    LLM_MAX_CONCURRENCY_PER_USER: int = 2
+    LLM_LATENCY_TARGET_SECONDS: float = 20.0
+    LLM_BACKOFF_COOLDOWN_SECONDS: float = 5.0
 
     # S3 / MinIO Configuration
     S3_ENDPOINT_URL: str = "http://minio:9000"
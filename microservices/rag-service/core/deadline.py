@@ -0,0 +1,89 @@
+import time
+from contextvars import ContextVar
+
+from core.metrics import DEADLINE_EXCEEDED_TOTAL
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Absolute deadline of the client request, in Unix epoch milliseconds. Set by
+# the api-gateway and forwarded on every downstream call.
+DEADLINE_HEADER = "X-Request-Deadline"
+
+_deadline = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting a stage once the request deadline has passed."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded before {stage}")
+        self.stage = stage
+
+
+def parse_deadline(value: str | None) -> float | None:
+    try:
+        return int(value) / 1000
+    except (TypeError, ValueError):
+        return None
+
+
+def set_deadline(deadline: float | None):
+    _deadline.set(deadline)
+
+
+def remaining() -> float | None:
+    """Seconds left before the deadline, None when the request has none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def check(stage: str):
+    left = remaining()
+    if left is not None and left <= 0:
+        DEADLINE_EXCEEDED_TOTAL.labels(stage=stage, action="cancelled").inc()
+        raise DeadlineExceeded(stage)
+
+
+def timeout(cap: float | None) -> float | None:
+    """Timeout for a downstream call: `cap`, shortened to the time left."""
+    left = remaining()
+    if left is None:
+        return cap
+    left = max(left, 0.0)
+    return left if cap is None else min(cap, left)
+
+
+def has_budget(stage: str, seconds: float) -> bool:
+    """
+    Whether an optional stage expected to take `seconds` fits in the time
+    left. A skipped stage is counted.
+    """
+    left = remaining()
+    if left is None or left >= seconds:
+        return True
+    DEADLINE_EXCEEDED_TOTAL.labels(stage=stage, action="skipped").inc()
+    return False
+
+
+def headers() -> dict:
+    deadline = _deadline.get()
+    return {} if deadline is None else {DEADLINE_HEADER: str(int(deadline * 1000))}
+
+
+async def deadline_middleware(request: Request, call_next):
+    deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+    if deadline is not None and deadline <= time.time():
+        # The client has already given up: do not start any work
+        DEADLINE_EXCEEDED_TOTAL.labels(stage="arrival", action="cancelled").inc()
+        return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+    set_deadline(deadline)
+    return await call_next(request)
+
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+def install(app: FastAPI):
+    app.middleware("http")(deadline_middleware)
+    app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
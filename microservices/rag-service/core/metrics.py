@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 RETRIEVER_REFRESH_LATENCY = Histogram(
     "retriever_refresh_latency_seconds",
@@ -9,3 +9,27 @@ RETRIEVER_REFRESH_TOTAL = Counter(
     "retriever_refresh_total",
     "Total number of retriever refresh operations"
 )
+
+DEADLINE_EXCEEDED_TOTAL = Counter(
+    "ai_teacher_deadline_exceeded_total",
+    "Stages cancelled or skipped because of the request deadline (X-Request-Deadline)",
+    ["stage", "action"]
+)
+
+LLM_QUEUE_WAIT = Histogram(
+    "ai_teacher_llm_queue_wait_seconds",
+    "Time an OpenAI call waited for the LLM scheduler (concurrency slot and rate limits), by priority class",
+    ["priority"],
+    buckets=[0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+)
+
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "ai_teacher_llm_concurrency_limit",
+    "Current AIMD limit on concurrent OpenAI calls of this process"
+)
+
+LLM_BACKOFFS_TOTAL = Counter(
+    "ai_teacher_llm_backoffs_total",
+    "LLM scheduler backoff signals by reason (rate_limited, latency)",
+    ["reason"]
+)
@@ -1,6 +1,7 @@
 import uuid
 
 from api.rag import router as rag_router
+from core import deadline
 from core.observability import instrument_app, setup_logging, setup_tracing
 from db.base import Base
 from db.session import engine
@@ -16,6 +17,7 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(title="RAG Service", version="1.0.0")
 Instrumentator().instrument(app).expose(app)
 instrument_app(app, "rag-service")
+deadline.install(app)
 
 
 @app.middleware("http")
@@ -1,6 +1,8 @@
 import logging
 
+from core import deadline
 from core.config import settings
+from core.llm_scheduler import COMPLETION_TOKENS, estimate_tokens, llm_scheduler
 from openai import APIError, AsyncOpenAI
 
 # Configure logging
@@ -13,7 +15,9 @@ class LLMService:
         """
         Initializes the LLMService with the OpenAI API key.
         """
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL
+        )
 
     async def get_chat_completion(self, prompt: str, model: str = "gpt-4o") -> str:
         """
@@ -21,11 +25,14 @@ class LLMService:
         """
         try:
             logger.info(f"Requesting chat completion with model {model}")
-            response = await self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.0,  # Keep it deterministic for academic use cases
-            )
+            tokens = estimate_tokens(prompt, completion=COMPLETION_TOKENS)
+            async with llm_scheduler.slot(model, tokens):
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.0,  # Keep it deterministic for academic use cases
+                    timeout=deadline.timeout(settings.LLM_TIMEOUT_SECONDS),
+                )
             content = response.choices[0].message.content
             logger.info("Successfully received chat completion")
             return content
@@ -46,7 +53,12 @@ class LLMService:
             logger.info(f"Generating embedding with model {model}")
             # Ensure text is not empty and within limits (simplified)
             text = text.replace("\n", " ")
-            response = await self.client.embeddings.create(input=[text], model=model)
+            async with llm_scheduler.slot(model, estimate_tokens(text)):
+                response = await self.client.embeddings.create(
+                    input=[text],
+                    model=model,
+                    timeout=deadline.timeout(settings.LLM_TIMEOUT_SECONDS),
+                )
             embedding = response.data[0].embedding
             logger.info("Successfully generated embedding")
             return embedding
@@ -8,13 +8,27 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+_client = None
+
+
+def get_client() -> QdrantClient:
+    """
+    One client per process, shared by every collection. QDRANT_URL may be
+    ":memory:" for an in-process Qdrant (load tests).
+    """
+    global _client
+    if _client is None:
+        logger.info(f"Connecting to Qdrant at {settings.QDRANT_URL}")
+        _client = QdrantClient(location=settings.QDRANT_URL)
+    return _client
+
+
 class QdrantService:
     def __init__(self, collection_name: str = "ai-teacher"):
         """
         Initializes the QdrantService.
         """
-        logger.info(f"Connecting to Qdrant at {settings.QDRANT_URL}")
-        self.client = QdrantClient(url=settings.QDRANT_URL)
+        self.client = get_client()
         self.collection_name = collection_name
 
     def create_collection_if_not_exists(
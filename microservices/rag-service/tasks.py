@@ -18,6 +18,10 @@ logger = logging.getLogger(__name__)
 
 RAG_INGESTION_TIME = Summary("rag_ingestion_seconds", "Time spent on RAG ingestion")
 
+# One loop per worker process: the LLM scheduler keeps its Redis connection
+# bound to the loop that opened it
+_loop = asyncio.new_event_loop()
+
 
 def get_s3_client():
     return boto3.client(
@@ -87,7 +91,7 @@ def ingest_document_task(
                 qs.upsert_points(points)
             return len(chunks)
 
-        num_chunks = asyncio.run(process_chunks())
+        num_chunks = _loop.run_until_complete(process_chunks())
 
         log_audit(
             user_id="system",